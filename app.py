@@ -1,11 +1,25 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, MINYEAR, MAXYEAR
 import random
 import calendar
+import click
+
+from dashboard import get_dashboard_snapshot, invalidate_dashboard_snapshot
+from list_queries import list_query, job_openings_with_applicant_counts
+from pagination import paginate, get_page_args, apply_filters, apply_date_filters, next_page_url, first_page_url
+from identity import get_identity, current_employee, register_identity_invalidation
+from hooks import get_hook_stats
+from attendance_import import detect_format, iter_records, import_attendance, DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE
+from leave_ledger import register_leave_ledger, rebuild_leave_balances, get_leaves_taken
+from change_log import register_change_log
+from attendance_report import get_monthly_attendance_report, iter_report_csv
+from report_rollups import (register_report_rollups, rebuild_rollups, get_report_range, get_attendance_trend,
+                            get_department_attendance, get_leave_utilization, get_leave_by_type,
+                            get_payroll_trend, get_payroll_by_department)
 
 # Create the app
 app = Flask(__name__)
@@ -18,6 +32,12 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Initialize database
 db = SQLAlchemy(app)
 
+# Paging helpers for list templates
+app.jinja_env.globals.update(
+    next_page_url=next_page_url,
+    first_page_url=first_page_url
+)
+
 # Login manager
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -60,6 +80,11 @@ class Employee(db.Model):
     reports_to = db.Column(db.Integer, db.ForeignKey('employee.id'))
     company = db.Column(db.String(80))
     
+    __table_args__ = (
+        db.Index('idx_employee_user_id', 'user_id'),
+        db.Index('idx_employee_status_department', 'status', 'department'),
+    )
+    
     @property
     def employee_name(self):
         return f"{self.first_name} {self.last_name or ''}"
@@ -79,6 +104,14 @@ class Attendance(db.Model):
     working_hours = db.Column(db.Float)
     
     employee = db.relationship('Employee', backref='attendance')
+    
+    # One record per employee per day; the constraint also serves employee/date lookups
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'attendance_date', name='uq_attendance_employee_date'),
+        db.Index('idx_attendance_status_date', 'status', 'attendance_date'),
+        # Covers the monthly report's scan of a date range by status and employee
+        db.Index('idx_attendance_date_status_employee', 'attendance_date', 'status', 'employee_id'),
+    )
 
 class LeaveType(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -98,6 +131,79 @@ class LeaveApplication(db.Model):
     
     employee = db.relationship('Employee', backref='leave_applications')
     leave_type = db.relationship('LeaveType')
+    
+    __table_args__ = (
+        db.Index('idx_leave_application_employee_type_status', 'employee_id', 'leave_type_id', 'status'),
+        db.Index('idx_leave_application_employee_status', 'employee_id', 'status'),
+        db.Index('idx_leave_application_status_from_date', 'status', 'from_date'),
+    )
+
+class LeaveBalance(db.Model):
+    # Approved leave days per employee, leave type and year, maintained by leave_ledger
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    leave_type_id = db.Column(db.Integer, db.ForeignKey('leave_type.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    leaves_taken = db.Column(db.Float, nullable=False, default=0)
+    modified = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'leave_type_id', 'year', name='uq_leave_balance_employee_type_year'),
+        db.Index('idx_leave_balance_year', 'year'),
+    )
+
+class AttendanceRollup(db.Model):
+    # Attendance days per month, department and status, maintained by report_rollups
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False)
+    department = db.Column(db.String(80), nullable=False, default='')
+    status = db.Column(db.String(20), nullable=False)
+    days = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('month', 'department', 'status', name='uq_attendance_rollup_month_department_status'),
+    )
+
+class LeaveRollup(db.Model):
+    # Approved leave per month and leave type, maintained by report_rollups
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False)
+    leave_type_id = db.Column(db.Integer, db.ForeignKey('leave_type.id'), nullable=False)
+    applications = db.Column(db.Integer, nullable=False, default=0)
+    days = db.Column(db.Float, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('month', 'leave_type_id', name='uq_leave_rollup_month_type'),
+    )
+
+class PayrollRollup(db.Model):
+    # Salary slip totals per month and department, maintained by report_rollups
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False)
+    department = db.Column(db.String(80), nullable=False, default='')
+    slips = db.Column(db.Integer, nullable=False, default=0)
+    gross_pay = db.Column(db.Float, nullable=False, default=0)
+    total_deduction = db.Column(db.Float, nullable=False, default=0)
+    net_pay = db.Column(db.Float, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('month', 'department', name='uq_payroll_rollup_month_department'),
+    )
+
+class RollupStaleMonth(db.Model):
+    # Rollup months to recompute on the next refresh, appended by report_rollups
+    id = db.Column(db.Integer, primary_key=True)
+    rollup = db.Column(db.String(20), nullable=False)
+    month = db.Column(db.Date, nullable=False)
+
+class SyncChange(db.Model):
+    # Rows changed since the last incremental sync to Frappe, written by change_log
+    __tablename__ = 'sync_change'
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
 
 class SalaryStructure(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -121,6 +227,11 @@ class SalarySlip(db.Model):
     
     employee = db.relationship('Employee', backref='salary_slips')
     salary_structure = db.relationship('SalaryStructure')
+    
+    __table_args__ = (
+        db.Index('idx_salary_slip_employee_end_date', 'employee_id', 'end_date'),
+        db.Index('idx_salary_slip_status_end_date', 'status', 'end_date'),
+    )
 
 class JobOpening(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -142,6 +253,11 @@ class JobApplicant(db.Model):
     cover_letter = db.Column(db.Text)
     
     job_opening = db.relationship('JobOpening', backref='applicants')
+    
+    __table_args__ = (
+        db.Index('idx_job_applicant_opening_status', 'job_opening_id', 'status'),
+        db.Index('idx_job_applicant_status', 'status'),
+    )
 
 class Appraisal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -153,10 +269,69 @@ class Appraisal(db.Model):
     feedback = db.Column(db.Text)
     
     employee = db.relationship('Employee', backref='appraisals')
+    
+    __table_args__ = (
+        db.Index('idx_appraisal_employee_status', 'employee_id', 'status'),
+        db.Index('idx_appraisal_employee_end_date', 'employee_id', 'end_date'),
+    )
+
+# Drop a request's user/employee identity once changes to its rows are committed
+register_identity_invalidation(db.session, User, Employee)
+
+# Book approved leave into the balance ledger as applications are flushed
+register_leave_ledger(db.session, LeaveApplication)
+
+# Queue report rollup months for recomputation as facts are flushed
+register_report_rollups(db.session)
+
+# Log changed rows of the models synced to Frappe by `migrate_db.py --sync`
+register_change_log(db.session, [User, Employee, Department, Attendance, LeaveType, LeaveApplication,
+                                 SalaryStructure, SalarySlip, JobOpening, JobApplicant, Appraisal])
+
+@app.cli.command('rebuild-leave-balances')
+@click.option('--year', type=int, default=None, help='Only rebuild this year')
+def rebuild_leave_balances_command(year):
+    """Reconcile the leave balance ledger from leave applications"""
+    count = rebuild_leave_balances(year)
+    click.echo(f"Rebuilt {count} leave balance rows")
+
+@app.cli.command('rebuild-report-rollups')
+def rebuild_report_rollups_command():
+    """Recompute every month of the attendance, leave and payroll rollups"""
+    refreshed = rebuild_rollups()
+    click.echo(f"Rebuilt {sum(refreshed.values())} rollup months")
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return get_identity(int(user_id)).user
+
+def create_missing_indexes():
+    """Create declared indexes on tables that were created before they were added"""
+    inspector = db.inspect(db.engine)
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        existing.update(constraint['name'] for constraint in inspector.get_unique_constraints(table.name))
+        
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+        
+        # Unique constraints cannot be added in place everywhere, so enforce them with a unique index,
+        # declared on a copy of the table so the app's metadata is left as it is
+        for constraint in table.constraints:
+            if isinstance(constraint, db.UniqueConstraint) and constraint.name and constraint.name not in existing:
+                shadow = table.to_metadata(db.MetaData())
+                index = db.Index(constraint.name, *(shadow.c[column.name] for column in constraint.columns),
+                                 unique=True)
+                try:
+                    with db.engine.begin() as conn:
+                        index.create(bind=conn, checkfirst=True)
+                except Exception as e:
+                    app.logger.warning(f"Could not create unique index {constraint.name}: {e}")
 
 # Sample data function
 def add_test_data():
@@ -317,33 +492,19 @@ def hr_dashboard():
         flash('You do not have permission to access this page.')
         return redirect(url_for('employee_portal'))
     
-    # Get counts for dashboard cards
-    employee_count = Employee.query.filter_by(status='Active').count()
-    today = datetime.now().date()
-    attendance_today = Attendance.query.filter_by(attendance_date=today).count()
-    leave_pending = LeaveApplication.query.filter_by(status='Open').count()
-    job_openings = JobOpening.query.filter_by(status='Open').count()
+    # Headline numbers come from the cached dashboard snapshot
+    snapshot = get_dashboard_snapshot()
     
     # Recent employees
     recent_employees = Employee.query.order_by(Employee.date_of_joining.desc()).limit(5).all()
     
-    # Department distribution
-    departments = Department.query.all()
-    department_distribution = []
-    for dept in departments:
-        count = Employee.query.filter_by(department=dept.name, status='Active').count()
-        department_distribution.append({
-            'name': dept.name,
-            'count': count
-        })
-    
     return render_template('modern/hr_dashboard.html', 
-                          employee_count=employee_count,
-                          attendance_today=attendance_today,
-                          leave_pending=leave_pending,
-                          job_openings=job_openings,
+                          employee_count=snapshot['employee_count'],
+                          attendance_today=snapshot['attendance_today'],
+                          leave_pending=snapshot['leave_pending'],
+                          job_openings=snapshot['job_openings'],
                           recent_employees=recent_employees,
-                          department_distribution=department_distribution,
+                          department_distribution=snapshot['department_distribution'],
                           active_page='dashboard',
                           title='HR Dashboard')
 
@@ -351,22 +512,18 @@ def hr_dashboard():
 @login_required
 def employee_portal():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
         return redirect(url_for('index'))
     
-    # Get leave balance
+    # Get leave balance from the ledger for the current year
     leave_balance = []
     leave_types = LeaveType.query.all()
+    leaves_taken = get_leaves_taken(datetime.now().year, employee_ids=[employee.id])
     for lt in leave_types:
-        # Count approved leaves
-        approved_leaves = LeaveApplication.query.filter_by(
-            employee_id=employee.id,
-            leave_type_id=lt.id,
-            status='Approved'
-        ).count()
+        approved_leaves = leaves_taken.get((employee.id, lt.id), 0)
         
         leave_balance.append({
             'leave_type': lt.name,
@@ -403,7 +560,7 @@ def employee_portal():
 @login_required
 def apply_leave():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
@@ -432,6 +589,7 @@ def apply_leave():
         
         db.session.add(new_leave)
         db.session.commit()
+        invalidate_dashboard_snapshot()
         
         flash('Leave application submitted successfully.')
         return redirect(url_for('view_leaves'))
@@ -445,18 +603,18 @@ def apply_leave():
 @login_required
 def view_leaves():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
         return redirect(url_for('index'))
     
-    leaves = LeaveApplication.query.filter_by(employee_id=employee.id).order_by(LeaveApplication.from_date.desc()).all()
+    leaves = list_query('my_leaves').filter_by(employee_id=employee.id).order_by(LeaveApplication.from_date.desc()).all()
     
     # Process leaves for display
     leave_list = []
     for leave in leaves:
-        leave_type = LeaveType.query.get(leave.leave_type_id)
+        leave_type = leave.leave_type
         
         leave_list.append({
             'id': leave.id,
@@ -477,7 +635,7 @@ def view_leaves():
 @login_required
 def mark_attendance():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
@@ -507,6 +665,7 @@ def mark_attendance():
             )
             db.session.add(new_attendance)
             db.session.commit()
+        invalidate_dashboard_snapshot()
         
         flash('Attendance marked successfully.')
         return redirect(url_for('view_attendance'))
@@ -521,7 +680,7 @@ def mark_attendance():
 @login_required
 def view_attendance():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
@@ -539,7 +698,7 @@ def view_attendance():
 @login_required
 def view_salary_slips():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
@@ -556,7 +715,7 @@ def view_salary_slips():
 @login_required
 def view_salary_slip_detail(slip_id):
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     
     if not employee:
         flash('No employee record found for your user account.')
@@ -581,8 +740,7 @@ def view_salary_slip_detail(slip_id):
 @login_required
 def my_profile():
     # Get user and employee data
-    user = User.query.get(current_user.id)
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    user, employee = get_identity(current_user.id)
     
     if not employee:
         flash('No employee record found for your user account.')
@@ -600,10 +758,22 @@ def employees_list():
         flash('You do not have permission to access this page.')
         return redirect(url_for('employee_portal'))
     
-    employees = Employee.query.all()
+    # Filters and sorting are pushed into SQL; only one page is loaded
+    query = apply_filters(Employee.query, {
+        'status': Employee.status,
+        'department': Employee.department,
+        'designation': Employee.designation,
+        'company': Employee.company
+    }, request.args)
+    sort_keys, descending, cursor, limit = get_page_args(request.args, {
+        'employee_id': [Employee.employee_id],
+        'name': [Employee.first_name, Employee.id],
+        'id': [Employee.id]
+    }, default_sort='employee_id')
+    page = paginate(query, sort_keys, descending=descending, cursor=cursor, limit=limit)
     
     employee_list = []
-    for emp in employees:
+    for emp in page.items:
         employee_list.append({
             'id': emp.id,
             'employee_id': emp.employee_id,
@@ -617,6 +787,7 @@ def employees_list():
     
     return render_template('modern/employees.html', 
                           employees=employee_list,
+                          page=page,
                           active_page='employees',
                           title='Employees')
 
@@ -642,6 +813,7 @@ def attendance_daily_view():
     
     today = datetime.now().date()
     attendance_records = Attendance.query.filter_by(attendance_date=today).all()
+    attendance_by_employee = {att.employee_id: att for att in attendance_records}
     
     # Get all employees
     employees = Employee.query.filter_by(status='Active').all()
@@ -649,7 +821,7 @@ def attendance_daily_view():
     # Process attendance for display
     attendance_status = []
     for emp in employees:
-        att_record = next((att for att in attendance_records if att.employee_id == emp.id), None)
+        att_record = attendance_by_employee.get(emp.id)
         
         attendance_status.append({
             'employee_id': emp.id,
@@ -678,13 +850,24 @@ def leave_pending_approvals():
         flash('You do not have permission to access this page.')
         return redirect(url_for('employee_portal'))
     
-    pending_leaves = LeaveApplication.query.filter_by(status='Open').all()
+    query = list_query('pending_leaves').filter(LeaveApplication.status == 'Open')
+    query = apply_filters(query, {
+        'employee_id': LeaveApplication.employee_id,
+        'leave_type_id': LeaveApplication.leave_type_id
+    }, request.args)
+    if request.args.get('department'):
+        query = query.join(LeaveApplication.employee).filter(Employee.department == request.args.get('department'))
+    sort_keys, descending, cursor, limit = get_page_args(request.args, {
+        'from_date': [LeaveApplication.from_date, LeaveApplication.id],
+        'id': [LeaveApplication.id]
+    }, default_sort='from_date')
+    page = paginate(query, sort_keys, descending=descending, cursor=cursor, limit=limit)
     
     # Process leaves for display
     leave_list = []
-    for leave in pending_leaves:
-        employee = Employee.query.get(leave.employee_id)
-        leave_type = LeaveType.query.get(leave.leave_type_id)
+    for leave in page.items:
+        employee = leave.employee
+        leave_type = leave.leave_type
         
         leave_list.append({
             'id': leave.id,
@@ -700,6 +883,7 @@ def leave_pending_approvals():
     
     return render_template('modern/hr_dashboard.html', 
                           leaves=leave_list,
+                          page=page,
                           active_page='leave_pending_approvals',
                           section='Leave Management',
                           subsection='Pending Approvals',
@@ -712,13 +896,12 @@ def job_openings():
         flash('You do not have permission to access this page.')
         return redirect(url_for('employee_portal'))
     
-    job_openings = JobOpening.query.all()
+    job_openings = job_openings_with_applicant_counts().all()
     
     # Process job openings for display
     jobs_list = []
-    for job in job_openings:
-        department = Department.query.get(job.department_id)
-        applicant_count = JobApplicant.query.filter_by(job_opening_id=job.id).count()
+    for job, applicant_count in job_openings:
+        department = job.department
         
         jobs_list.append({
             'id': job.id,
@@ -744,12 +927,20 @@ def recruitment_job_applicants():
         flash('You do not have permission to access this page.')
         return redirect(url_for('employee_portal'))
     
-    job_applicants = JobApplicant.query.all()
+    query = apply_filters(list_query('job_applicants'), {
+        'status': JobApplicant.status,
+        'job_opening_id': JobApplicant.job_opening_id
+    }, request.args)
+    sort_keys, descending, cursor, limit = get_page_args(request.args, {
+        'id': [JobApplicant.id],
+        'name': [JobApplicant.applicant_name, JobApplicant.id]
+    }, default_sort='id', default_order='desc')
+    page = paginate(query, sort_keys, descending=descending, cursor=cursor, limit=limit)
     
     # Process applicants for display
     applicants = []
-    for applicant in job_applicants:
-        job = JobOpening.query.get(applicant.job_opening_id)
+    for applicant in page.items:
+        job = applicant.job_opening
         
         applicants.append({
             'id': applicant.id,
@@ -763,6 +954,7 @@ def recruitment_job_applicants():
     
     return render_template('modern/hr_dashboard.html', 
                           applicants=applicants,
+                          page=page,
                           active_page='recruitment_job_applicants',
                           section='Recruitment',
                           subsection='Job Applicants',
@@ -778,8 +970,8 @@ def performance_appraisals_list():
     
     # Get appraisal data
     appraisals = []
-    for appraisal in Appraisal.query.all():
-        employee = Employee.query.get(appraisal.employee_id)
+    for appraisal in list_query('appraisals').all():
+        employee = appraisal.employee
         appraisals.append({
             'id': appraisal.id,
             'employee_name': employee.employee_name if employee else 'Unknown',
@@ -877,21 +1069,12 @@ def reports_attendance():
         flash('You do not have permission to access this page.', 'danger')
         return redirect(url_for('index'))
     
-    # For demonstration, we'll use static data
+    from_date, to_date = get_report_range(request.args)
     report_data = {
-        'attendance_trend': [
-            {'month': 'Jan', 'present_percentage': 92},
-            {'month': 'Feb', 'present_percentage': 94},
-            {'month': 'Mar', 'present_percentage': 91},
-            {'month': 'Apr', 'present_percentage': 93},
-        ],
-        'department_attendance': [
-            {'department': 'Engineering', 'present_percentage': 94, 'absent_percentage': 6},
-            {'department': 'HR', 'present_percentage': 95, 'absent_percentage': 5},
-            {'department': 'Finance', 'present_percentage': 98, 'absent_percentage': 2},
-            {'department': 'Marketing', 'present_percentage': 90, 'absent_percentage': 10},
-            {'department': 'Operations', 'present_percentage': 93, 'absent_percentage': 7}
-        ]
+        'from_date': from_date,
+        'to_date': to_date,
+        'attendance_trend': get_attendance_trend(from_date, to_date),
+        'department_attendance': get_department_attendance(from_date, to_date)
     }
     
     return render_template('modern/hr_dashboard.html',
@@ -908,20 +1091,12 @@ def reports_leave():
         flash('You do not have permission to access this page.', 'danger')
         return redirect(url_for('index'))
     
-    # For demonstration, we'll use static data
+    from_date, to_date = get_report_range(request.args)
     report_data = {
-        'leave_utilization': [
-            {'month': 'Jan', 'days_taken': 45},
-            {'month': 'Feb', 'days_taken': 38},
-            {'month': 'Mar', 'days_taken': 52},
-            {'month': 'Apr', 'days_taken': 42},
-        ],
-        'leave_by_type': [
-            {'type': 'Casual Leave', 'days_taken': 142, 'percentage': 31.3},
-            {'type': 'Sick Leave', 'days_taken': 87, 'percentage': 19.2},
-            {'type': 'Paid Time Off', 'days_taken': 214, 'percentage': 47.2},
-            {'type': 'Unpaid Leave', 'days_taken': 12, 'percentage': 2.3}
-        ]
+        'from_date': from_date,
+        'to_date': to_date,
+        'leave_utilization': get_leave_utilization(from_date, to_date),
+        'leave_by_type': get_leave_by_type(from_date, to_date)
     }
     
     return render_template('modern/hr_dashboard.html',
@@ -938,21 +1113,12 @@ def reports_payroll():
         flash('You do not have permission to access this page.', 'danger')
         return redirect(url_for('index'))
     
-    # For demonstration, we'll use static data
+    from_date, to_date = get_report_range(request.args)
     report_data = {
-        'payroll_trend': [
-            {'month': 'Jan', 'amount': 158000},
-            {'month': 'Feb', 'amount': 159500},
-            {'month': 'Mar', 'amount': 160000},
-            {'month': 'Apr', 'amount': 162000},
-        ],
-        'department_payroll': [
-            {'department': 'Engineering', 'amount': 65000, 'percentage': 40.1},
-            {'department': 'HR', 'amount': 15000, 'percentage': 9.3},
-            {'department': 'Finance', 'amount': 28000, 'percentage': 17.3},
-            {'department': 'Marketing', 'amount': 32000, 'percentage': 19.8},
-            {'department': 'Operations', 'amount': 22000, 'percentage': 13.5}
-        ]
+        'from_date': from_date,
+        'to_date': to_date,
+        'payroll_trend': get_payroll_trend(from_date, to_date),
+        'department_payroll': get_payroll_by_department(from_date, to_date)
     }
     
     return render_template('modern/hr_dashboard.html',
@@ -970,52 +1136,40 @@ def attendance_monthly_report():
         flash('You do not have permission to access this page.', 'danger')
         return redirect(url_for('index'))
     
-    # For demonstration purposes
-    month = datetime.now().month
-    year = datetime.now().year
-    month_name = datetime.now().strftime('%B')
+    # Month defaults to the current one; filters narrow the employees reported
+    today = datetime.now()
+    year = request.args.get('year', today.year, type=int)
+    month = request.args.get('month', today.month, type=int)
+    if not MINYEAR <= year <= MAXYEAR:
+        year = today.year
+    if not 1 <= month <= 12:
+        month = today.month
+    department = request.args.get('department') or None
+    company = request.args.get('company') or None
     
-    # Get all employees
-    employees = Employee.query.filter_by(status='Active').all()
+    report = get_monthly_attendance_report(year, month, department=department, company=company)
     
-    # Create sample monthly data for each employee
-    import random
-    employees_data = []
-    for emp in employees:
-        present_days = random.randint(18, 22)
-        absent_days = random.randint(0, 3)
-        leave_days = random.randint(0, 3)
-        half_days = random.randint(0, 2)
-        
-        employee_data = {
-            'name': emp.employee_name,
-            'department': emp.department,
-            'present': present_days,
-            'absent': absent_days,
-            'leave': leave_days,
-            'half_day': half_days
-        }
-        employees_data.append(employee_data)
-    
-    attendance_data = {
-        'month': month_name,
-        'year': year,
-        'total_working_days': 21,
-        'attendance_summary': [
-            {'name': 'Present', 'count': 1100, 'percentage': 91.7},
-            {'name': 'Absent', 'count': 42, 'percentage': 3.5},
-            {'name': 'On Leave', 'count': 35, 'percentage': 2.9},
-            {'name': 'Half Day', 'count': 23, 'percentage': 1.9}
-        ],
-        'employees': employees_data
-    }
+    if request.args.get('format') == 'csv':
+        filename = f"attendance_{year}_{month:02d}.csv"
+        return Response(iter_report_csv(report), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    
+    previous_year, previous_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    report_filters = {'department': department, 'company': company}
     
     return render_template('modern/hr_dashboard.html',
                           active_page='attendance_monthly_report',
                           title='Monthly Attendance Report',
                           section='Attendance Management',
                           subsection='Monthly Report',
-                          data=attendance_data)
+                          month=report['month'],
+                          year=year,
+                          monthly_data=report['employees'],
+                          export_url=url_for('attendance_monthly_report', year=year, month=month,
+                                             format='csv', **report_filters),
+                          previous_url=url_for('attendance_monthly_report', year=previous_year,
+                                               month=previous_month, **report_filters),
+                          data=report)
 
 @app.route('/attendance/upload-bulk')
 @login_required
@@ -1043,6 +1197,36 @@ def attendance_upload_bulk():
                           subsection='Bulk Upload',
                           form=upload_form)
 
+@app.route('/api/attendance/bulk', methods=['POST'])
+@login_required
+def attendance_bulk_import():
+    if current_user.role != 'HR Manager' and current_user.role != 'Administrator':
+        return jsonify({"error": "Not permitted to import attendance"}), 403
+    
+    # Accept either a multipart file upload or the raw request body as a stream
+    upload = request.files.get('file')
+    try:
+        if upload:
+            fmt = detect_format(upload.mimetype, upload.filename, request.args.get('format'))
+            stream = upload.stream
+        else:
+            fmt = detect_format(request.mimetype, requested=request.args.get('format'))
+            stream = request.stream
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 415
+    
+    try:
+        batch_size = min(max(1, int(request.args.get('batch_size') or DEFAULT_BATCH_SIZE)), MAX_BATCH_SIZE)
+    except ValueError:
+        batch_size = DEFAULT_BATCH_SIZE
+    
+    report = import_attendance(iter_records(stream, fmt), batch_size=batch_size)
+    
+    if report['rows_written']:
+        invalidate_dashboard_snapshot()
+    
+    return jsonify(report)
+
 # Leave Management Additional Routes
 @app.route('/leave/leave-report')
 @login_required
@@ -1066,17 +1250,15 @@ def leave_report():
             'color': 'primary' if lt.is_paid_leave else 'warning'
         })
     
+    # Leave taken this year for every employee, read from the ledger in one scan
+    leaves_taken = get_leaves_taken(datetime.now().year)
+    
     # Create employee leave data
     employees_data = []
     for emp in employees:
         employee_leaves = []
         for lt in leave_types_list:
-            # Count approved leaves by type
-            taken = LeaveApplication.query.filter_by(
-                employee_id=emp.id,
-                leave_type_id=lt.id,
-                status='Approved'
-            ).count()
+            taken = leaves_taken.get((emp.id, lt.id), 0)
             
             employee_leaves.append({
                 'type': lt.name,
@@ -1149,10 +1331,26 @@ def payroll_salary_slips_list():
         flash('You do not have permission to access this page.', 'danger')
         return redirect(url_for('index'))
     
+    query = apply_filters(list_query('salary_slips'), {
+        'status': SalarySlip.status,
+        'employee_id': SalarySlip.employee_id
+    }, request.args)
+    query, invalid_dates = apply_date_filters(query, {
+        'from_date': lambda value: SalarySlip.start_date >= value,
+        'to_date': lambda value: SalarySlip.end_date <= value
+    }, request.args)
+    if invalid_dates:
+        flash(f"Ignored invalid date filter: {', '.join(invalid_dates)} (expected YYYY-MM-DD).", 'warning')
+    sort_keys, descending, cursor, limit = get_page_args(request.args, {
+        'end_date': [SalarySlip.end_date, SalarySlip.id],
+        'id': [SalarySlip.id]
+    }, default_sort='end_date', default_order='desc')
+    page = paginate(query, sort_keys, descending=descending, cursor=cursor, limit=limit)
+    
     # Get salary slip data
     salary_slips = []
-    for slip in SalarySlip.query.all():
-        employee = Employee.query.get(slip.employee_id)
+    for slip in page.items:
+        employee = slip.employee
         salary_slips.append({
             'id': slip.id,
             'employee_name': employee.employee_name if employee else 'Unknown',
@@ -1170,7 +1368,8 @@ def payroll_salary_slips_list():
                           title='Salary Slips',
                           section='Payroll Management',
                           subsection='Salary Slips',
-                          slips=salary_slips)
+                          slips=salary_slips,
+                          page=page)
 
 @app.route('/payroll/salary-structures')
 @login_required
@@ -1413,7 +1612,7 @@ def view_message(message_id):
 @login_required
 def get_employee_dashboard_data():
     # Get employee for current user
-    employee = Employee.query.filter_by(user_id=current_user.id).first()
+    employee = current_employee()
     if not employee:
         return jsonify({"error": "No employee record found"})
     
@@ -1474,42 +1673,36 @@ def get_hr_dashboard_data():
     if current_user.role != 'HR Manager' and current_user.role != 'Administrator':
         return jsonify({"error": "Access denied"})
     
-    # Basic counts
-    employee_count = Employee.query.filter_by(status='Active').count()
-    attendance_today = Attendance.query.filter_by(status='Present', attendance_date=datetime.now().date()).count()
-    leave_pending = LeaveApplication.query.filter_by(status='Open').count()
-    job_openings = JobOpening.query.filter_by(status='Open').count()
+    snapshot = get_dashboard_snapshot()
     
     # Department data
-    department_data = []
-    departments = Department.query.all()
-    for dept in departments:
-        dept_count = Employee.query.filter_by(department=dept.name, status='Active').count()
-        department_data.append({
-            "department": dept.name,
-            "count": dept_count
-        })
-    
-    # Attendance data for today
-    attendance_data = {
-        "present": Attendance.query.filter_by(status='Present', attendance_date=datetime.now().date()).count(),
-        "absent": Attendance.query.filter_by(status='Absent', attendance_date=datetime.now().date()).count(),
-        "on_leave": Attendance.query.filter_by(status='On Leave', attendance_date=datetime.now().date()).count(),
-        "half_day": Attendance.query.filter_by(status='Half Day', attendance_date=datetime.now().date()).count()
-    }
+    department_data = [
+        {"department": dept['name'], "count": dept['count']}
+        for dept in snapshot['department_distribution']
+    ]
     
     # Return data
     return jsonify({
-        "employee_count": employee_count,
-        "attendance_today": attendance_today,
-        "leave_pending": leave_pending,
-        "job_openings": job_openings,
+        "employee_count": snapshot['employee_count'],
+        "attendance_today": snapshot['attendance_data']['present'],
+        "leave_pending": snapshot['leave_pending'],
+        "job_openings": snapshot['job_openings'],
         "department_data": department_data,
-        "attendance_data": attendance_data
+        "attendance_data": snapshot['attendance_data']
     })
 
+@app.route('/api/hook-stats')
+@login_required
+def hook_stats():
+    # Counters are kept per process, so these cover the hooks run by this worker
+    if current_user.role != 'HR Manager' and current_user.role != 'Administrator':
+        return jsonify({"error": "Access denied"}), 403
+    
+    return jsonify({"pid": os.getpid(), "hooks": get_hook_stats()})
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        create_missing_indexes()
         add_test_data()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
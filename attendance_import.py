@@ -0,0 +1,295 @@
+"""
+Bulk Attendance Ingestion
+
+Biometric gateways and HR uploads push attendance as CSV or JSON lines.
+Records are read as a stream, validated against an in-memory index of
+employees and written in batches with the database's native upsert on
+(employee_id, attendance_date), so re-sending a punch updates the existing
+record instead of failing or duplicating it.
+
+Each record needs `employee` (the employee code), `attendance_date`
+(YYYY-MM-DD) and `status`; `check_in`, `check_out` (ISO datetime or HH:MM)
+and `working_hours` are optional.
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+from change_log import record_changes
+from report_rollups import ATTENDANCE, mark_stale_months
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Largest batch a caller may request
+MAX_BATCH_SIZE = 5000
+
+# Only this many row errors are returned in the report; all are counted
+MAX_REPORTED_ERRORS = 1000
+
+ATTENDANCE_STATUSES = ('Present', 'Absent', 'Half Day', 'On Leave')
+
+# Content types (and file extensions) accepted for each input format
+JSON_LINES_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+CSV_TYPES = ('text/csv', 'application/csv')
+
+def detect_format(content_type=None, filename=None, requested=None):
+    """Return 'csv' or 'jsonl' from an explicit format, a filename or a content type"""
+    if requested in ('csv', 'jsonl'):
+        return requested
+
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in ('jsonl', 'ndjson'):
+            return 'jsonl'
+        if extension == 'csv':
+            return 'csv'
+
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in JSON_LINES_TYPES:
+        return 'jsonl'
+    if content_type in CSV_TYPES:
+        return 'csv'
+
+    raise ValueError("Unsupported attendance format; send CSV or JSON lines")
+
+def iter_records(stream, fmt):
+    """
+    Yield (row_number, record) pairs from a binary stream without reading it whole
+
+    Malformed JSON lines are yielded as (row_number, ValueError) so they show
+    up in the error report instead of aborting the import. Input that cannot
+    be read at all (invalid UTF-8, broken CSV quoting) ends the stream with
+    one such error at the row where reading stopped.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    # Row numbers count the CSV header line, matching what spreadsheets show
+    row_number = 1 if fmt == 'csv' else 0
+    try:
+        if fmt == 'csv':
+            for record in csv.DictReader(text):
+                row_number += 1
+                yield row_number, record
+            return
+
+        for line in text:
+            row_number += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield row_number, ValueError("Each line must be a JSON object")
+                continue
+            yield row_number, record
+    except UnicodeDecodeError as e:
+        yield row_number + 1, ValueError(f"File is not valid UTF-8, import stopped here: {e}")
+    except csv.Error as e:
+        yield row_number + 1, ValueError(f"Malformed CSV, import stopped here: {e}")
+
+def load_employee_index():
+    """Map employee codes to primary keys with a single query"""
+    from app import db, Employee
+
+    return dict(db.session.query(Employee.employee_id, Employee.id).all())
+
+def _parse_time(value, attendance_date):
+    """Parse a check-in/out value given as an ISO datetime or a time of day"""
+    if value in (None, ''):
+        return None
+
+    value = str(value).strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.combine(attendance_date, datetime.strptime(value, fmt).time())
+        except ValueError:
+            continue
+
+    raise ValueError(f"Invalid time {value}")
+
+def validate_record(record, employee_index):
+    """Turn a raw record into attendance column values, raising ValueError when invalid"""
+    employee_code = str(record.get('employee') or record.get('employee_id') or '').strip()
+    if not employee_code:
+        raise ValueError("Missing employee")
+
+    employee_id = employee_index.get(employee_code)
+    if employee_id is None:
+        raise ValueError(f"Unknown employee {employee_code}")
+
+    try:
+        attendance_date = date.fromisoformat(str(record.get('attendance_date') or '').strip())
+    except ValueError:
+        raise ValueError(f"Invalid attendance_date {record.get('attendance_date')}")
+
+    status = str(record.get('status') or '').strip()
+    if status not in ATTENDANCE_STATUSES:
+        raise ValueError(f"Invalid status {status or '(empty)'}")
+
+    check_in = _parse_time(record.get('check_in'), attendance_date)
+    check_out = _parse_time(record.get('check_out'), attendance_date)
+    if check_in and check_out and check_out < check_in:
+        raise ValueError("check_out is before check_in")
+
+    working_hours = record.get('working_hours')
+    if working_hours not in (None, ''):
+        try:
+            working_hours = float(working_hours)
+        except ValueError:
+            raise ValueError(f"Invalid working_hours {working_hours}")
+    elif check_in and check_out:
+        working_hours = round((check_out - check_in).total_seconds() / 3600, 2)
+    else:
+        working_hours = None
+
+    return {
+        'employee_id': employee_id,
+        'attendance_date': attendance_date,
+        'status': status,
+        'check_in': check_in,
+        'check_out': check_out,
+        'working_hours': working_hours
+    }
+
+def _upsert_statement(rows):
+    """Build a dialect-native INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE for attendance rows"""
+    from app import db, Attendance
+
+    table = Attendance.__table__
+    dialect = db.engine.dialect.name
+    update_columns = ('status', 'check_in', 'check_out', 'working_hours')
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=['employee_id', 'attendance_date'],
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            **{column: stmt.inserted[column] for column in update_columns}
+        )
+
+    raise NotImplementedError(f"Bulk attendance upsert is not supported on {dialect}")
+
+def record_attendance_changes(rows):
+    """Log upserted rows for incremental sync; the upsert bypasses ORM events"""
+    from app import db, Attendance
+
+    keys = {(row['employee_id'], row['attendance_date']) for row in rows}
+    row_ids = db.session.query(Attendance.id).filter(
+        tuple_(Attendance.employee_id, Attendance.attendance_date).in_(keys)
+    ).all()
+    record_changes(db.session.connection(), Attendance.__tablename__, [row_id for row_id, in row_ids])
+
+def write_batch(rows):
+    """Upsert one batch of validated rows in its own transaction"""
+    from app import db
+
+    if not rows:
+        return 0
+
+    try:
+        db.session.execute(_upsert_statement(rows))
+        record_attendance_changes(rows)
+        mark_stale_months(db.session, ATTENDANCE, [row['attendance_date'] for row in rows])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
+
+def import_attendance(records, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Validate and upsert a stream of attendance records
+
+    Args:
+        records: Iterable of (row_number, record) pairs as yielded by iter_records
+        batch_size (int): Records written per INSERT statement and transaction
+
+    Returns:
+        dict: Counts, per-row errors and throughput in rows per second
+    """
+    started = time.monotonic()
+    employee_index = load_employee_index()
+
+    received = failed = written = 0
+    errors = []
+
+    # Pending rows keyed by (employee, date); a later record for the same day
+    # replaces an earlier one, since one statement may not upsert a key twice
+    pending = {}
+    pending_rows = {}
+
+    def record_error(row_number, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': row_number, 'error': message})
+
+    def flush():
+        nonlocal written
+        try:
+            written += write_batch(list(pending.values()))
+        except Exception as e:
+            for row_number in pending_rows.values():
+                record_error(row_number, f"Batch write failed: {e}")
+        pending.clear()
+        pending_rows.clear()
+
+    for row_number, record in records:
+        received += 1
+
+        if isinstance(record, Exception):
+            record_error(row_number, str(record))
+            continue
+
+        try:
+            row = validate_record(record, employee_index)
+        except ValueError as e:
+            record_error(row_number, str(e))
+            continue
+
+        key = (row['employee_id'], row['attendance_date'])
+        pending[key] = row
+        pending_rows[key] = row_number
+
+        if len(pending) >= batch_size:
+            flush()
+
+    flush()
+
+    elapsed = time.monotonic() - started
+    return {
+        'rows_received': received,
+        'rows_written': written,
+        'rows_failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors),
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(received / elapsed, 1) if elapsed > 0 else None
+    }
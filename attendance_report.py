@@ -0,0 +1,145 @@
+"""
+Monthly Attendance Report
+
+The employee x status matrix for a month is computed in one pass over the
+month's attendance: rows are grouped by employee with one conditional count
+per status column, and the result is outer-joined to the active employees
+(optionally limited to a department and/or company). The scan is served by
+a covering (attendance_date, status, employee_id) index, and only plain
+column tuples are fetched, so the HTML report and the CSV export are built
+from one row per employee.
+"""
+
+import calendar
+import csv
+import io
+from datetime import date
+
+from sqlalchemy import case, func, select
+
+# Attendance statuses in report column order, with the row keys the template reads
+STATUSES = (
+    ('Present', 'present_days'),
+    ('Absent', 'absent_days'),
+    ('Half Day', 'half_days'),
+    ('On Leave', 'leave_days'),
+)
+
+CSV_HEADER = ['Employee ID', 'Employee', 'Department', 'Company', 'Present Days', 'Absent Days',
+              'Half Days', 'Leave Days', 'Attendance (%)']
+
+# Rows written per chunk of a streamed CSV export
+CSV_CHUNK_ROWS = 1000
+
+def month_bounds(year, month):
+    """First and last day of a month"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+def working_days(year, month):
+    """Number of weekdays in a month"""
+    return sum(1 for week in calendar.monthcalendar(year, month) for day in week[:5] if day)
+
+def get_attendance_matrix(year, month, department=None, company=None):
+    """
+    Count attendance per employee and status for a month in one query
+
+    Returns:
+        list: (employee_id, name, department, company, *counts) tuples ordered by
+        employee, with one count per STATUSES entry
+    """
+    from app import db, Employee, Attendance
+
+    start, end = month_bounds(year, month)
+
+    counts = (
+        select(Attendance.employee_id.label('employee_id'),
+               *[func.sum(case((Attendance.status == status, 1), else_=0)).label(key)
+                 for status, key in STATUSES])
+        .where(Attendance.attendance_date.between(start, end))
+        .group_by(Attendance.employee_id)
+        .subquery()
+    )
+
+    statement = (
+        select(Employee.employee_id, Employee.first_name, Employee.last_name, Employee.department,
+               Employee.company, *[func.coalesce(counts.c[key], 0) for _, key in STATUSES])
+        .outerjoin(counts, counts.c.employee_id == Employee.id)
+        .where(Employee.status == 'Active')
+        .order_by(Employee.id)
+    )
+    if department:
+        statement = statement.where(Employee.department == department)
+    if company:
+        statement = statement.where(Employee.company == company)
+
+    return db.session.execute(statement).all()
+
+def get_monthly_attendance_report(year, month, department=None, company=None):
+    """
+    Build the monthly attendance report
+
+    Args:
+        year (int): Year
+        month (int): Month (1-12)
+        department (str, optional): Only employees of this department
+        company (str, optional): Only employees of this company
+
+    Returns:
+        dict: Per-employee rows, status totals and the month's working days
+    """
+    total_working_days = working_days(year, month)
+    keys = [key for _, key in STATUSES]
+
+    employees = []
+    totals = [0] * len(STATUSES)
+
+    for code, first_name, last_name, dept, comp, *counts in get_attendance_matrix(year, month, department, company):
+        row = {
+            'employee_id': code,
+            'employee_name': f"{first_name} {last_name or ''}".strip(),
+            'department': dept,
+            'company': comp,
+        }
+        row.update(zip(keys, counts))
+
+        # Half days count as half a day attended
+        attended = row['present_days'] + row['half_days'] / 2
+        row['attendance_percentage'] = round(attended * 100 / total_working_days, 1) if total_working_days else 0
+        employees.append(row)
+
+        for index, count in enumerate(counts):
+            totals[index] += count
+
+    marked = sum(totals)
+    summary = [{'name': status, 'count': count, 'percentage': round(count * 100 / marked, 1) if marked else 0}
+               for (status, _), count in zip(STATUSES, totals)]
+
+    return {
+        'month': calendar.month_name[month],
+        'year': year,
+        'total_working_days': total_working_days,
+        'attendance_summary': summary,
+        'employees': employees
+    }
+
+def iter_report_csv(report):
+    """Yield the report as CSV text in chunks of CSV_CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    writer.writerow(CSV_HEADER)
+
+    for index, row in enumerate(report['employees'], 1):
+        writer.writerow([row['employee_id'], row['employee_name'], row['department'], row['company'],
+                         row['present_days'], row['absent_days'], row['half_days'], row['leave_days'],
+                         row['attendance_percentage']])
+        if index % CSV_CHUNK_ROWS == 0:
+            yield flush()
+
+    yield flush()
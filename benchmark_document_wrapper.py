@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+DocumentWrapper Benchmark
+
+Measures the cost of wrapping rows in `frappe_compat.DocumentWrapper`, the
+object `get_doc`/`get_all` return for whole documents. Rows are loaded once
+from an in-memory SQLite database, then wrapped and read repeatedly so only
+the wrapper is timed. For comparison, `EagerWrapper` copies every column on
+construction the way the wrapper used to.
+
+Usage:
+    python benchmark_document_wrapper.py [--rows 100000] [--repeat 3]
+"""
+
+import argparse
+import os
+import time
+from datetime import date
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import inspect as sa_inspect
+
+class EagerWrapper:
+    """Previous wrapper behaviour: every column copied onto the wrapper when created"""
+
+    def __init__(self, model_obj):
+        self._model = model_obj
+        for column in sa_inspect(model_obj).mapper.column_attrs:
+            setattr(self, column.key, getattr(model_obj, column.key))
+
+def load_rows(rows):
+    """Create and load employee rows once"""
+    from app import app, db, Employee
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Employee.__table__.insert(), [
+            {'employee_id': f'BENCH{i:06d}', 'first_name': f'First{i}', 'last_name': 'Last',
+             'status': 'Active', 'department': 'Engineering', 'company': 'Example Company',
+             'date_of_joining': date(2020, 1, 1)}
+            for i in range(rows)
+        ])
+        db.session.commit()
+        objects = Employee.query.all()
+        db.session.expunge_all()
+
+    return objects
+
+def best_of(repeat, fn):
+    """Fastest of several runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run_benchmark(rows=100000, repeat=3):
+    """
+    Time wrapping and reading rows with both wrappers
+
+    Returns:
+        dict: Seconds per 100k rows for each wrapper and workload
+    """
+    from frappe_compat import DocumentWrapper
+
+    objects = load_rows(rows)
+    scale = 100000 / rows
+
+    def wrap(wrapper):
+        return lambda: [wrapper(obj) for obj in objects]
+
+    def wrap_and_read(wrapper):
+        return lambda: [(doc.employee_id, doc.status) for doc in map(wrapper, objects)]
+
+    results = {}
+    for name, wrapper in (('eager', EagerWrapper), ('lazy', DocumentWrapper)):
+        results[name] = {
+            'wrap': round(best_of(repeat, wrap(wrapper)) * scale, 4),
+            'wrap_and_read_2_fields': round(best_of(repeat, wrap_and_read(wrapper)) * scale, 4)
+        }
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DocumentWrapper cost per 100k rows')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows to wrap')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is kept')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.repeat)
+
+    print(f"Seconds per 100k rows ({args.rows} rows, best of {args.repeat})")
+    print(f"{'wrapper':<10}{'wrap':>12}{'wrap + read 2':>16}")
+    for name, timings in results.items():
+        print(f"{name:<10}{timings['wrap']:>12}{timings['wrap_and_read_2_fields']:>16}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+In-Process Caching Helpers for the HR Management System
+
+This module provides a small thread-safe, time-bounded cache used to hold
+precomputed values (dashboard snapshots, resolved identities, ...) between
+requests inside a single worker process.
+"""
+
+import threading
+import time
+
+_MISSING = object()
+
+class TTLCache:
+    """Thread-safe key/value cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl=60, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (defaults to the cache ttl)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            # Evict the entry closest to expiry when the cache is full
+            if self.maxsize and key not in self._data and len(self._data) >= self.maxsize:
+                oldest_key = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest_key]
+
+            self._data[key] = (expires_at, value)
+
+    def get_or_set(self, key, generator, ttl=None):
+        """Return the cached value for key, computing and storing it if needed"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = generator()
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop a single key, or every entry when key is None"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,73 @@
+"""
+Change Log for Incremental Sync
+
+While the Flask app and the Frappe site run side by side, `migrate_db.py
+--sync` keeps the Frappe tables current by copying only rows that changed.
+Rows of the tracked models written through the ORM are recorded in the
+`sync_change` table in the same flush that writes them, one entry per row
+and flush. Entry ids only grow, so they act as row versions: a sync applies
+the entries after the last id it applied, leaving the most recent ones
+(whose transactions may still be committing lower ids) for the next run,
+and then deletes the applied entries.
+
+Bulk Core statements (e.g. the attendance importer's upserts) bypass ORM
+events and call `record_changes()` themselves.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+# Tracked model classes mapped to their table names
+_tracked_models = {}
+
+def _insert_changes(connection, entries):
+    """Insert (table_name, row_id, operation) entries"""
+    from app import SyncChange
+
+    now = datetime.now()
+    rows = [{'table_name': table_name, 'row_id': row_id, 'operation': operation, 'changed_at': now}
+            for table_name, row_id, operation in entries if row_id is not None]
+    if rows:
+        connection.execute(SyncChange.__table__.insert(), rows)
+
+def record_changes(connection, table_name, row_ids, operation=UPSERT):
+    """Append change entries for rows of a table within the caller's transaction"""
+    _insert_changes(connection, [(table_name, row_id, operation) for row_id in row_ids])
+
+def collect_changes(session):
+    """Return {(table_name, row_id): operation} for tracked rows in a flush"""
+    changes = {}
+
+    for instance in session.new:
+        table_name = _tracked_models.get(type(instance))
+        if table_name:
+            changes[(table_name, instance.id)] = UPSERT
+
+    for instance in session.dirty:
+        table_name = _tracked_models.get(type(instance))
+        if table_name and session.is_modified(instance, include_collections=False):
+            changes[(table_name, instance.id)] = UPSERT
+
+    for instance in session.deleted:
+        table_name = _tracked_models.get(type(instance))
+        if table_name:
+            changes[(table_name, instance.id)] = DELETE
+
+    return changes
+
+def _after_flush(session, flush_context):
+    changes = collect_changes(session)
+    if changes:
+        _insert_changes(session.connection(),
+                        [(table_name, row_id, operation) for (table_name, row_id), operation in changes.items()])
+
+def register_change_log(session, models):
+    """Record changes to rows of the given models flushed through the session"""
+    for model in models:
+        _tracked_models[model] = model.__tablename__
+
+    event.listen(session, 'after_flush', _after_flush)
@@ -0,0 +1,89 @@
+"""
+HR Dashboard Snapshot Service
+
+This module computes every headline number shown on the HR dashboard
+(active headcount, per-department headcount, today's attendance histogram,
+pending leaves and open jobs) with a handful of grouped queries, and keeps
+the result in a time-bounded cache shared by the HTML and JSON views.
+
+Write paths that change these numbers call `invalidate_dashboard_snapshot()`.
+"""
+
+import os
+from datetime import datetime
+
+from sqlalchemy import and_, func, select
+
+from cache import TTLCache
+
+# Snapshots are refreshed at least this often, even without invalidation
+DASHBOARD_CACHE_TTL = int(os.environ.get('HR_DASHBOARD_CACHE_TTL', 60))
+
+_snapshot_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL, maxsize=4)
+
+def build_dashboard_snapshot(today=None):
+    """Compute the dashboard snapshot for the given day straight from the database"""
+    from app import db, Employee, Department, Attendance, LeaveApplication, JobOpening
+
+    today = today or datetime.now().date()
+
+    # Scalar headline counts in a single round trip
+    counts = db.session.execute(select(
+        select(func.count(Employee.id))
+            .where(Employee.status == 'Active')
+            .scalar_subquery().label('employee_count'),
+        select(func.count(LeaveApplication.id))
+            .where(LeaveApplication.status == 'Open')
+            .scalar_subquery().label('leave_pending'),
+        select(func.count(JobOpening.id))
+            .where(JobOpening.status == 'Open')
+            .scalar_subquery().label('job_openings'),
+    )).one()
+
+    # Active headcount per department, including departments with no employees
+    department_rows = db.session.execute(
+        select(Department.name, func.count(Employee.id))
+        .select_from(Department)
+        .outerjoin(Employee, and_(Employee.department == Department.name,
+                                  Employee.status == 'Active'))
+        .group_by(Department.id, Department.name)
+        .order_by(Department.id)
+    ).all()
+
+    # Today's attendance grouped by status
+    attendance_histogram = dict(db.session.execute(
+        select(Attendance.status, func.count(Attendance.id))
+        .where(Attendance.attendance_date == today)
+        .group_by(Attendance.status)
+    ).all())
+
+    return {
+        'date': today,
+        'generated_at': datetime.now(),
+        'employee_count': counts.employee_count,
+        'leave_pending': counts.leave_pending,
+        'job_openings': counts.job_openings,
+        'attendance_today': sum(attendance_histogram.values()),
+        'attendance_data': {
+            'present': attendance_histogram.get('Present', 0),
+            'absent': attendance_histogram.get('Absent', 0),
+            'on_leave': attendance_histogram.get('On Leave', 0),
+            'half_day': attendance_histogram.get('Half Day', 0)
+        },
+        'department_distribution': [
+            {'name': name, 'count': count} for name, count in department_rows
+        ]
+    }
+
+def get_dashboard_snapshot(force=False):
+    """Return the cached snapshot for today, rebuilding it when stale or forced"""
+    today = datetime.now().date()
+
+    if force:
+        _snapshot_cache.invalidate(today)
+
+    return _snapshot_cache.get_or_set(today, lambda: build_dashboard_snapshot(today))
+
+def invalidate_dashboard_snapshot():
+    """Drop cached snapshots so the next dashboard view recomputes them"""
+    _snapshot_cache.invalidate()
@@ -5,15 +5,19 @@ This module provides a compatibility layer that mimics Frappe API
 while using Flask and SQLAlchemy under the hood.
 """
 
-import importlib
 import json
 import inspect
 import datetime
+from contextlib import contextmanager
 from functools import wraps
-from flask import request, jsonify, g, current_app, session
+from flask import request, jsonify, g, current_app, session, has_request_context
 from flask_login import current_user
 from sqlalchemy import or_, and_, inspect as sa_inspect
 
+import hooks
+from frappe_filters import compile_query, normalize_filters
+from identity import get_identity
+
 # This will be initialized with the SQLAlchemy db instance
 db = None
 
@@ -141,27 +145,10 @@ class Document:
         
         # Query by filters
         elif filters:
-            query = model_class.query
-            
-            # Process filters
-            if isinstance(filters, dict):
-                for field, value in filters.items():
-                    if isinstance(value, (list, tuple)) and len(value) == 2:
-                        operator, operand = value
-                        if operator == '=':
-                            query = query.filter(getattr(model_class, field) == operand)
-                        elif operator == '!=':
-                            query = query.filter(getattr(model_class, field) != operand)
-                        elif operator == '>':
-                            query = query.filter(getattr(model_class, field) > operand)
-                        elif operator == '<':
-                            query = query.filter(getattr(model_class, field) < operand)
-                        # Add more operators as needed
-                    else:
-                        query = query.filter(getattr(model_class, field) == value)
+            statement, params = compile_query(model_class, filters, limit=1)
             
             # Get the first result
-            obj = query.first()
+            obj = db.session.execute(statement, params).scalars().first()
             if not obj:
                 raise ValueError(f"No {doctype} found for given filters")
             
@@ -171,98 +158,50 @@ class Document:
             raise ValueError("Either name or filters is required")
     
     @classmethod
-    def get_all(cls, doctype, filters=None, fields=None, order_by=None, limit=None, as_list=False):
-        """Get multiple documents based on filters"""
+    def get_all(cls, doctype, filters=None, fields=None, order_by=None, limit=None, as_list=False, pluck=None,
+                ignore_permissions=False):
+        """Get multiple documents based on filters, limited to those the current user may read"""
         model_class = cls.get_model_class(doctype)
         if not model_class:
             raise ValueError(f"DocType {doctype} not found")
         
-        # Start with a base query
-        query = model_class.query
-        
-        # Apply filters if provided
-        if filters:
-            if isinstance(filters, dict):
-                for field, value in filters.items():
-                    if isinstance(value, (list, tuple)) and len(value) >= 2:
-                        operator, operand = value[0], value[1]
-                        if operator == '=':
-                            query = query.filter(getattr(model_class, field) == operand)
-                        elif operator == '!=':
-                            query = query.filter(getattr(model_class, field) != operand)
-                        elif operator == '>':
-                            query = query.filter(getattr(model_class, field) > operand)
-                        elif operator == '<':
-                            query = query.filter(getattr(model_class, field) < operand)
-                        elif operator == 'in':
-                            query = query.filter(getattr(model_class, field).in_(operand))
-                        elif operator == 'not in':
-                            query = query.filter(~getattr(model_class, field).in_(operand))
-                        elif operator == 'like':
-                            query = query.filter(getattr(model_class, field).like(f"%{operand}%"))
-                    else:
-                        query = query.filter(getattr(model_class, field) == value)
-        
-        # Apply sorting
-        if order_by:
-            if isinstance(order_by, str):
-                # Handle 'field ASC' or 'field DESC'
-                parts = order_by.split()
-                if len(parts) > 1 and parts[1].upper() == 'DESC':
-                    query = query.order_by(getattr(model_class, parts[0]).desc())
-                else:
-                    query = query.order_by(getattr(model_class, parts[0]))
-            elif isinstance(order_by, (list, tuple)):
-                # Handle multiple sort criteria
-                sort_criteria = []
-                for criterion in order_by:
-                    if isinstance(criterion, str):
-                        parts = criterion.split()
-                        if len(parts) > 1 and parts[1].upper() == 'DESC':
-                            sort_criteria.append(getattr(model_class, parts[0]).desc())
-                        else:
-                            sort_criteria.append(getattr(model_class, parts[0]))
-                query = query.order_by(*sort_criteria)
-        
-        # Apply limit
-        if limit:
-            query = query.limit(limit)
-        
-        # Execute query
-        objects = query.all()
+        # Permission scoping is added as ordinary bound filters
+        if not ignore_permissions:
+            filters = apply_permission_filters(doctype, filters)
+            if filters is None:
+                return []
+        
+        # A single column comes back as a flat list of values
+        if pluck:
+            if not _are_columns(model_class, [pluck]):
+                return [row[0] for row in _read_attributes(model_class, filters, [pluck], order_by, limit)]
+            statement, params = compile_query(model_class, filters, columns=[pluck],
+                                              order_by=order_by, limit=limit)
+            return db.session.execute(statement, params).scalars().all()
+        
+        fields = _parse_fields(model_class, fields)
+        
+        # Fields that are not columns (e.g. the employee_name property) are
+        # read from loaded objects instead of being selected
+        if fields and not _are_columns(model_class, fields):
+            rows = _read_attributes(model_class, filters, fields, order_by, limit)
+            return rows if as_list else [dict(zip(fields, row)) for row in rows]
+        
+        # Whole documents are only loaded when no fields are requested
+        if not fields and not as_list:
+            statement, params = compile_query(model_class, filters, order_by=order_by, limit=limit)
+            objects = db.session.execute(statement, params).scalars().all()
+            return [cls._wrap_model(obj) for obj in objects]
+        
+        # Otherwise only the requested columns are selected, as plain rows
+        columns = fields or [column.key for column in sa_inspect(model_class).mapper.column_attrs]
+        statement, params = compile_query(model_class, filters, columns=columns,
+                                          order_by=order_by, limit=limit)
+        result = db.session.execute(statement, params)
         
-        # Return as list or dicts
         if as_list:
-            # Return as list of lists with only the requested fields
-            if fields:
-                result = []
-                for obj in objects:
-                    row = []
-                    for field in fields:
-                        row.append(getattr(obj, field, None))
-                    result.append(row)
-                return result
-            else:
-                # Return all fields if no specific fields requested
-                result = []
-                for obj in objects:
-                    inspector = sa_inspect(obj)
-                    row = [getattr(obj, column.key) for column in inspector.mapper.column_attrs]
-                    result.append(row)
-                return result
-        else:
-            # Return as list of wrapped objects or dicts with specific fields
-            if fields:
-                result = []
-                for obj in objects:
-                    doc = {}
-                    for field in fields:
-                        doc[field] = getattr(obj, field, None)
-                    result.append(doc)
-                return result
-            else:
-                # Return all fields as documents
-                return [cls._wrap_model(obj) for obj in objects]
+            return [list(row) for row in result]
+        return [dict(row) for row in result.mappings()]
     
     @classmethod
     def _wrap_model(cls, model_obj):
@@ -290,49 +229,28 @@ class Document:
         if not model_class:
             raise ValueError(f"DocType {doctype} not found")
         
-        # Build query based on filters
-        query = model_class.query
+        # Dict and list filters are compiled; anything else is a primary key
+        if not isinstance(filters, (dict, list, tuple)):
+            filters = {'id': filters}
         
-        if isinstance(filters, dict):
-            for field, value in filters.items():
-                query = query.filter(getattr(model_class, field) == value)
-        elif isinstance(filters, (list, tuple)):
-            # Handle list of conditions
-            conditions = []
-            for condition in filters:
-                if len(condition) >= 3:
-                    field, operator, value = condition
-                    if operator == '=':
-                        conditions.append(getattr(model_class, field) == value)
-                    elif operator == '!=':
-                        conditions.append(getattr(model_class, field) != value)
-                    # Add more operators as needed
-            if conditions:
-                query = query.filter(and_(*conditions))
+        # Only the requested columns are selected; other fields are read
+        # from the loaded object
+        fields = list(fieldname) if isinstance(fieldname, (list, tuple)) else [fieldname]
+        if _are_columns(model_class, fields):
+            statement, params = compile_query(model_class, filters, columns=fields, limit=1)
+            row = db.session.execute(statement, params).first()
         else:
-            # Assume it's a primary key
-            query = query.filter(model_class.id == filters)
+            rows = _read_attributes(model_class, filters, fields, limit=1)
+            row = rows[0] if rows else None
         
-        # Execute query
-        obj = query.first()
-        
-        if not obj:
+        if row is None:
             return None
         
-        # Handle the result
         if as_dict:
-            if isinstance(fieldname, (list, tuple)):
-                result = {}
-                for field in fieldname:
-                    result[field] = getattr(obj, field, None)
-                return result
-            else:
-                return {fieldname: getattr(obj, fieldname, None)}
-        else:
-            if isinstance(fieldname, (list, tuple)):
-                return [getattr(obj, field, None) for field in fieldname]
-            else:
-                return getattr(obj, fieldname, None)
+            return dict(zip(fields, row))
+        if isinstance(fieldname, (list, tuple)):
+            return list(row)
+        return row[0]
     
     @classmethod
     def db_count(cls, doctype, filters=None):
@@ -341,48 +259,138 @@ class Document:
         if not model_class:
             raise ValueError(f"DocType {doctype} not found")
         
-        # Build query based on filters
-        query = model_class.query
-        
-        if filters:
-            if isinstance(filters, dict):
-                for field, value in filters.items():
-                    query = query.filter(getattr(model_class, field) == value)
-        
-        # Return count
-        return query.count()
+        statement, params = compile_query(model_class, filters, count=True)
+        return db.session.execute(statement, params).scalar()
+
+def _parse_fields(model_class, fields):
+    """Normalize Frappe-style fields ("a, b", ["a", "b"] or "*") into a list of column names"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if '*' in fields:
+        return [column.key for column in sa_inspect(model_class).mapper.column_attrs]
+    return list(fields)
+
+def _are_columns(model_class, fields):
+    """Whether every field is a mapped column that can be selected"""
+    columns = sa_inspect(model_class).columns
+    return all(field in columns for field in fields)
+
+def _read_attributes(model_class, filters, fields, order_by=None, limit=None):
+    """Load matching objects and read fields from them, including properties; missing fields are None"""
+    statement, params = compile_query(model_class, filters, order_by=order_by, limit=limit)
+    objects = db.session.execute(statement, params).scalars().all()
+    return [[getattr(obj, field, None) for field in fields] for obj in objects]
+
+class UnitOfWork:
+    """Hooks waiting for the commit of an open `transaction()`"""
+    
+    def __init__(self):
+        self.after_commit = []
+    
+    def defer(self, fn, *args):
+        """Run fn(*args) once the transaction has committed"""
+        self.after_commit.append((fn, args))
+
+def current_transaction():
+    """The open unit of work of this app context, or None"""
+    return g.get('_unit_of_work')
+
+@contextmanager
+def transaction():
+    """
+    Group document writes into one commit
+    
+    Inside the block, insert/save/delete/db_set only flush their changes.
+    The block commits once at the end and rolls everything back if any
+    write or hook raises. `after_*` hooks are deferred until the commit has
+    succeeded and are dropped on rollback. A nested block joins the
+    outermost one.
+    
+        with transaction():
+            for row in rows:
+                new_doc("Attendance").update(row).insert()
+    """
+    unit = current_transaction()
+    if unit is not None:
+        yield unit
+        return
+    
+    unit = g._unit_of_work = UnitOfWork()
+    try:
+        yield unit
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        g._unit_of_work = None
+    
+    for fn, args in unit.after_commit:
+        fn(*args)
 
 class DocumentWrapper:
-    """Wrapper around SQLAlchemy model to provide Frappe-like document interface"""
+    """
+    Wrapper around SQLAlchemy model to provide Frappe-like document interface
+
+    Attribute reads are proxied to the model when accessed instead of being
+    copied on construction, so wrapping a row costs one small object. Fields
+    assigned through the wrapper are tracked as dirty; saving flushes only
+    those columns and skips the write entirely when nothing changed.
+
+    Each write commits on its own unless it runs inside `transaction()`.
+    """
     
-    def __init__(self, model_obj):
-        self._model = model_obj
-        self._doctype = model_obj.__class__.__name__
-        
-        # Set up attributes
-        self._setup_attributes()
+    __slots__ = ('_model', '_doctype', '_dirty')
     
-    def _setup_attributes(self):
-        """Set up attributes for easy access"""
-        # Map SQLAlchemy model attributes to this wrapper
-        for column in sa_inspect(self._model).mapper.column_attrs:
-            setattr(self, column.key, getattr(self._model, column.key))
+    def __init__(self, model_obj):
+        object.__setattr__(self, '_model', model_obj)
+        object.__setattr__(self, '_doctype', model_obj.__class__.__name__)
+        object.__setattr__(self, '_dirty', set())
     
     def __getattr__(self, name):
-        """Fallback for attributes not found"""
-        if hasattr(self._model, name):
+        """Read attributes from the model when they are accessed"""
+        if name in DocumentWrapper.__slots__:
+            raise AttributeError(name)
+        try:
             return getattr(self._model, name)
-        raise AttributeError(f"'{self._doctype}' object has no attribute '{name}'")
+        except AttributeError:
+            raise AttributeError(f"'{self._doctype}' object has no attribute '{name}'") from None
     
     def __setattr__(self, name, value):
-        """Set attributes"""
-        if name.startswith('_'):
-            super().__setattr__(name, value)
-        elif hasattr(self, '_model') and hasattr(self._model, name):
-            setattr(self._model, name, value)
-            super().__setattr__(name, value)  # Also update the wrapper
-        else:
-            super().__setattr__(name, value)
+        """Write attributes to the model and remember changed columns"""
+        if name in DocumentWrapper.__slots__:
+            object.__setattr__(self, name, value)
+            return
+        
+        setattr(self._model, name, value)
+        if name in sa_inspect(self._model).mapper.column_attrs:
+            self._dirty.add(name)
+    
+    def get(self, field, default=None):
+        """Get a field value, or default when it is not set"""
+        value = getattr(self._model, field, None)
+        return default if value is None else value
+    
+    def as_dict(self):
+        """Get all column values as a dict"""
+        return {column.key: getattr(self._model, column.key)
+                for column in sa_inspect(self._model).mapper.column_attrs}
+    
+    def get_dirty_fields(self):
+        """Get the fields changed since the document was loaded or last saved"""
+        return set(self._dirty)
+    
+    def has_value_changed(self, field):
+        """Check whether a field has been changed since it was loaded"""
+        return sa_inspect(self._model).attrs[field].history.has_changes()
+    
+    def update(self, values):
+        """Set several fields from a dict"""
+        for field, value in values.items():
+            setattr(self, field, value)
+        return self
     
     def insert(self, ignore_permissions=False):
         """Insert document into database"""
@@ -392,15 +400,13 @@ class DocumentWrapper:
                 if not self._model.has_permission(current_user, 'create'):
                     raise PermissionError(f"No permission to create {self._doctype}")
         
-        # Add to session and commit
-        db.session.add(self._model)
-        db.session.commit()
-        
-        # Update attributes
-        self._setup_attributes()
-        
-        # Trigger after_insert hook if exists
-        self._trigger_hook('after_insert')
+        with transaction() as unit:
+            db.session.add(self._model)
+            db.session.flush()
+            self._dirty.clear()
+            
+            # Trigger after_insert hook once committed
+            unit.defer(self._trigger_hook, 'after_insert')
         
         return self
     
@@ -412,23 +418,24 @@ class DocumentWrapper:
                 if not self._model.has_permission(current_user, 'write'):
                     raise PermissionError(f"No permission to modify {self._doctype}")
         
-        # Trigger validate hook if exists
-        self._trigger_hook('validate')
-        
-        # Trigger before_save hook if exists
-        self._trigger_hook('before_save')
-        
-        # Commit changes
-        db.session.commit()
-        
-        # Update attributes
-        self._setup_attributes()
-        
-        # Trigger after_save hook if exists
-        self._trigger_hook('after_save')
-        
-        # Trigger on_update hook if exists
-        self._trigger_hook('on_update')
+        with transaction() as unit:
+            # Trigger validate hook if exists
+            self._trigger_hook('validate')
+            
+            # Trigger before_save hook if exists
+            self._trigger_hook('before_save')
+            
+            # The flush issues an UPDATE of the changed columns only; an
+            # unchanged document is not written at all
+            db.session.add(self._model)
+            db.session.flush()
+            self._dirty.clear()
+            
+            # Trigger on_update hook if exists
+            self._trigger_hook('on_update')
+            
+            # Trigger after_save hook once committed
+            unit.defer(self._trigger_hook, 'after_save')
         
         return self
     
@@ -440,29 +447,31 @@ class DocumentWrapper:
                 if not self._model.has_permission(current_user, 'delete'):
                     raise PermissionError(f"No permission to delete {self._doctype}")
         
-        # Trigger before_delete hook if exists
-        self._trigger_hook('before_delete')
-        
-        # Delete and commit
-        db.session.delete(self._model)
-        db.session.commit()
-        
-        # Trigger after_delete hook if exists
-        self._trigger_hook('after_delete')
+        with transaction() as unit:
+            # Trigger before_delete hook if exists
+            self._trigger_hook('before_delete')
+            
+            db.session.delete(self._model)
+            db.session.flush()
+            self._dirty.clear()
+            
+            # Trigger after_delete hook once committed
+            unit.defer(self._trigger_hook, 'after_delete')
         
         return True
     
     def db_set(self, field, value, update_modified=True):
         """Set a database field value"""
-        setattr(self._model, field, value)
-        db.session.commit()
-        setattr(self, field, value)  # Also update the wrapper
+        with transaction():
+            setattr(self._model, field, value)
+            db.session.flush()
+        self._dirty.discard(field)
         return self
     
     def reload(self):
-        """Reload document from database"""
+        """Reload document from database, discarding unsaved changes"""
         db.session.refresh(self._model)
-        self._setup_attributes()
+        self._dirty.clear()
         return self
     
     def _trigger_hook(self, hook_name):
@@ -473,27 +482,13 @@ class DocumentWrapper:
             if callable(method):
                 method()
         
-        # Also check global hooks
-        # This would need to be expanded based on how hooks are registered
-        from hooks import trigger_hook
-        trigger_hook(self._doctype, hook_name, self)
+        # Also run hooks registered in hooks.doc_events
+        hooks.trigger_hook(self._doctype, hook_name, self)
 
 # Hook system for document events
 def trigger_hook(doctype, event, doc):
     """Trigger hooks for document events"""
-    from hooks import doc_events
-    
-    if doctype in doc_events and event in doc_events[doctype]:
-        method_path = doc_events[doctype][event]
-        module_path, method_name = method_path.rsplit('.', 1)
-        
-        try:
-            module = importlib.import_module(module_path)
-            method = getattr(module, method_name)
-            return method(doc)
-        except (ImportError, AttributeError) as e:
-            current_app.logger.error(f"Error triggering hook {doctype}.{event}: {e}")
-            return None
+    return hooks.trigger_hook(doctype, event, doc)
 
 # Add more Frappe-like functions as needed
 def get_meta(doctype):
@@ -555,6 +550,72 @@ def db_count(*args, **kwargs):
     return Document.db_count(*args, **kwargs)
 
 # Frappe-like utility functions
+
+# Doctypes HR Managers may access without document checks
+HR_DOCTYPES = frozenset(['Employee', 'Attendance', 'Leave Application', 'Salary Slip',
+                         'Job Opening', 'Job Applicant', 'Appraisal'])
+
+# Column linking a doctype's rows to the employee they belong to
+OWNER_COLUMNS = {
+    'Attendance': 'employee_id',
+    'Leave Application': 'employee_id',
+    'Salary Slip': 'employee_id',
+    'Appraisal': 'employee_id'
+}
+
+def get_permission_filters(doctype, user=None):
+    """
+    Filters that limit a doctype to the rows a user may read
+    
+    Outside a request there is no user to scope by and nothing is filtered.
+    Doctypes without role_permissions rules (masters such as Department or
+    Leave Type) are readable by every signed-in user, except User, where
+    only the user's own account is.
+    
+    Returns:
+        list: [] when every row is readable, [[field, '=', value]] when only
+        the user's own rows are, or None when none are
+    """
+    if user is None:
+        if not has_request_context():
+            return []
+        user = current_user
+    
+    if not getattr(user, 'is_authenticated', False):
+        return None
+    
+    role = getattr(user, 'role', None)
+    if role == 'Administrator' or (role == 'HR Manager' and doctype in HR_DOCTYPES):
+        return []
+    
+    if doctype == 'User':
+        return [['id', '=', user.id]]
+    
+    if doctype not in hooks.ROLE_SCOPED_DOCTYPES:
+        return []
+    
+    if not hooks.check_role_permissions(user, doctype, 'read'):
+        return None
+    
+    if not hooks.is_owner_only(role, doctype):
+        return []
+    
+    # Own rows are matched by the employee linked to the user
+    if doctype == 'Employee':
+        return [['user_id', '=', user.id]]
+    
+    employee = get_identity(user.id).employee
+    if doctype not in OWNER_COLUMNS or employee is None:
+        return None
+    return [[OWNER_COLUMNS[doctype], '=', employee.id]]
+
+def apply_permission_filters(doctype, filters=None, user=None):
+    """Combine Frappe-style filters with the user's permission filters; None when nothing is readable"""
+    permission_filters = get_permission_filters(doctype, user)
+    if permission_filters is None:
+        return None
+    return [list(condition) for condition in normalize_filters(filters)] + permission_filters
+
 def has_permission(doctype, ptype="read", doc=None, user=None):
     """Check if user has permission on doctype"""
     if not user:
@@ -571,9 +632,7 @@ def has_permission(doctype, ptype="read", doc=None, user=None):
     
     # HR Manager has permission on most HR doctypes
     if hasattr(user, 'role') and user.role == 'HR Manager':
-        hr_doctypes = ['Employee', 'Attendance', 'Leave Application', 'Salary Slip', 
-                       'Job Opening', 'Job Applicant', 'Appraisal']
-        if doctype in hr_doctypes:
+        if doctype in HR_DOCTYPES:
             return True
     
     # Check document-specific permissions
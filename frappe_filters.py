@@ -0,0 +1,241 @@
+"""
+Frappe Filter Compiler for the Compatibility Layer
+
+Frappe-style filters - `{"status": "Open"}`, `{"date": ["between", [a, b]]}`,
+`[["status", "in", ["Open", "Hold"]]]` - are compiled into SQLAlchemy
+statements with bound parameters. Compiled statements are cached per
+(model, filter shape, selected columns, order, limit), so repeated calls
+with the same shape only bind new values and every condition runs in SQL.
+
+Supported operators: =, !=, <>, >, <, >=, <=, in, not in, like, not like,
+between, is ("set" / "not set").
+"""
+
+import datetime
+from functools import lru_cache
+
+from sqlalchemy import and_, bindparam, func, or_, select, inspect as sa_inspect
+from sqlalchemy.types import String
+
+OPERATORS = ('=', '!=', '<>', '>', '<', '>=', '<=', 'in', 'not in', 'like', 'not like', 'between', 'is')
+
+# Compiled statements kept per process
+STATEMENT_CACHE_SIZE = 512
+
+class FilterError(ValueError):
+    """Raised for filters that reference unknown fields or operators"""
+
+def normalize_filters(filters):
+    """
+    Turn dict or list filters into a list of (field, operator, value) conditions
+
+    Accepts {field: value}, {field: [operator, value]}, [[field, operator, value]]
+    and [[doctype, field, operator, value]].
+    """
+    if not filters:
+        return []
+
+    conditions = []
+    if isinstance(filters, dict):
+        for field, value in filters.items():
+            if isinstance(value, (list, tuple)) and len(value) >= 2 and str(value[0]).lower() in OPERATORS:
+                conditions.append((field, str(value[0]).lower(), value[1]))
+            elif value is None:
+                conditions.append((field, 'is', 'not set'))
+            else:
+                conditions.append((field, '=', value))
+        return conditions
+
+    for condition in filters:
+        if isinstance(condition, dict):
+            conditions.extend(normalize_filters(condition))
+            continue
+
+        if len(condition) == 4:
+            condition = condition[1:]
+        if len(condition) != 3:
+            raise FilterError(f"Invalid filter {condition}")
+
+        field, operator, value = condition
+        conditions.append((field, str(operator).lower(), value))
+
+    return conditions
+
+def _coerce(column, value):
+    """Convert ISO date strings to the Python type of date/datetime columns"""
+    if not isinstance(value, str):
+        return value
+
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(value[:10])
+    return value
+
+# Escape character of every compiled LIKE condition
+LIKE_ESCAPE = '\\'
+
+def _like_pattern(value):
+    """
+    Use the value as a LIKE pattern when it contains %, otherwise match it anywhere
+
+    Outside explicit patterns `_` (and the escape character) are matched
+    literally, so "EMP_1" does not also match "EMPX1".
+    """
+    value = str(value)
+    if '%' in value:
+        return value
+    for char in (LIKE_ESCAPE, '_'):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return f"%{value}%"
+
+def _condition_shape(operator, value):
+    """The part of a condition that changes the compiled SQL, as opposed to bound values"""
+    if operator == 'is':
+        return str(value).lower()
+    return None
+
+def bind_values(model, conditions):
+    """Build the bound parameter values for normalized conditions"""
+    params = {}
+    for index, (field, operator, value) in enumerate(conditions):
+        column = getattr(model, field)
+        name = f"p{index}"
+
+        if operator == 'is':
+            continue
+        elif operator in ('in', 'not in'):
+            if isinstance(value, str):
+                value = [item.strip() for item in value.split(',') if item.strip()]
+            params[name] = [_coerce(column, item) for item in value]
+        elif operator == 'between':
+            start, end = value
+            params[f"{name}_from"] = _coerce(column, start)
+            params[f"{name}_to"] = _coerce(column, end)
+        elif operator in ('like', 'not like'):
+            params[name] = _like_pattern(value)
+        else:
+            params[name] = _coerce(column, value)
+
+    return params
+
+def _column(model, field):
+    """Resolve a mapped column by name, rejecting anything that is not a column"""
+    if field not in sa_inspect(model).columns:
+        raise FilterError(f"Unknown field {field} for {model.__name__}")
+    return getattr(model, field)
+
+def _compile_condition(model, index, field, operator, shape):
+    """Build the SQL expression for one condition with bound parameters"""
+    column = _column(model, field)
+    name = f"p{index}"
+    param = bindparam(name)
+
+    if operator == '=':
+        return column == param
+    if operator in ('!=', '<>'):
+        return column != param
+    if operator == '>':
+        return column > param
+    if operator == '<':
+        return column < param
+    if operator == '>=':
+        return column >= param
+    if operator == '<=':
+        return column <= param
+    if operator == 'in':
+        return column.in_(bindparam(name, expanding=True))
+    if operator == 'not in':
+        return column.not_in(bindparam(name, expanding=True))
+    if operator == 'like':
+        return column.like(param, escape=LIKE_ESCAPE)
+    if operator == 'not like':
+        return column.not_like(param, escape=LIKE_ESCAPE)
+    if operator == 'between':
+        return column.between(bindparam(f"{name}_from"), bindparam(f"{name}_to"))
+    if operator == 'is':
+        # Frappe treats empty strings as "not set" as well
+        is_text = isinstance(column.type, String)
+        if shape == 'set':
+            return and_(column.is_not(None), column != '') if is_text else column.is_not(None)
+        if shape == 'not set':
+            return or_(column.is_(None), column == '') if is_text else column.is_(None)
+        raise FilterError(f"Operator 'is' expects 'set' or 'not set', got {shape}")
+
+    raise FilterError(f"Unsupported filter operator {operator}")
+
+def parse_order_by(model, order_by):
+    """Turn 'field desc, other asc' (or a list of such strings) into a tuple of (field, descending)"""
+    if not order_by:
+        return ()
+
+    criteria = order_by.split(',') if isinstance(order_by, str) else order_by
+    parsed = []
+    for criterion in criteria:
+        parts = criterion.split()
+        if not parts:
+            continue
+        _column(model, parts[0])
+        parsed.append((parts[0], len(parts) > 1 and parts[1].lower() == 'desc'))
+
+    return tuple(parsed)
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile(model, shape, columns, order, limit, count):
+    """Build a statement for a filter shape; cached so each shape is compiled once"""
+    conditions = [_compile_condition(model, index, field, operator, condition_shape)
+                  for index, (field, operator, condition_shape) in enumerate(shape)]
+
+    if count:
+        statement = select(func.count()).select_from(model)
+    elif columns:
+        statement = select(*[_column(model, field) for field in columns])
+    else:
+        statement = select(model)
+
+    if conditions:
+        statement = statement.where(and_(*conditions))
+
+    for field, descending in order:
+        column = getattr(model, field)
+        statement = statement.order_by(column.desc() if descending else column.asc())
+
+    if limit:
+        statement = statement.limit(limit)
+
+    return statement
+
+def compile_query(model, filters=None, columns=None, order_by=None, limit=None, count=False):
+    """
+    Compile Frappe-style filters into a cached statement and its parameters
+
+    Args:
+        model: SQLAlchemy model class
+        filters (dict|list, optional): Frappe-style filters
+        columns (list, optional): Select only these columns instead of whole rows
+        order_by (str|list, optional): 'field desc, field2 asc' style ordering
+        limit (int, optional): Maximum number of rows
+        count (bool): Select COUNT(*) of the matching rows instead
+
+    Returns:
+        tuple: (statement, params) ready for `db.session.execute(statement, params)`
+    """
+    conditions = normalize_filters(filters)
+    for field, operator, value in conditions:
+        if operator not in OPERATORS:
+            raise FilterError(f"Unsupported filter operator {operator}")
+
+    shape = tuple((field, operator, _condition_shape(operator, value)) for field, operator, value in conditions)
+    statement = _compile(model, shape, tuple(columns) if columns else None,
+                         parse_order_by(model, order_by), int(limit) if limit else None, count)
+
+    return statement, bind_values(model, conditions)
+
+def clear_statement_cache():
+    """Drop all compiled statements"""
+    _compile.cache_clear()
@@ -6,6 +6,7 @@ This module updates the Flask app to use the Frappe compatibility layer.
 
 import logging
 from frappe_compat import init_app, Document, whitelist, has_permission, msgprint, get_messages
+from hooks import init_hooks
 
 def init_frappe_compat(app, db):
     """Initialize Frappe compatibility layer with Flask app"""
@@ -14,6 +15,9 @@ def init_frappe_compat(app, db):
     # Initialize frappe_compat with db
     init_app(db)
     
+    # Resolve hook paths once; unresolvable ones are logged here
+    init_hooks()
+    
     # Add Frappe-like functions to the global namespace
     app.jinja_env.globals.update(
         has_permission=has_permission,
@@ -3,12 +3,21 @@ Hooks System for Flask-based HR Management System
 
 This module provides a hooks system similar to Frappe's hooks,
 allowing for event-driven programming and customization.
+
+Hook paths are resolved once, by `init_hooks()` at startup, into a dispatch
+table of callables; paths that do not resolve are reported then instead of
+on every event. Every dispatched call is counted and timed, see
+`get_hook_stats()`.
 """
 
 import importlib
 import logging
+import threading
+import time
 from flask import current_app
 
+from hrms.permission_rules import PTYPE_BITS, compile_role_permissions
+
 # Document Events
 # Hook on document methods and events
 doc_events = {
@@ -92,59 +101,178 @@ api_endpoints = {
     "Job Applicant": "hrms/api/job_applicant"
 }
 
+# Hook Dispatch
+
+# Registries resolved into the dispatch table
+HOOK_REGISTRIES = ('doc_events', 'permission_query_conditions', 'has_permission', 'scheduler_events')
+
+_dispatch_table = None
+
+# {method_path: {"calls": int, "errors": int, "total_seconds": float, "max_seconds": float}}
+hook_stats = {}
+_stats_lock = threading.Lock()
+
+def _resolve_method(method_path):
+    """Import the callable a hook path points to"""
+    module_path, method_name = method_path.rsplit('.', 1)
+    module = importlib.import_module(module_path)
+    method = getattr(module, method_name)
+    if not callable(method):
+        raise TypeError(f"{method_path} is not callable")
+    return method
+
+def _record_timing(method_path, seconds, failed):
+    with _stats_lock:
+        stats = hook_stats.get(method_path)
+        if stats is None:
+            stats = hook_stats[method_path] = {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+def _timed(method_path, method):
+    """Wrap a resolved hook so every call is counted and timed"""
+    def call(*args, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = method(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            _record_timing(method_path, time.perf_counter() - started, failed)
+
+    call.method_path = method_path
+    return call
+
+def build_dispatch_table():
+    """
+    Resolve every hook path in the registries into callables
+
+    Returns:
+        tuple: (table, errors) where table mirrors the registries with timed
+        callables in place of paths (None where a path did not resolve) and
+        errors is a list of (registry, method_path, message)
+    """
+    resolved = {}
+    errors = []
+
+    def resolve(registry, method_path):
+        if method_path not in resolved:
+            try:
+                resolved[method_path] = _timed(method_path, _resolve_method(method_path))
+            except Exception as e:
+                resolved[method_path] = None
+                errors.append((registry, method_path, str(e)))
+        return resolved[method_path]
+
+    table = {
+        "doc_events": {
+            doctype: {event: resolve("doc_events", method_path) for event, method_path in events.items()}
+            for doctype, events in doc_events.items()
+        },
+        "permission_query_conditions": {
+            doctype: resolve("permission_query_conditions", method_path)
+            for doctype, method_path in permission_query_conditions.items()
+        },
+        "has_permission": {
+            doctype: resolve("has_permission", method_path)
+            for doctype, method_path in has_permission.items()
+        },
+        "scheduler_events": {
+            frequency: [method for method in (resolve("scheduler_events", path) for path in paths) if method]
+            for frequency, paths in scheduler_events.items()
+        }
+    }
+
+    return table, errors
+
+def init_hooks():
+    """
+    Build the dispatch table once at startup and report unresolvable hooks
+
+    Returns:
+        list: (registry, method_path, message) for every hook that did not resolve
+    """
+    global _dispatch_table
+
+    table, errors = build_dispatch_table()
+    for registry, method_path, message in errors:
+        logging.error(f"Unresolvable hook in {registry}: {method_path}: {message}")
+
+    _dispatch_table = table
+
+    return errors
+
+def get_dispatch_table():
+    """The resolved dispatch table, built on first use if init_hooks() was not called"""
+    if _dispatch_table is None:
+        init_hooks()
+    return _dispatch_table
+
+def get_hook_stats():
+    """Per-hook call counts and timings, slowest total first"""
+    with _stats_lock:
+        stats = [dict(values, method=method_path) for method_path, values in hook_stats.items()]
+    return sorted(stats, key=lambda stats: stats["total_seconds"], reverse=True)
+
+def reset_hook_stats():
+    """Clear the per-hook counters"""
+    with _stats_lock:
+        hook_stats.clear()
+
 # Hook Functions
 
 def trigger_hook(doctype, event, doc):
     """Trigger hooks for document events"""
-    if doctype in doc_events and event in doc_events[doctype]:
-        method_path = doc_events[doctype][event]
-        return _call_hook_method(method_path, doc)
+    method = get_dispatch_table()["doc_events"].get(doctype, {}).get(event)
+    if method:
+        return method(doc)
     return None
 
 def trigger_permission_query(doctype, user=None):
     """Get permission query for doctype"""
-    if doctype in permission_query_conditions:
-        method_path = permission_query_conditions[doctype]
-        return _call_hook_method(method_path, user)
+    method = get_dispatch_table()["permission_query_conditions"].get(doctype)
+    if method:
+        return method(user)
     return None
 
 def trigger_has_permission(doctype, doc, user=None):
     """Check permission for document"""
-    if doctype in has_permission:
-        method_path = has_permission[doctype]
-        return _call_hook_method(method_path, doc, user)
+    method = get_dispatch_table()["has_permission"].get(doctype)
+    if method:
+        return method(doc, user)
     return None
 
-def _call_hook_method(method_path, *args, **kwargs):
-    """Helper to call a hook method from its string path"""
-    try:
-        module_path, method_name = method_path.rsplit('.', 1)
-        module = importlib.import_module(module_path)
-        method = getattr(module, method_name)
-        return method(*args, **kwargs)
-    except (ImportError, AttributeError) as e:
-        logging.error(f"Error calling hook method {method_path}: {e}")
-        return None
+def get_scheduled_methods(frequency):
+    """Get the resolved scheduler methods for a frequency such as "daily" """
+    return get_dispatch_table()["scheduler_events"].get(frequency, [])
+
+# Compiled Role Permissions
+# role_permissions is compiled by the same code as the Frappe app's rules, into
+# {(role, doctype): (all_records_mask, own_records_mask)}
+
+ROLE_PERMISSIONS = compile_role_permissions(role_permissions)
+
+# Doctypes named by at least one rule; reads of any other doctype are not scoped by role
+ROLE_SCOPED_DOCTYPES = frozenset(doctype for _, doctype in ROLE_PERMISSIONS)
+
+def is_owner_only(role, doctype, ptype="read"):
+    """Whether a role's permission on a doctype is limited to the user's own records"""
+    all_mask, own_mask = ROLE_PERMISSIONS.get((role, doctype), (0, 0))
+    bit = PTYPE_BITS.get(ptype, 0)
+    return not all_mask & bit and bool(own_mask & bit)
 
 def check_role_permissions(user, doctype, ptype):
     """Check if user has permission based on roles"""
     if not hasattr(user, 'role'):
         return False
     
-    user_role = user.role
-    if user_role in role_permissions:
-        for permission in role_permissions[user_role]:
-            if permission[0] == doctype and ptype in permission[1:]:
-                # Check for user-specific conditions
-                for item in permission[1:]:
-                    if isinstance(item, dict) and 'user' in item:
-                        if item['user'] == 'owner':
-                            # This requires the document to have a user_id or owner field
-                            # This is a placeholder and would need to be customized
-                            return True
-                return True
-    
-    return False
+    # Rules limited to the user's own records ({"user": "owner"}) are
+    # granted here; the document check narrows them down
+    all_mask, own_mask = ROLE_PERMISSIONS.get((user.role, doctype), (0, 0))
+    return bool((all_mask | own_mask) & PTYPE_BITS.get(ptype, 0))
 
 def init_scheduler(scheduler):
     """Initialize scheduler with tasks from hooks"""
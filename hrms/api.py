@@ -11,6 +11,16 @@ from frappe import _
 from frappe.utils import getdate, flt, cint, today
 import json
 from datetime import datetime, timedelta
+from hrms.pagination import get_keyset_page
+from hrms.permissions import apply_permission_filters, can_access_all, get_permission_criteria, get_user_permissions
+from hrms.org_chart import get_org_subtrees
+from hrms.hr.doctype.leave_balance_ledger.leave_balance_ledger import get_leaves_taken
+from hrms.hr.doctype.employee_hierarchy.employee_hierarchy import get_chain_of_command, is_report_of
+
+# Non-nullable fields list endpoints may be sorted by (keyset paging needs
+# a total order, so nullable fields are not offered)
+SALARY_SLIP_SORT_FIELDS = ("posting_date", "start_date", "end_date", "creation")
+JOB_OPENING_SORT_FIELDS = ("creation", "modified", "job_title")
 
 # ------------------------------------------------------
 # Employee APIs
@@ -60,13 +70,19 @@ def get_employee_details(employee_id=None, user=None):
     return employee
 
 @frappe.whitelist()
-def get_organization_chart(company=None, department=None):
+def get_organization_chart(company=None, department=None, root=None, depth=None):
     """
     Get organization chart
     
+    The chart is built from one query and cached per company and department.
+    Pass `depth` to load it incrementally: nodes below the limit come back
+    with `expandable` set and can be fetched later by passing them as `root`.
+    
     Args:
         company (str, optional): Company
         department (str, optional): Department
+        root (str, optional): Employee whose reports to return; all roots when omitted
+        depth (int, optional): Levels of reports to include; the whole tree when omitted
         
     Returns:
         dict: Organization chart data
@@ -74,41 +90,50 @@ def get_organization_chart(company=None, department=None):
     if not frappe.has_permission("Employee", "read"):
         frappe.throw(_("Not permitted to access organization chart"), frappe.PermissionError)
     
-    filters = {"status": "Active"}
-    if company:
-        filters["company"] = company
-    if department:
-        filters["department"] = department
+    return {"root_nodes": get_org_subtrees(company, department, root=root, depth=cint(depth))}
+
+@frappe.whitelist()
+def get_team(manager=None, max_depth=None):
+    """
+    Get everyone under a manager, direct and indirect, with their reporting line
     
-    employees = frappe.get_all("Employee", 
-        filters=filters,
-        fields=["name", "employee_name", "reports_to", "department", "designation", "user_id"],
-        order_by="reports_to asc, name asc"
-    )
+    Reads the Employee Hierarchy index, so the whole team comes from one
+    query however deep it is. Users without access to every Employee may
+    only query themselves or employees under them.
     
-    # Build the org chart
-    org_chart = {}
-    for emp in employees:
-        emp_id = emp.get("name")
-        org_chart[emp_id] = {
-            "id": emp_id,
-            "name": emp.get("employee_name"),
-            "designation": emp.get("designation"),
-            "department": emp.get("department"),
-            "children": []
-        }
-    
-    # Second pass to build the tree
-    root_nodes = []
-    for emp_id, emp_data in org_chart.items():
-        reports_to = frappe.get_value("Employee", emp_id, "reports_to")
+    Args:
+        manager (str, optional): Employee; the current user's employee when omitted
+        max_depth (int, optional): Only this many levels down; all levels when omitted
         
-        if reports_to and reports_to in org_chart:
-            org_chart[reports_to]["children"].append(emp_data)
-        else:
-            root_nodes.append(emp_data)
+    Returns:
+        dict: Team members nearest level first, and the manager's chain of command
+    """
+    own_employee = get_user_permissions().employee
+    manager = manager or own_employee
+    if not manager:
+        frappe.throw(_("No employee found for the current user"))
+    
+    if not can_access_all("Employee") and not (
+            own_employee and (manager == own_employee or is_report_of(manager, own_employee))):
+        frappe.throw(_("Not permitted to access this team"), frappe.PermissionError)
+    
+    conditions = ""
+    if cint(max_depth):
+        conditions = "AND link.depth <= %(max_depth)s"
+    
+    members = frappe.db.sql("""
+        SELECT emp.name, emp.employee_name, emp.designation, emp.department, emp.reports_to, link.depth
+        FROM `tabEmployee Hierarchy` link
+        JOIN `tabEmployee` emp ON emp.name = link.employee
+        WHERE link.ancestor = %(manager)s AND link.depth > 0 AND emp.status = 'Active' {0}
+        ORDER BY link.depth, emp.name
+    """.format(conditions), {"manager": manager, "max_depth": cint(max_depth)}, as_dict=True)
     
-    return {"root_nodes": root_nodes}
+    return {
+        "manager": manager,
+        "chain_of_command": get_chain_of_command(manager),
+        "members": members
+    }
 
 # ------------------------------------------------------
 # Attendance APIs
@@ -212,26 +237,30 @@ def get_monthly_attendance(employee_id, month, year):
     end_date = datetime(year, month, num_days).date()
     
     # Get attendance records for the month
+    filters = apply_permission_filters("Attendance", {
+        "employee": employee_id,
+        "attendance_date": ["between", [start_date, end_date]],
+        "docstatus": 1  # Submitted documents only
+    })
+    if filters is None:
+        frappe.throw(_("Not permitted to access attendance"), frappe.PermissionError)
+    
     attendance_records = frappe.get_all("Attendance",
-        filters={
-            "employee": employee_id,
-            "attendance_date": ["between", [start_date, end_date]],
-            "docstatus": 1  # Submitted documents only
-        },
+        filters=filters,
         fields=["name", "employee", "attendance_date", "status", "check_in", "check_out", "working_hours"]
     )
     
-    # Organize by date
+    # Organize by date and count statuses in one pass
     daily_attendance = {}
+    status_counts = {}
     for record in attendance_records:
         date_str = record.attendance_date.strftime("%Y-%m-%d")
         daily_attendance[date_str] = record
-    
-    # Calculate summary
-    present_count = len([r for r in attendance_records if r.status == "Present"])
-    absent_count = len([r for r in attendance_records if r.status == "Absent"])
-    half_day_count = len([r for r in attendance_records if r.status == "Half Day"])
-    leave_count = len([r for r in attendance_records if r.status == "On Leave"])
+        status_counts[record.status] = status_counts.get(record.status, 0) + 1
+    present_count = status_counts.get("Present", 0)
+    absent_count = status_counts.get("Absent", 0)
+    half_day_count = status_counts.get("Half Day", 0)
+    leave_count = status_counts.get("On Leave", 0)
     
     return {
         "employee": employee_id,
@@ -248,6 +277,113 @@ def get_monthly_attendance(employee_id, month, year):
         }
     }
 
+@frappe.whitelist()
+def get_monthly_attendance_report(month, year, department=None, company=None, export=None):
+    """
+    Get the attendance of all active employees for a month, counted per status
+    
+    The employee x status matrix comes from a single GROUP BY query, limited
+    to the attendance the user may read.
+    
+    Args:
+        month (int): Month (1-12)
+        year (int): Year
+        department (str, optional): Only employees of this department
+        company (str, optional): Only employees of this company
+        export (str, optional): "csv" to download the report instead
+        
+    Returns:
+        dict: Per-employee status counts and totals per status
+    """
+    import calendar
+    from frappe.query_builder.functions import Count
+    
+    if not frappe.has_permission("Attendance", "read"):
+        frappe.throw(_("Not permitted to access attendance"), frappe.PermissionError)
+    
+    month = cint(month)
+    year = cint(year)
+    
+    if month < 1 or month > 12:
+        frappe.throw(_("Invalid month"))
+    
+    num_days = calendar.monthrange(year, month)[1]
+    start_date = datetime(year, month, 1).date()
+    end_date = datetime(year, month, num_days).date()
+    
+    Employee = frappe.qb.DocType("Employee")
+    Attendance = frappe.qb.DocType("Attendance")
+    
+    # Employees and attendance are both limited to what the user may read
+    employee_criteria = get_permission_criteria("Employee", Employee)
+    attendance_criteria = get_permission_criteria("Attendance", Attendance)
+    
+    rows = []
+    if employee_criteria is not None and attendance_criteria is not None:
+        join_condition = ((Attendance.employee == Employee.name)
+            & (Attendance.docstatus == 1)
+            & Attendance.attendance_date.between(start_date, end_date))
+        for criterion in attendance_criteria:
+            join_condition &= criterion
+        
+        query = (frappe.qb.from_(Employee)
+            .left_join(Attendance).on(join_condition)
+            .select(Employee.name, Employee.employee_name, Employee.department, Employee.company,
+                Attendance.status, Count(Attendance.name))
+            .where(Employee.status == "Active")
+            .groupby(Employee.name, Employee.employee_name, Employee.department, Employee.company,
+                Attendance.status)
+            .orderby(Employee.name))
+        if department:
+            query = query.where(Employee.department == department)
+        if company:
+            query = query.where(Employee.company == company)
+        for criterion in employee_criteria:
+            query = query.where(criterion)
+        
+        rows = query.run()
+    
+    statuses = {"Present": "present", "Absent": "absent", "Half Day": "half_day", "On Leave": "on_leave"}
+    employees = {}
+    totals = dict.fromkeys(statuses.values(), 0)
+    
+    for employee, employee_name, emp_department, emp_company, status, count in rows:
+        row = employees.get(employee)
+        if row is None:
+            row = employees[employee] = frappe._dict(
+                employee=employee, employee_name=employee_name,
+                department=emp_department, company=emp_company
+            )
+            row.update(dict.fromkeys(statuses.values(), 0))
+        
+        if status in statuses:
+            row[statuses[status]] = count
+            totals[statuses[status]] += count
+    
+    for row in employees.values():
+        row.attendance_percentage = round((row.present + row.half_day / 2) / num_days * 100, 2) if num_days > 0 else 0
+    
+    if export == "csv":
+        from frappe.utils.csvutils import to_csv
+        
+        frappe.response["type"] = "download"
+        frappe.response["filename"] = "attendance_{0}_{1:02d}.csv".format(year, month)
+        frappe.response["filecontent"] = to_csv(
+            [["Employee", "Employee Name", "Department", "Company", "Present", "Absent",
+              "Half Day", "On Leave", "Attendance (%)"]] +
+            [[row.employee, row.employee_name, row.department, row.company, row.present, row.absent,
+              row.half_day, row.on_leave, row.attendance_percentage] for row in employees.values()]
+        )
+        return
+    
+    return {
+        "month": month,
+        "year": year,
+        "working_days": num_days,
+        "employees": list(employees.values()),
+        "summary": totals
+    }
+
 # ------------------------------------------------------
 # Leave APIs
 # ------------------------------------------------------
@@ -340,27 +476,14 @@ def get_leave_balance(employee_id, leave_type=None):
         fields=["name", "max_days_allowed", "is_paid_leave"]
     )
     
-    # Get leave allocations for this employee
-    from frappe.utils import getdate
-    
-    # Calculate for the current year
+    # Calculate for the current year from the leave balance ledger
     current_year = getdate(today()).year
-    start_date = getdate(f"{current_year}-01-01")
-    end_date = getdate(f"{current_year}-12-31")
+    leaves_taken = get_leaves_taken(employee_id, current_year)
     
     result = {}
     for lt in leave_types:
         leave_type_id = lt.get("name")
-        
-        # Get approved leave applications
-        taken_leaves = frappe.db.sql("""
-            SELECT SUM(total_leave_days) FROM `tabLeave Application`
-            WHERE employee = %s AND leave_type = %s 
-            AND status = 'Approved' AND docstatus = 1
-            AND (from_date BETWEEN %s AND %s OR to_date BETWEEN %s AND %s)
-        """, (employee_id, leave_type_id, start_date, end_date, start_date, end_date))
-        
-        taken_leaves = flt(taken_leaves[0][0]) if taken_leaves and taken_leaves[0][0] else 0
+        taken_leaves = flt(leaves_taken.get(leave_type_id))
         
         # Calculate balance
         max_allowed = lt.get("max_days_allowed") or 0
@@ -385,18 +508,23 @@ def get_leave_balance(employee_id, leave_type=None):
 # ------------------------------------------------------
 
 @frappe.whitelist()
-def get_salary_slip_list(employee_id=None, status=None, from_date=None, to_date=None):
+def get_salary_slip_list(employee_id=None, status=None, from_date=None, to_date=None,
+        sort_by="posting_date", sort_order="desc", cursor=None, page_length=None):
     """
-    Get list of salary slips
+    Get a page of salary slips
     
     Args:
         employee_id (str, optional): Employee ID
         status (str, optional): Status (Draft, Submitted, Cancelled)
         from_date (str, optional): From date
         to_date (str, optional): To date
+        sort_by (str, optional): One of SALARY_SLIP_SORT_FIELDS
+        sort_order (str, optional): asc or desc
+        cursor (str, optional): next_cursor of the previous page
+        page_length (int, optional): Page size
         
     Returns:
-        list: List of salary slips
+        dict: Page of salary slips with paging metadata
     """
     if not frappe.has_permission("Salary Slip", "read"):
         frappe.throw(_("Not permitted to access salary slips"), frappe.PermissionError)
@@ -418,15 +546,19 @@ def get_salary_slip_list(employee_id=None, status=None, from_date=None, to_date=
         to_date = getdate(to_date)
         filters.update({"end_date": ["<=", to_date]})
     
-    # Get salary slips
-    salary_slips = frappe.get_all("Salary Slip",
-        filters=filters,
+    if sort_by not in SALARY_SLIP_SORT_FIELDS:
+        sort_by = "posting_date"
+    
+    # Get one page of salary slips
+    return get_keyset_page("Salary Slip",
         fields=["name", "employee", "employee_name", "start_date", "end_date", 
                 "posting_date", "gross_pay", "total_deduction", "net_pay", "status"],
-        order_by="posting_date desc"
+        filters=filters,
+        sort_field=sort_by,
+        sort_order=sort_order,
+        cursor=cursor,
+        page_length=page_length
     )
-    
-    return salary_slips
 
 @frappe.whitelist()
 def generate_salary_slip(employee_id, start_date, end_date, salary_structure=None):
@@ -510,16 +642,21 @@ def generate_salary_slip(employee_id, start_date, end_date, salary_structure=Non
 # ------------------------------------------------------
 
 @frappe.whitelist()
-def get_job_openings(status=None, department=None):
+def get_job_openings(status=None, department=None, sort_by="creation", sort_order="desc",
+        cursor=None, page_length=None):
     """
-    Get list of job openings
+    Get a page of job openings
     
     Args:
         status (str, optional): Status (Open, Closed)
         department (str, optional): Department
+        sort_by (str, optional): One of JOB_OPENING_SORT_FIELDS
+        sort_order (str, optional): asc or desc
+        cursor (str, optional): next_cursor of the previous page
+        page_length (int, optional): Page size
         
     Returns:
-        list: List of job openings
+        dict: Page of job openings with paging metadata
     """
     if not frappe.has_permission("Job Opening", "read"):
         frappe.throw(_("Not permitted to access job openings"), frappe.PermissionError)
@@ -532,15 +669,19 @@ def get_job_openings(status=None, department=None):
     if department:
         filters["department"] = department
     
-    # Get job openings
-    job_openings = frappe.get_all("Job Opening",
-        filters=filters,
+    if sort_by not in JOB_OPENING_SORT_FIELDS:
+        sort_by = "creation"
+    
+    # Get one page of job openings
+    return get_keyset_page("Job Opening",
         fields=["name", "job_title", "status", "department", "designation", "publish",
                 "description", "application_deadline"],
-        order_by="application_deadline desc"
+        filters=filters,
+        sort_field=sort_by,
+        sort_order=sort_order,
+        cursor=cursor,
+        page_length=page_length
     )
-    
-    return job_openings
 
 @frappe.whitelist(allow_guest=True)
 def get_published_job_openings():
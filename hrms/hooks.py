@@ -65,7 +65,8 @@ website_generators = []
 # ------------
 
 # before_install = "hrms.install.before_install"
-# after_install = "hrms.install.after_install"
+after_install = "hrms.install.after_install"
+after_migrate = "hrms.install.after_migrate"
 
 # Desk Notifications
 # ------------------
@@ -178,9 +179,9 @@ role_permissions = {
         ["Appraisal", "read", "write", "create", "delete", "submit", "cancel", "amend"]
     ],
     "HR User": [
-        ["Employee", "read", "write", "create"],
-        ["Attendance", "read", "write", "create", "submit"],
-        ["Leave Application", "read", "write", "create", "submit"],
+        ["Employee", "read", {"user": "owner"}],
+        ["Attendance", "read", "write", "create", "delete", "submit", "cancel", "amend"],
+        ["Leave Application", "read", "write", "create", "delete", "submit", "cancel", "amend"],
         ["Salary Slip", "read"],
         ["Job Opening", "read", "write", "create"],
         ["Job Applicant", "read", "write", "create"],
@@ -188,8 +189,8 @@ role_permissions = {
     ],
     "Employee": [
         ["Employee", "read", {"user": "owner"}],
-        ["Attendance", "read", "write", "create", {"user": "owner"}],
-        ["Leave Application", "read", "write", "create", {"user": "owner"}],
+        ["Attendance", "read", "write", "create", "delete", "submit", "cancel", "amend", {"user": "owner"}],
+        ["Leave Application", "read", "write", "create", "delete", "submit", "cancel", "amend", {"user": "owner"}],
         ["Salary Slip", "read", {"user": "owner"}],
         ["Appraisal", "read", {"user": "owner"}]
     ]
@@ -9,6 +9,7 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import time_diff_in_hours, getdate, get_datetime
+from hrms.permissions import has_doc_permission, get_permission_query_conditions as get_doctype_permission_query_conditions
 
 class Attendance(Document):
     def validate(self):
@@ -77,86 +78,149 @@ class Attendance(Document):
             leave_app.status = "Open"
             leave_app.save()
 
-def mark_absent_for_unmarked_employees(company=None):
+# Absent records are inserted and committed this many at a time
+ABSENT_INSERT_CHUNK_SIZE = 1000
+
+def mark_absent_for_unmarked_employees(company=None, attendance_date=None, dry_run=False):
     """
     Mark absent for employees who haven't marked attendance
     
-    This is typically run as a scheduled job at the end of the day
+    This is typically run as a scheduled job at the end of the day. Without a
+    company, one background job is queued per company so companies are processed
+    in parallel; with dry_run the counts are computed inline and nothing is written.
     """
-    from datetime import datetime, timedelta
-    
-    today = frappe.utils.today()
-    yesterday = (datetime.strptime(today, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-    
-    # Get all active employees
-    employee_filter = {"status": "Active"}
-    if company:
-        employee_filter["company"] = company
-    
-    employees = frappe.get_all("Employee", filters=employee_filter, fields=["name", "employee_name"])
+    attendance_date = getdate(attendance_date) if attendance_date else \
+        frappe.utils.add_days(getdate(frappe.utils.today()), -1)
+    
+    if company is not None:
+        return mark_absent_for_company(company, attendance_date, dry_run=dry_run)
+    
+    # Employees without a company are processed as their own group ("")
+    companies = frappe.db.sql_list("""
+        SELECT DISTINCT IFNULL(company, '')
+        FROM `tabEmployee`
+        WHERE status = 'Active'
+    """)
+    
+    if dry_run:
+        return [mark_absent_for_company(c, attendance_date, dry_run=True) for c in companies]
+    
+    for c in companies:
+        frappe.enqueue(
+            "hrms.hr.doctype.attendance.attendance.mark_absent_for_company",
+            queue="long",
+            job_name=f"mark_absent_{c or 'no_company'}_{attendance_date}",
+            company=c,
+            attendance_date=attendance_date
+        )
+
+def get_unmarked_employees(attendance_date, company=None):
+    """
+    Get active employees with neither attendance nor approved leave on a date
     
-    # Get list of employees who already have attendance for yesterday
-    marked_attendance = frappe.get_all(
-        "Attendance",
-        filters={"attendance_date": yesterday, "docstatus": ("!=", 2)},
-        fields=["employee"]
-    )
+    A single anti-join replaces per-employee membership checks and leave lookups.
+    """
+    conditions = ""
+    if company is not None:
+        conditions = "AND IFNULL(emp.company, '') = %(company)s"
+    
+    return frappe.db.sql(f"""
+        SELECT emp.name, emp.employee_name, emp.company, emp.department
+        FROM `tabEmployee` emp
+        WHERE emp.status = 'Active'
+            {conditions}
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabAttendance` att
+                WHERE att.employee = emp.name
+                    AND att.attendance_date = %(attendance_date)s
+                    AND att.docstatus != 2
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabLeave Application` la
+                WHERE la.employee = emp.name
+                    AND la.from_date <= %(attendance_date)s
+                    AND la.to_date >= %(attendance_date)s
+                    AND la.status = 'Approved'
+                    AND la.docstatus = 1
+            )
+        ORDER BY emp.name
+    """, {"company": company, "attendance_date": attendance_date}, as_dict=True)
+
+def get_absent_attendance_names(employees, attendance_date):
+    """
+    Pick an unused name for each employee's Absent record on a date
     
-    marked_employees = [att.employee for att in marked_attendance]
+    Names follow the doctype's autoname format; when a cancelled record
+    already holds it, a numeric suffix is added the way amendments are named.
+    """
+    taken = set(frappe.db.sql_list("""
+        SELECT name FROM `tabAttendance`
+        WHERE employee IN %(employees)s AND attendance_date = %(attendance_date)s
+    """, {"employees": employees, "attendance_date": attendance_date}))
     
-    # Create absent attendance for employees without attendance records
+    names = {}
     for employee in employees:
-        if employee.name not in marked_employees:
-            # Check if employee was on approved leave
-            leave_application = frappe.db.exists(
-                "Leave Application",
-                {
-                    "employee": employee.name,
-                    "from_date": ("<=", yesterday),
-                    "to_date": (">=", yesterday),
-                    "status": "Approved",
-                    "docstatus": 1
-                }
-            )
-            
-            if leave_application:
-                # Skip creating absent record if on approved leave
-                continue
-            
-            # Create an absent attendance record
-            attendance = frappe.new_doc("Attendance")
-            attendance.employee = employee.name
-            attendance.employee_name = employee.employee_name
-            attendance.attendance_date = yesterday
-            attendance.status = "Absent"
-            attendance.company = company
-            attendance.insert(ignore_permissions=True)
-            attendance.submit()
+        name = base = f"ATTN-{employee}-{attendance_date}"
+        suffix = 0
+        while name in taken:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        names[employee] = name
+    return names
+
+def mark_absent_for_company(company, attendance_date, dry_run=False):
+    """Bulk insert submitted Absent attendance for one company's unmarked employees"""
+    attendance_date = getdate(attendance_date)
+    
+    # The checks Attendance.validate would run: get_unmarked_employees skips
+    # anyone already marked, and Absent records carry no check-in times
+    if attendance_date > getdate(frappe.utils.today()):
+        frappe.throw(_("Attendance cannot be marked for future dates"))
+    
+    employees = get_unmarked_employees(attendance_date, company)
+    
+    result = {
+        "company": company,
+        "attendance_date": str(attendance_date),
+        "unmarked": len(employees),
+        "inserted": 0,
+        "dry_run": bool(dry_run)
+    }
+    
+    if dry_run or not employees:
+        return result
+    
+    # Rows are written directly as submitted documents; Absent records have no
+    # on_submit side effects
+    now = frappe.utils.now_datetime()
+    user = frappe.session.user
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus",
+              "employee", "employee_name", "attendance_date", "status", "company", "department"]
+    
+    for start in range(0, len(employees), ABSENT_INSERT_CHUNK_SIZE):
+        chunk = employees[start:start + ABSENT_INSERT_CHUNK_SIZE]
+        names = get_absent_attendance_names([emp.name for emp in chunk], attendance_date)
+        values = [
+            (names[emp.name], user, now, now, user, 1,
+             emp.name, emp.employee_name, attendance_date, "Absent", emp.company, emp.department)
+            for emp in chunk
+        ]
+        
+        # A concurrent run may have taken a name in between; those rows are
+        # skipped, so only the rows stamped by this run are counted
+        frappe.db.bulk_insert("Attendance", fields, values, ignore_duplicates=True)
+        result["inserted"] += frappe.db.sql("""
+            SELECT COUNT(*) FROM `tabAttendance`
+            WHERE name IN %(names)s AND creation = %(now)s AND owner = %(user)s
+        """, {"names": list(names.values()), "now": now, "user": user})[0][0]
+        frappe.db.commit()
+    
+    return result
 
 def get_permission_query_conditions(user):
     """Get permission query conditions for attendance"""
-    if not user:
-        user = frappe.session.user
-    
-    if "HR Manager" in frappe.get_roles(user):
-        return ""
-    
-    employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
-    if employee:
-        return f'(`tabAttendance`.employee = "{employee}")'
-    
-    return "1=0"
+    return get_doctype_permission_query_conditions("Attendance", user)
 
 def has_permission(doc, user=None, ptype="read"):
     """Check permission for Attendance"""
-    if not user:
-        user = frappe.session.user
-    
-    if "HR Manager" in frappe.get_roles(user) or "HR User" in frappe.get_roles(user):
-        return True
-    
-    employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
-    if employee and doc.employee == employee:
-        return True
-    
-    return False
\ No newline at end of file
+    return has_doc_permission("Attendance", doc, ptype, user)
\ No newline at end of file
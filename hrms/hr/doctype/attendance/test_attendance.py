@@ -0,0 +1,65 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, getdate, today
+
+from hrms.hr.doctype.attendance.attendance import mark_absent_for_company
+
+class TestAttendance(FrappeTestCase):
+    def setUp(self):
+        self.company = "_Test Absent Company"
+        if not frappe.db.exists("Company", self.company):
+            frappe.get_doc({"doctype": "Company", "company_name": self.company,
+                            "default_currency": "INR"}).insert()
+        self.employee = frappe.get_doc({
+            "doctype": "Employee",
+            "first_name": "_Test Absent",
+            "company": self.company,
+            "status": "Active",
+            "gender": "Female",
+            "date_of_birth": "1990-01-01",
+            "date_of_joining": "2020-01-01"
+        }).insert()
+        self.attendance_date = getdate(add_days(today(), -1))
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def get_attendance(self):
+        return frappe.get_all("Attendance",
+            filters={"employee": self.employee.name, "attendance_date": self.attendance_date},
+            fields=["name", "status", "docstatus"], order_by="creation")
+
+    def test_marks_unmarked_employees_absent(self):
+        result = mark_absent_for_company(self.company, self.attendance_date)
+
+        self.assertEqual(result["inserted"], result["unmarked"])
+        self.assertEqual([(a.status, a.docstatus) for a in self.get_attendance()], [("Absent", 1)])
+
+    def test_skips_marked_employees(self):
+        mark_absent_for_company(self.company, self.attendance_date)
+        result = mark_absent_for_company(self.company, self.attendance_date)
+
+        self.assertEqual(result["unmarked"], 0)
+        self.assertEqual(result["inserted"], 0)
+
+    def test_marks_over_cancelled_attendance(self):
+        attendance = frappe.get_doc({
+            "doctype": "Attendance",
+            "employee": self.employee.name,
+            "attendance_date": self.attendance_date,
+            "status": "Present",
+            "company": self.company
+        }).insert()
+        attendance.submit()
+        attendance.cancel()
+
+        result = mark_absent_for_company(self.company, self.attendance_date)
+
+        self.assertEqual(result["inserted"], 1)
+        absent = [a for a in self.get_attendance() if a.docstatus == 1]
+        self.assertEqual(len(absent), 1)
+        self.assertEqual(absent[0].name, f"{attendance.name}-1")
+
+    def test_rejects_future_dates(self):
+        self.assertRaises(frappe.ValidationError, mark_absent_for_company,
+                          self.company, add_days(today(), 1))
@@ -8,12 +8,16 @@ which handles business logic and validations.
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from hrms.permissions import has_doc_permission, get_permission_query_conditions as get_doctype_permission_query_conditions, clear_employee_user_cache
+from hrms.org_chart import clear_org_chart_cache
+from hrms.hr.doctype.employee_hierarchy.employee_hierarchy import update_employee_hierarchy, remove_employee_hierarchy, is_report_of
 
 class Employee(Document):
     def validate(self):
         """Validate employee data"""
         self.validate_status()
         self.validate_dates()
+        self.validate_reports_to()
         self.update_employee_name()
     
     def validate_status(self):
@@ -36,12 +40,27 @@ class Employee(Document):
         if self.date_of_joining and self.date_of_joining > frappe.utils.today():
             frappe.throw(_("Date of Joining cannot be in the future."))
     
+    def validate_reports_to(self):
+        """An employee cannot report to themselves or to anyone under them"""
+        if not self.reports_to:
+            return
+        
+        if self.reports_to == self.name or (not self.is_new() and is_report_of(self.reports_to, self.name)):
+            frappe.throw(_("Employee cannot report to themselves or to one of their own reports."))
+    
     def update_employee_name(self):
         """Update full name based on first and last name"""
         self.employee_name = " ".join(filter(None, [self.first_name, self.last_name]))
     
     def on_update(self):
         """Updates after save"""
+        # The user linked to this employee, or their place in the org chart, may
+        # have changed; caches are dropped once the change is visible to others
+        self.clear_employee_caches()
+        
+        # Keep the reporting hierarchy index in step with reports_to
+        update_employee_hierarchy(self.name, self.reports_to)
+        
         # Update linked user if any
         if self.user_id:
             self.update_user()
@@ -60,6 +79,16 @@ class Employee(Document):
         # This would handle deactivation of the employee
         pass
     
+    def on_trash(self):
+        """Clean up before deletion"""
+        self.clear_employee_caches()
+        remove_employee_hierarchy(self.name)
+    
+    def clear_employee_caches(self):
+        """Drop caches built from Employee rows after the current transaction commits"""
+        frappe.db.after_commit.add(clear_employee_user_cache)
+        frappe.db.after_commit.add(clear_org_chart_cache)
+    
     def after_insert(self):
         """Run after insertion"""
         # Any post-creation activities
@@ -97,46 +126,11 @@ def get_timeline_data(doctype, name):
 
 def has_permission(doc, user=None, ptype="read"):
     """Check permissions for Employee"""
-    # Implement permission logic
-    if not user:
-        user = frappe.session.user
-    
-    # Administrator can do anything
-    if "Administrator" in frappe.get_roles(user):
-        return True
-    
-    # HR Manager can do anything with employees
-    if "HR Manager" in frappe.get_roles(user):
-        return True
-    
-    # Users can read their own employee records
-    if ptype == "read" and doc.user_id == user:
-        return True
-    
-    return False
+    return has_doc_permission("Employee", doc, ptype, user)
 
 def get_permission_query_conditions(user):
     """Return permission query conditions for this doctype"""
-    # Implement condition builder for permission queries
-    if not user:
-        user = frappe.session.user
-    
-    # Administrator sees all
-    if "Administrator" in frappe.get_roles(user):
-        return ""
-    
-    # HR Manager sees all
-    if "HR Manager" in frappe.get_roles(user):
-        return ""
-    
-    # Employee sees only their own
-    if "Employee" in frappe.get_roles(user):
-        employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
-        if employee:
-            return f"(`tabEmployee`.name = '{employee}')"
-    
-    # Default: see nothing
-    return "1=0"
+    return get_doctype_permission_query_conditions("Employee", user)
 
 @frappe.whitelist()
 def create_employee_from_user(user_id):
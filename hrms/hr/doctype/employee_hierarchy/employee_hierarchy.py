@@ -0,0 +1,216 @@
+"""
+Employee Hierarchy DocType Controller
+
+This module maintains a closure table of the reports_to hierarchy: one row
+for every employee and each of their direct or indirect managers, with the
+number of levels between them (plus a depth 0 row for the employee itself).
+"All reports under X", "chain of command of Y" and "how deep is Y" are then
+single indexed queries instead of walking reports_to one hop at a time.
+
+Employee.on_update calls update_employee_hierarchy, which moves the
+employee's whole subtree under its new manager with two set-based
+statements when reports_to changes. The table is filled from reports_to
+after install and after every migrate that finds it out of step with
+Employee, and managers missing from it are indexed on first use.
+"""
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import cint, now_datetime
+
+class EmployeeHierarchy(Document):
+    pass
+
+def on_doctype_update():
+    """Index the closure table for both directions of lookup"""
+    frappe.db.add_unique("Employee Hierarchy", ["ancestor", "employee"], constraint_name="unique_ancestor_employee")
+    frappe.db.add_index("Employee Hierarchy", ["ancestor", "depth"])
+    frappe.db.add_index("Employee Hierarchy", ["employee", "depth"])
+
+def get_hierarchy_name(ancestor, employee):
+    """Hierarchy rows are named after their key, matching the doctype's autoname format"""
+    return f"{ancestor}-{employee}"
+
+def update_employee_hierarchy(employee, reports_to=None):
+    """
+    Place an employee, with everyone under them, below reports_to in the current transaction
+
+    Does nothing when the index already records reports_to as the direct manager.
+    """
+    reports_to = reports_to or None
+    links = dict(frappe.db.sql("""
+        SELECT depth, ancestor
+        FROM `tabEmployee Hierarchy`
+        WHERE employee = %s AND depth <= 1
+    """, employee))
+
+    if 0 in links and links.get(1) == reports_to:
+        return
+
+    now = now_datetime()
+    values = {"employee": employee, "reports_to": reports_to, "user": frappe.session.user, "now": now}
+
+    if 0 not in links:
+        frappe.db.sql("""
+            INSERT INTO `tabEmployee Hierarchy`
+                (name, owner, creation, modified, modified_by, docstatus, ancestor, employee, depth)
+            VALUES (%(name)s, %(user)s, %(now)s, %(now)s, %(user)s, 0, %(employee)s, %(employee)s, 0)
+        """, dict(values, name=get_hierarchy_name(employee, employee)))
+
+    if reports_to:
+        index_reporting_line(reports_to)
+
+    if reports_to and is_report_of(reports_to, employee, include_self=True):
+        frappe.throw(_("Employee {0} cannot report to {1}, who is in their own reporting line").format(
+            employee, reports_to))
+
+    # Detach the subtree from every manager above the employee
+    if 1 in links:
+        frappe.db.sql("""
+            DELETE link
+            FROM `tabEmployee Hierarchy` link
+            JOIN `tabEmployee Hierarchy` subtree
+                ON subtree.employee = link.employee AND subtree.ancestor = %(employee)s
+            JOIN `tabEmployee Hierarchy` above
+                ON above.ancestor = link.ancestor AND above.employee = %(employee)s AND above.depth > 0
+        """, values)
+
+    # Link every manager from reports_to up to every employee in the subtree
+    if reports_to:
+        frappe.db.sql("""
+            INSERT INTO `tabEmployee Hierarchy`
+                (name, owner, creation, modified, modified_by, docstatus, ancestor, employee, depth)
+            SELECT CONCAT(above.ancestor, '-', subtree.employee), %(user)s, %(now)s, %(now)s, %(user)s, 0,
+                above.ancestor, subtree.employee, above.depth + subtree.depth + 1
+            FROM `tabEmployee Hierarchy` above
+            JOIN `tabEmployee Hierarchy` subtree ON subtree.ancestor = %(employee)s
+            WHERE above.employee = %(reports_to)s
+        """, values)
+
+def is_indexed(employee):
+    """Whether the closure table has an employee's own row"""
+    return bool(frappe.db.sql("""
+        SELECT 1
+        FROM `tabEmployee Hierarchy`
+        WHERE ancestor = %s AND employee = %s AND depth = 0
+        LIMIT 1
+    """, (employee, employee)))
+
+def index_reporting_line(employee):
+    """
+    Add an employee and the managers above them to the closure table where missing
+
+    The reporting line is read from reports_to up to the first manager
+    already indexed and then linked top down, one level at a time.
+    """
+    missing, seen = [], set()
+    while employee and employee not in seen and not is_indexed(employee):
+        seen.add(employee)
+        reports_to = frappe.db.get_value("Employee", employee, "reports_to")
+        missing.append((employee, reports_to))
+        employee = reports_to
+
+    for employee, reports_to in reversed(missing):
+        update_employee_hierarchy(employee, reports_to)
+
+def remove_employee_hierarchy(employee):
+    """Drop an employee's rows; their reports must have been moved to another manager already"""
+    frappe.db.sql("""
+        DELETE FROM `tabEmployee Hierarchy`
+        WHERE employee = %(employee)s OR ancestor = %(employee)s
+    """, {"employee": employee})
+
+def get_reports(manager, max_depth=None, include_self=False):
+    """
+    Get the employees under a manager in one query, nearest levels first
+
+    Args:
+        manager (str): Employee
+        max_depth (int, optional): Only this many levels down; all levels when omitted
+        include_self (bool): Include the manager's own row (depth 0)
+
+    Returns:
+        list: Employee names
+    """
+    conditions = ["ancestor = %(manager)s", "depth >= %(min_depth)s"]
+    if max_depth:
+        conditions.append("depth <= %(max_depth)s")
+
+    return frappe.db.sql_list("""
+        SELECT employee
+        FROM `tabEmployee Hierarchy`
+        WHERE {0}
+        ORDER BY depth, employee
+    """.format(" AND ".join(conditions)), {
+        "manager": manager,
+        "min_depth": 0 if include_self else 1,
+        "max_depth": cint(max_depth)
+    })
+
+def get_chain_of_command(employee):
+    """Get an employee's managers in one query, from the direct manager up to the top"""
+    return frappe.db.sql_list("""
+        SELECT ancestor
+        FROM `tabEmployee Hierarchy`
+        WHERE employee = %s AND depth > 0
+        ORDER BY depth
+    """, employee)
+
+def get_hierarchy_depth(employee):
+    """Levels between an employee and the top of their reporting line (0 for the top)"""
+    return cint(frappe.db.sql("""
+        SELECT MAX(depth)
+        FROM `tabEmployee Hierarchy`
+        WHERE employee = %s
+    """, employee)[0][0])
+
+def is_report_of(employee, manager, include_self=False):
+    """Whether an employee is somewhere under a manager"""
+    return bool(frappe.db.sql("""
+        SELECT 1
+        FROM `tabEmployee Hierarchy`
+        WHERE ancestor = %s AND employee = %s AND depth >= %s
+        LIMIT 1
+    """, (manager, employee, 0 if include_self else 1)))
+
+@frappe.whitelist()
+def rebuild_employee_hierarchy():
+    """
+    Rebuild the closure table from Employee.reports_to
+
+    Can be run with `bench execute hrms.hr.doctype.employee_hierarchy.employee_hierarchy.rebuild_employee_hierarchy`
+    """
+    frappe.only_for(["HR Manager", "System Manager"])
+    return build_employee_hierarchy()
+
+def build_employee_hierarchy():
+    """Replace the closure table with one built from Employee.reports_to; returns the rows written"""
+    managers = dict(frappe.db.sql("SELECT name, reports_to FROM `tabEmployee`"))
+
+    now = now_datetime()
+    user = frappe.session.user
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus", "ancestor", "employee", "depth"]
+
+    # Walk each employee's reporting line once; a manager seen twice means a
+    # cycle in reports_to, which is cut there
+    values = []
+    for employee in managers:
+        ancestor, depth, seen = employee, 0, set()
+        while ancestor in managers and ancestor not in seen:
+            seen.add(ancestor)
+            values.append((get_hierarchy_name(ancestor, employee), user, now, now, user, 0, ancestor, employee, depth))
+            ancestor, depth = managers.get(ancestor), depth + 1
+
+    frappe.db.sql("DELETE FROM `tabEmployee Hierarchy`")
+    frappe.db.bulk_insert("Employee Hierarchy", fields, values)
+    frappe.db.commit()
+
+    return len(values)
+
+def sync_employee_hierarchy():
+    """Build the closure table when it does not hold one row per employee, e.g. after install"""
+    employees = frappe.db.count("Employee")
+    indexed = frappe.db.count("Employee Hierarchy", {"depth": 0})
+    if employees != indexed:
+        build_employee_hierarchy()
@@ -0,0 +1,71 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from hrms.hr.doctype.employee_hierarchy.employee_hierarchy import (
+    build_employee_hierarchy, get_chain_of_command, get_hierarchy_depth, get_reports,
+    update_employee_hierarchy
+)
+
+def make_employee(first_name, reports_to=None):
+    return frappe.get_doc({
+        "doctype": "Employee",
+        "first_name": first_name,
+        "reports_to": reports_to,
+        "status": "Active",
+        "gender": "Male",
+        "date_of_birth": "1990-01-01",
+        "date_of_joining": "2020-01-01"
+    }).insert().name
+
+class TestEmployeeHierarchy(FrappeTestCase):
+    def setUp(self):
+        # A <- B <- C, A <- D
+        self.a = make_employee("_Test Hierarchy A")
+        self.b = make_employee("_Test Hierarchy B", self.a)
+        self.c = make_employee("_Test Hierarchy C", self.b)
+        self.d = make_employee("_Test Hierarchy D", self.a)
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_reports_and_chain_of_command(self):
+        self.assertEqual(get_reports(self.a), [self.b, self.d, self.c])
+        self.assertEqual(get_reports(self.a, max_depth=1), [self.b, self.d])
+        self.assertEqual(get_chain_of_command(self.c), [self.b, self.a])
+        self.assertEqual(get_hierarchy_depth(self.c), 2)
+
+    def test_moving_an_employee_moves_their_reports(self):
+        employee = frappe.get_doc("Employee", self.b)
+        employee.reports_to = self.d
+        employee.save()
+
+        self.assertEqual(get_chain_of_command(self.c), [self.b, self.d, self.a])
+        self.assertEqual(get_reports(self.d), [self.b, self.c])
+
+    def test_reporting_loops_are_rejected(self):
+        employee = frappe.get_doc("Employee", self.a)
+        employee.reports_to = self.c
+        self.assertRaises(frappe.ValidationError, employee.save)
+
+    def test_managers_missing_from_the_index_are_added(self):
+        frappe.db.delete("Employee Hierarchy")
+
+        e = make_employee("_Test Hierarchy E", self.c)
+
+        self.assertEqual(get_chain_of_command(e), [self.c, self.b, self.a])
+
+    def test_build_matches_incremental_updates(self):
+        rows = frappe.get_all("Employee Hierarchy", fields=["ancestor", "employee", "depth"],
+                              order_by="ancestor, employee")
+        frappe.db.delete("Employee Hierarchy")
+
+        build_employee_hierarchy()
+
+        rebuilt = frappe.get_all("Employee Hierarchy", fields=["ancestor", "employee", "depth"],
+                                 order_by="ancestor, employee")
+        self.assertEqual(rebuilt, rows)
+
+    def test_update_is_a_no_op_when_the_manager_is_unchanged(self):
+        before = frappe.db.count("Employee Hierarchy")
+        update_employee_hierarchy(self.c, self.b)
+        self.assertEqual(frappe.db.count("Employee Hierarchy"), before)
@@ -9,6 +9,8 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import date_diff, add_days, getdate, cint, flt, get_weekday
+from hrms.permissions import has_doc_permission, get_permission_query_conditions as get_doctype_permission_query_conditions
+from hrms.hr.doctype.leave_balance_ledger.leave_balance_ledger import update_leave_balance_ledger
 
 class LeaveApplication(Document):
     def validate(self):
@@ -111,14 +113,25 @@ class LeaveApplication(Document):
     
     def on_submit(self):
         """Actions when leave is submitted"""
-        # Update employee status if approved
+        # Update employee status and leave balance if approved
         if self.status == "Approved":
             self.update_employee_status()
+            self.update_leave_balance()
     
     def on_cancel(self):
         """Actions when leave is cancelled"""
         # Reset employee status
         self.update_employee_status(cancel=True)
+        
+        # Give back the days booked when the leave was approved
+        if self.status == "Approved":
+            self.update_leave_balance(cancel=True)
+    
+    def update_leave_balance(self, cancel=False):
+        """Book approved leave days in the leave balance ledger"""
+        days = flt(self.total_leave_days)
+        update_leave_balance_ledger(self.employee, self.leave_type, self.from_date,
+            -days if cancel else days)
     
     def update_employee_status(self, cancel=False):
         """Update employee status based on leave"""
@@ -183,42 +196,27 @@ def update_leave_status():
 
 def get_permission_query_conditions(user):
     """Get permission query conditions for leave application"""
-    if not user:
-        user = frappe.session.user
-    
-    if "HR Manager" in frappe.get_roles(user):
-        return ""
-    
-    employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
-    if employee:
-        return f'(`tabLeave Application`.employee = "{employee}")'
-    
-    return "1=0"
+    return get_doctype_permission_query_conditions("Leave Application", user)
 
 def has_permission(doc, user=None, ptype="read"):
     """Check permission for Leave Application"""
-    if not user:
-        user = frappe.session.user
-    
-    if "HR Manager" in frappe.get_roles(user) or "HR User" in frappe.get_roles(user):
-        return True
-    
-    employee = frappe.db.get_value("Employee", {"user_id": user}, "name")
-    if employee and doc.employee == employee:
-        return True
-    
-    return False
+    return has_doc_permission("Leave Application", doc, ptype, user)
 
 @frappe.whitelist()
 def get_leave_approver(employee):
     """Get the leave approver for an employee"""
-    # Check if reporting manager is set
-    reports_to = frappe.db.get_value("Employee", employee, "reports_to")
-    if reports_to:
-        # Get user ID of reporting manager
-        user_id = frappe.db.get_value("Employee", reports_to, "user_id")
-        if user_id and "HR User" in frappe.get_roles(user_id):
-            return user_id
+    # User ID of the reporting manager, read through the hierarchy index and
+    # from reports_to when the employee is not indexed yet
+    user_id = frappe.db.sql("""
+        SELECT manager.user_id
+        FROM `tabEmployee` emp
+        LEFT JOIN `tabEmployee Hierarchy` link ON link.employee = emp.name AND link.depth = 1
+        JOIN `tabEmployee` manager ON manager.name = COALESCE(link.ancestor, emp.reports_to)
+        WHERE emp.name = %s
+    """, employee)
+    user_id = user_id[0][0] if user_id else None
+    if user_id and "HR User" in frappe.get_roles(user_id):
+        return user_id
     
     # Fall back to HR Users
     hr_users = frappe.get_all(
@@ -0,0 +1,95 @@
+"""
+Leave Balance Ledger DocType Controller
+
+This module maintains approved leave days per employee, leave type and year.
+Leave Applications add their days when submitted as Approved and remove them
+when cancelled, so balances are read with a single indexed lookup. Leave is
+booked against the year of its from_date.
+"""
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import getdate, flt, now_datetime
+
+class LeaveBalanceLedger(Document):
+    pass
+
+def get_ledger_name(employee, leave_type, year):
+    """Ledger rows are named after their key, matching the doctype's autoname format"""
+    return f"{employee}-{leave_type}-{year}"
+
+def update_leave_balance_ledger(employee, leave_type, leave_date, days):
+    """
+    Add days (negative to remove) to an employee's ledger row in the current transaction
+
+    The increment is applied in SQL so concurrent approvals cannot overwrite each other.
+    """
+    if not flt(days):
+        return
+
+    year = getdate(leave_date).year
+    now = now_datetime()
+    user = frappe.session.user
+
+    frappe.db.sql("""
+        INSERT INTO `tabLeave Balance Ledger`
+            (name, owner, creation, modified, modified_by, docstatus,
+             employee, leave_type, year, leaves_taken)
+        VALUES (%(name)s, %(user)s, %(now)s, %(now)s, %(user)s, 0,
+             %(employee)s, %(leave_type)s, %(year)s, %(days)s)
+        ON DUPLICATE KEY UPDATE
+            leaves_taken = leaves_taken + VALUES(leaves_taken),
+            modified = VALUES(modified),
+            modified_by = VALUES(modified_by)
+    """, {
+        "name": get_ledger_name(employee, leave_type, year),
+        "user": user,
+        "now": now,
+        "employee": employee,
+        "leave_type": leave_type,
+        "year": year,
+        "days": flt(days)
+    })
+
+def get_leaves_taken(employee, year):
+    """Get {leave_type: days taken} for an employee and year in one query"""
+    return dict(frappe.db.sql("""
+        SELECT leave_type, leaves_taken
+        FROM `tabLeave Balance Ledger`
+        WHERE employee = %s AND year = %s
+    """, (employee, year)))
+
+@frappe.whitelist()
+def rebuild_leave_balance_ledger(year=None):
+    """
+    Reconcile the ledger from submitted, approved Leave Applications
+
+    Can be run with `bench execute hrms.hr.doctype.leave_balance_ledger.leave_balance_ledger.rebuild_leave_balance_ledger`
+    """
+    frappe.only_for(["HR Manager", "System Manager"])
+
+    conditions = ""
+    values = {"user": frappe.session.user, "now": now_datetime()}
+    if year:
+        conditions = "AND YEAR(from_date) = %(year)s"
+        values["year"] = int(year)
+
+    frappe.db.sql("""
+        DELETE FROM `tabLeave Balance Ledger` {0}
+    """.format("WHERE year = %(year)s" if year else ""), values)
+
+    frappe.db.sql("""
+        INSERT INTO `tabLeave Balance Ledger`
+            (name, owner, creation, modified, modified_by, docstatus,
+             employee, leave_type, year, leaves_taken)
+        SELECT CONCAT(employee, '-', leave_type, '-', YEAR(from_date)),
+            %(user)s, %(now)s, %(now)s, %(user)s, 0,
+            employee, leave_type, YEAR(from_date), SUM(IFNULL(total_leave_days, 0))
+        FROM `tabLeave Application`
+        WHERE status = 'Approved' AND docstatus = 1 {0}
+        GROUP BY employee, leave_type, YEAR(from_date)
+    """.format(conditions), values)
+
+    frappe.db.commit()
+
+    return frappe.db.count("Leave Balance Ledger", {"year": int(year)} if year else None)
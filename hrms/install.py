@@ -0,0 +1,13 @@
+"""
+Install and migrate hooks
+"""
+
+from hrms.hr.doctype.employee_hierarchy.employee_hierarchy import sync_employee_hierarchy
+
+def after_install():
+    """Index the reporting lines of employees that existed before the app"""
+    sync_employee_hierarchy()
+
+def after_migrate():
+    """Fill in the reporting hierarchy index if it is missing or out of step with Employee"""
+    sync_employee_hierarchy()
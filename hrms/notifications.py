@@ -319,11 +319,17 @@ def send_probation_ending_reminder():
     today_date = getdate(today())
     seven_days_later = add_days(today_date, 7)
     
+    # Reporting managers and their emails come from the hierarchy index in the
+    # same query, or from reports_to for employees not indexed yet
     employees = frappe.db.sql("""
-        SELECT name, employee_name, department, designation, date_of_joining, probation_end_date
-        FROM `tabEmployee`
-        WHERE status = 'Active'
-        AND probation_end_date BETWEEN %s AND %s
+        SELECT emp.name, emp.employee_name, emp.department, emp.designation, emp.date_of_joining,
+            emp.probation_end_date, manager.employee_name AS manager_name, manager_user.email AS manager_email
+        FROM `tabEmployee` emp
+        LEFT JOIN `tabEmployee Hierarchy` link ON link.employee = emp.name AND link.depth = 1
+        LEFT JOIN `tabEmployee` manager ON manager.name = COALESCE(link.ancestor, emp.reports_to)
+        LEFT JOIN `tabUser` manager_user ON manager_user.name = manager.user_id
+        WHERE emp.status = 'Active'
+        AND emp.probation_end_date BETWEEN %s AND %s
     """, (today_date, seven_days_later), as_dict=True)
     
     if not employees:
@@ -356,29 +362,23 @@ def send_probation_ending_reminder():
                     message=frappe.get_traceback())
         
         # Notify reporting manager if exists
-        reports_to = frappe.db.get_value("Employee", employee.name, "reports_to")
-        if reports_to:
-            manager = frappe.get_doc("Employee", reports_to)
-            if manager.user_id:
-                manager_email = frappe.db.get_value("User", manager.user_id, "email")
-                
-                if manager_email:
-                    message = f"""
-                    <p>Hello {manager.employee_name},</p>
-                    <p>This is a reminder that the probation period for your team member <strong>{employee.employee_name}</strong> 
-                    ({employee.designation}) is ending on 
-                    {frappe.format(employee.probation_end_date, {"fieldtype": "Date"})}.</p>
-                    <p>Please provide your feedback and recommendation to the HR department.</p>
-                    """
-                    
-                    try:
-                        frappe.sendmail(
-                            recipients=[manager_email],
-                            subject=_("Probation Period Ending: {0}").format(employee.employee_name),
-                            message=message,
-                            reference_doctype="Employee",
-                            reference_name=employee.name
-                        )
-                    except Exception:
-                        frappe.log_error(title=_("Failed to send probation reminder to manager"),
-                            message=frappe.get_traceback())
+        if employee.manager_email:
+            message = f"""
+            <p>Hello {employee.manager_name},</p>
+            <p>This is a reminder that the probation period for your team member <strong>{employee.employee_name}</strong> 
+            ({employee.designation}) is ending on 
+            {frappe.format(employee.probation_end_date, {"fieldtype": "Date"})}.</p>
+            <p>Please provide your feedback and recommendation to the HR department.</p>
+            """
+            
+            try:
+                frappe.sendmail(
+                    recipients=[employee.manager_email],
+                    subject=_("Probation Period Ending: {0}").format(employee.employee_name),
+                    message=message,
+                    reference_doctype="Employee",
+                    reference_name=employee.name
+                )
+            except Exception:
+                frappe.log_error(title=_("Failed to send probation reminder to manager"),
+                    message=frappe.get_traceback())
@@ -0,0 +1,158 @@
+# Copyright (c) 2023, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Organization chart service
+
+The reporting structure of a company (or one of its departments) is read
+with a single query and turned into an adjacency structure in one pass:
+node details by employee, direct reports by manager, and the roots - active
+employees whose manager is empty or outside the selection. Structures are
+kept in memory per site, company and department, and dropped in every
+process when any Employee changes (the same versioned scheme as the salary
+structure index).
+
+Trees are served a subtree at a time: from the roots or any employee, down
+to a depth limit. Nodes cut off by the limit carry `expandable` and their
+`child_count`, so a client can load a large organization incrementally by
+requesting those nodes as new roots.
+"""
+
+from __future__ import unicode_literals
+
+import frappe
+from frappe.utils import cint
+
+ORG_CHART_VERSION_KEY = "hrms:org_chart_version"
+
+# Levels returned when the caller sets no depth; 0 means the whole tree
+DEFAULT_DEPTH = 0
+MAX_DEPTH = 50
+
+# Site -> (version, {(company, department): OrgChart})
+_org_charts = {}
+
+class OrgChart(object):
+    """Adjacency structure of the active employees of a company/department"""
+
+    def __init__(self, nodes, children, roots):
+        self.nodes = nodes
+        self.children = children
+        self.roots = roots
+
+    @classmethod
+    def build(cls, company=None, department=None):
+        """Load the selected employees with one query and link them in a single pass"""
+        filters = {"status": "Active"}
+        if company:
+            filters["company"] = company
+        if department:
+            filters["department"] = department
+
+        employees = frappe.get_all("Employee",
+            filters=filters,
+            fields=["name", "employee_name", "reports_to", "department", "designation", "user_id"],
+            order_by="name asc"
+        )
+
+        nodes = {}
+        children = {}
+        for emp in employees:
+            nodes[emp.name] = {
+                "id": emp.name,
+                "name": emp.employee_name,
+                "designation": emp.designation,
+                "department": emp.department,
+                "user_id": emp.user_id
+            }
+            children.setdefault(emp.reports_to or None, []).append(emp.name)
+
+        # Employees reporting to no one, or to someone outside the selection,
+        # start a tree of their own
+        roots = []
+        for manager, reports in children.items():
+            if manager is None or manager not in nodes:
+                roots.extend(reports)
+        roots.sort()
+
+        return cls(nodes, children, roots)
+
+    def child_count(self, employee):
+        return len(self.children.get(employee, ()))
+
+    def subtree(self, employee, depth=DEFAULT_DEPTH):
+        """
+        Nested node of an employee with reports down to `depth` levels below it
+
+        A depth of 0 returns the whole subtree. Cycles in reports_to are cut
+        where an employee would appear under themselves.
+        """
+        root = self._node(employee)
+        stack = [(root, 1, frozenset([employee]))]
+
+        while stack:
+            node, level, ancestors = stack.pop()
+            if depth and level > depth:
+                node["expandable"] = node["child_count"] > 0
+                continue
+
+            for child in self.children.get(node["id"], ()):
+                if child in ancestors:
+                    continue
+                child_node = self._node(child)
+                node["children"].append(child_node)
+                stack.append((child_node, level + 1, ancestors | {child}))
+
+            node["expandable"] = False
+
+        return root
+
+    def _node(self, employee):
+        node = dict(self.nodes[employee])
+        node["child_count"] = self.child_count(employee)
+        node["children"] = []
+        return node
+
+def get_org_chart(company=None, department=None):
+    """Get the cached org chart of a company/department, rebuilding it when any employee has changed"""
+    version = frappe.cache().get_value(ORG_CHART_VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=10)
+        frappe.cache().set_value(ORG_CHART_VERSION_KEY, version)
+
+    cached = _org_charts.get(frappe.local.site)
+    if not cached or cached[0] != version:
+        cached = _org_charts[frappe.local.site] = (version, {})
+
+    key = (company or None, department or None)
+    chart = cached[1].get(key)
+    if chart is None:
+        chart = cached[1][key] = OrgChart.build(company, department)
+
+    return chart
+
+def clear_org_chart_cache(doc=None, method=None):
+    """Invalidate org charts in every process serving this site"""
+    _org_charts.pop(frappe.local.site, None)
+    frappe.cache().delete_value(ORG_CHART_VERSION_KEY)
+
+def get_org_subtrees(company=None, department=None, root=None, depth=DEFAULT_DEPTH):
+    """
+    Get the tree below an employee, or below every root of the chart
+
+    Args:
+        company (str, optional): Company
+        department (str, optional): Department
+        root (str, optional): Employee to start from; all roots when omitted
+        depth (int, optional): Levels of reports to include; 0 for all
+
+    Returns:
+        list: Nested nodes; empty when root is not part of the chart
+    """
+    chart = get_org_chart(company, department)
+    depth = min(max(cint(depth), 0), MAX_DEPTH) if depth else 0
+
+    if root:
+        return [chart.subtree(root, depth)] if root in chart.nodes else []
+
+    return [chart.subtree(employee, depth) for employee in chart.roots]
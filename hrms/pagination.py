@@ -0,0 +1,134 @@
+# Copyright (c) 2023, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Keyset pagination for HRMS list APIs
+
+List endpoints return one page at a time ordered by a sort field plus
+`name` as a unique tiebreaker. The next page seeks strictly past the last
+row of the previous one, so the cost of a page does not depend on how deep
+into the list it is. The response follows the same contract as the Flask
+list pages: data, next_cursor, has_more, page_length, total_count and
+total_is_estimate.
+"""
+
+from __future__ import unicode_literals
+import base64
+import json
+
+import frappe
+from frappe import _
+from frappe.query_builder import Order
+from frappe.utils import cint
+from hrms.permissions import apply_permission_filters
+
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 500
+
+# Totals above this are reported as estimates instead of counted
+COUNT_ESTIMATE_CAP = 10000
+
+def encode_cursor(values):
+    """Encode the sort key of the last row into an opaque cursor"""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Decode a cursor into its [sort value, name] pair"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        frappe.throw(_("Invalid pagination cursor"))
+
+    if not isinstance(values, list) or len(values) != 2:
+        frappe.throw(_("Invalid pagination cursor"))
+
+    return values
+
+def estimate_count(doctype, filters=None, cap=COUNT_ESTIMATE_CAP):
+    """Count matching rows, stopping after `cap`; returns (count, is_estimate)"""
+    capped = frappe.qb.get_query(doctype, fields=["name"], filters=filters, limit=cap + 1)
+    count = frappe.db.sql(f"SELECT COUNT(*) FROM ({capped}) AS capped")[0][0]
+
+    if count > cap:
+        return cap, True
+    return count, False
+
+def get_keyset_page(doctype, fields, filters=None, sort_field="modified", sort_order="desc",
+        cursor=None, page_length=None, with_total=True, ignore_permissions=False):
+    """
+    Get one page of documents using keyset pagination
+
+    Args:
+        doctype (str): DocType to list
+        fields (list): Fields to return
+        filters (dict|list, optional): Frappe-style filters, applied in SQL
+        sort_field (str): Non-nullable field to order by; `name` breaks ties
+        sort_order (str): "asc" or "desc"
+        cursor (str, optional): `next_cursor` returned with the previous page
+        page_length (int, optional): Page size
+        with_total (bool): Include a (capped) total count
+        ignore_permissions (bool): Skip limiting rows to those the user may read
+
+    Returns:
+        dict: The page and its paging metadata
+    """
+    page_length = min(cint(page_length) or DEFAULT_PAGE_LENGTH, MAX_PAGE_LENGTH)
+
+    # Permission scoping is added as ordinary bound filters
+    if not ignore_permissions:
+        filters = apply_permission_filters(doctype, filters)
+        if filters is None:
+            return {
+                "data": [],
+                "next_cursor": None,
+                "has_more": False,
+                "page_length": page_length,
+                "total_count": 0 if with_total else None,
+                "total_is_estimate": False
+            }
+
+    descending = (sort_order or "desc").lower() == "desc"
+    order = Order.desc if descending else Order.asc
+
+    table = frappe.qb.DocType(doctype)
+    select_fields = list(fields)
+    for field in (sort_field, "name"):
+        if field not in select_fields:
+            select_fields.append(field)
+
+    query = frappe.qb.get_query(doctype, fields=select_fields, filters=filters)
+
+    # Seek past the last row of the previous page
+    if cursor:
+        # Dates round-trip as ISO strings, which MariaDB compares natively
+        last_value, last_name = decode_cursor(cursor)
+
+        if descending:
+            query = query.where((table[sort_field] < last_value) |
+                ((table[sort_field] == last_value) & (table.name < last_name)))
+        else:
+            query = query.where((table[sort_field] > last_value) |
+                ((table[sort_field] == last_value) & (table.name > last_name)))
+
+    rows = query.orderby(table[sort_field], order=order).orderby(table.name, order=order) \
+        .limit(page_length + 1).run(as_dict=True)
+
+    next_cursor = None
+    if len(rows) > page_length:
+        rows = rows[:page_length]
+        next_cursor = encode_cursor([rows[-1].get(sort_field), rows[-1].get("name")])
+
+    total_count, total_is_estimate = (None, False)
+    if with_total:
+        total_count, total_is_estimate = estimate_count(doctype, filters)
+
+    return {
+        "data": rows,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "page_length": page_length,
+        "total_count": total_count,
+        "total_is_estimate": total_is_estimate
+    }
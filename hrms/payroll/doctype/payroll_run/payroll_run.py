@@ -0,0 +1,279 @@
+"""
+Payroll Run DocType Controller
+
+This module generates Draft Salary Slips for every active employee of a
+company in one pay period. Salary structures and payment days are resolved
+for all employees with a few set-based queries, slips are computed in a
+process pool chunk by chunk and bulk inserted, and progress is committed
+after every chunk.
+
+A run that dies halfway is resumed by processing it again: employees who
+already have a slip for the period are skipped.
+"""
+
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import getdate, flt, cint, date_diff, now_datetime, money_in_words
+from hrms.payroll.doctype.salary_structure.salary_structure import get_structure_index
+
+# Employees computed and inserted per chunk; progress is committed after each
+PAYROLL_CHUNK_SIZE = 1000
+
+SALARY_SLIP_NAMING_SERIES = "HR-SLI-.YYYY.-"
+
+SALARY_SLIP_FIELDS = [
+    "name", "owner", "creation", "modified", "modified_by", "docstatus", "naming_series",
+    "employee", "employee_name", "department", "designation", "company", "salary_structure",
+    "posting_date", "start_date", "end_date", "status", "total_working_days",
+    "leave_without_pay", "absent_days", "payment_days", "gross_pay", "total_deduction",
+    "net_pay", "rounded_total", "total_in_words"
+]
+
+class PayrollRun(Document):
+    def validate(self):
+        """Validate payroll run"""
+        if getdate(self.start_date) > getdate(self.end_date):
+            frappe.throw(_("Start Date cannot be after End Date"))
+
+def get_pending_employees(company, start_date, end_date):
+    """Get active employees of a company without a non-cancelled slip for the period"""
+    return frappe.db.sql("""
+        SELECT emp.name, emp.employee_name, emp.department, emp.designation
+        FROM `tabEmployee` emp
+        WHERE emp.company = %(company)s AND emp.status = 'Active'
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabSalary Slip` ss
+                WHERE ss.employee = emp.name
+                    AND ss.start_date = %(start_date)s
+                    AND ss.end_date = %(end_date)s
+                    AND ss.docstatus != 2
+            )
+        ORDER BY emp.name
+    """, {"company": company, "start_date": start_date, "end_date": end_date}, as_dict=True)
+
+def get_payment_day_deductions(company, start_date, end_date):
+    """Get leave without pay and absent days per employee of a company with two grouped queries"""
+    values = {"company": company, "start_date": start_date, "end_date": end_date}
+
+    leave_without_pay = dict(frappe.db.sql("""
+        SELECT la.employee, SUM(la.total_leave_days)
+        FROM `tabLeave Application` la
+        INNER JOIN `tabLeave Type` lt ON lt.name = la.leave_type
+        INNER JOIN `tabEmployee` emp ON emp.name = la.employee
+        WHERE emp.company = %(company)s AND lt.is_lwp = 1
+            AND la.status = 'Approved' AND la.docstatus = 1
+            AND (la.from_date BETWEEN %(start_date)s AND %(end_date)s
+                OR la.to_date BETWEEN %(start_date)s AND %(end_date)s)
+        GROUP BY la.employee
+    """, values))
+
+    absent_days = dict(frappe.db.sql("""
+        SELECT att.employee, COUNT(*)
+        FROM `tabAttendance` att
+        INNER JOIN `tabEmployee` emp ON emp.name = att.employee
+        WHERE emp.company = %(company)s AND att.status = 'Absent' AND att.docstatus = 1
+            AND att.attendance_date BETWEEN %(start_date)s AND %(end_date)s
+        GROUP BY att.employee
+    """, values))
+
+    return leave_without_pay, absent_days
+
+def compute_salary_slips(employees, total_working_days):
+    """
+    Compute salary slip values for a chunk of employees
+
+    Runs in worker processes, so it only works on the plain dicts it is given
+    and must not touch the database.
+    """
+    slips = []
+    for employee in employees:
+        payment_days = total_working_days - employee["leave_without_pay"] - employee["absent_days"]
+        gross_pay = flt(employee["base_amount"])
+        total_deduction = 0
+        net_pay = gross_pay - total_deduction
+
+        slip = dict(employee)
+        slip.update({
+            "total_working_days": total_working_days,
+            "payment_days": payment_days,
+            "gross_pay": gross_pay,
+            "total_deduction": total_deduction,
+            "net_pay": net_pay,
+            "rounded_total": round(net_pay)
+        })
+        slips.append(slip)
+
+    return slips
+
+def reserve_names(prefix, count):
+    """Reserve a block of naming series numbers with one row lock instead of one per slip"""
+    frappe.db.sql("""
+        INSERT INTO `tabSeries` (name, current) VALUES (%s, 0)
+        ON DUPLICATE KEY UPDATE name = name
+    """, prefix)
+    current = cint(frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s FOR UPDATE", prefix)[0][0])
+    frappe.db.sql("UPDATE `tabSeries` SET current = %s WHERE name = %s", (current + count, prefix))
+
+    return ["{0}{1:05d}".format(prefix, current + i) for i in range(1, count + 1)]
+
+def insert_salary_slips(run, slips, currency):
+    """Bulk insert computed slips as Draft Salary Slips"""
+    posting_date = getdate(run.posting_date)
+    prefix = SALARY_SLIP_NAMING_SERIES.replace(".YYYY.", str(posting_date.year))
+    names = reserve_names(prefix, len(slips))
+    now = now_datetime()
+    user = frappe.session.user
+
+    values = [
+        (name, user, now, now, user, 0, SALARY_SLIP_NAMING_SERIES,
+         slip["employee"], slip["employee_name"], slip["department"], slip["designation"],
+         run.company, slip["salary_structure"], posting_date, run.start_date, run.end_date,
+         "Draft", slip["total_working_days"], slip["leave_without_pay"], slip["absent_days"],
+         slip["payment_days"], slip["gross_pay"], slip["total_deduction"], slip["net_pay"],
+         slip["rounded_total"], money_in_words(slip["net_pay"], currency))
+        for name, slip in zip(names, slips)
+    ]
+
+    frappe.db.bulk_insert("Salary Slip", SALARY_SLIP_FIELDS, values)
+
+def update_progress(payroll_run, **values):
+    """Save run progress and notify the desk"""
+    frappe.db.set_value("Payroll Run", payroll_run, values, update_modified=False)
+    frappe.db.commit()
+
+    frappe.publish_realtime("payroll_run_progress", dict(values, payroll_run=payroll_run),
+        doctype="Payroll Run", docname=payroll_run)
+
+def process_payroll_run(payroll_run, max_workers=None, chunk_size=PAYROLL_CHUNK_SIZE):
+    """Generate the remaining Draft Salary Slips of a payroll run"""
+    run = frappe.get_doc("Payroll Run", payroll_run)
+    if run.status == "Completed":
+        return
+
+    update_progress(run.name, status="Running")
+
+    try:
+        start_date, end_date = getdate(run.start_date), getdate(run.end_date)
+        total_working_days = date_diff(end_date, start_date) + 1
+
+        # Everything the slips need is loaded up front with set-based queries
+        employees = get_pending_employees(run.company, start_date, end_date)
+        already_processed = frappe.db.count("Salary Slip", {
+            "company": run.company,
+            "start_date": start_date,
+            "end_date": end_date,
+            "docstatus": ("!=", 2)
+        })
+        structures = get_structure_index()
+        leave_without_pay, absent_days = get_payment_day_deductions(run.company, start_date, end_date)
+        currency = frappe.db.get_value("Company", run.company, "default_currency")
+
+        errors = []
+        ready = []
+        for employee in employees:
+            structure = structures.resolve(employee, end_date, company=run.company)
+            if not structure:
+                errors.append(_("No active Salary Structure found for employee {0}").format(employee.name))
+                continue
+
+            ready.append({
+                "employee": employee.name,
+                "employee_name": employee.employee_name,
+                "department": employee.department,
+                "designation": employee.designation,
+                "salary_structure": structure.name,
+                "base_amount": flt(structure.base_amount),
+                "leave_without_pay": flt(leave_without_pay.get(employee.name)),
+                "absent_days": flt(absent_days.get(employee.name))
+            })
+
+        processed = already_processed
+        update_progress(run.name,
+            total_employees=already_processed + len(employees),
+            processed_employees=processed,
+            failed_employees=len(errors),
+            error_log="\n".join(errors))
+
+        # Workers compute chunks while this process inserts the finished ones in order
+        chunks = [ready[i:i + chunk_size] for i in range(0, len(ready), chunk_size)]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for slips in pool.map(compute_salary_slips, chunks, repeat(total_working_days)):
+                insert_salary_slips(run, slips, currency)
+                processed += len(slips)
+                update_progress(run.name, processed_employees=processed)
+
+        update_progress(run.name, status="Completed")
+
+    except Exception:
+        frappe.db.rollback()
+        update_progress(run.name, status="Failed", error_log=traceback.format_exc())
+        raise
+
+def enqueue_payroll_run(payroll_run):
+    """Process a payroll run in a background worker"""
+    frappe.enqueue(
+        "hrms.payroll.doctype.payroll_run.payroll_run.process_payroll_run",
+        queue="long",
+        timeout=4 * 3600,
+        job_name=f"payroll_run_{payroll_run}",
+        payroll_run=payroll_run
+    )
+
+@frappe.whitelist()
+def start_payroll_run(company, start_date, end_date, posting_date=None):
+    """
+    Create (or reuse) the payroll run for a company and period and queue it
+
+    Returns:
+        str: Payroll Run name
+    """
+    if not frappe.has_permission("Payroll Run", "create"):
+        frappe.throw(_("Not permitted to run payroll"), frappe.PermissionError)
+
+    existing = frappe.db.get_value("Payroll Run", {
+        "company": company,
+        "start_date": getdate(start_date),
+        "end_date": getdate(end_date)
+    }, ["name", "status"], as_dict=True)
+
+    if existing and existing.status in ("Queued", "Running"):
+        frappe.throw(_("Payroll Run {0} is already {1}").format(existing.name, existing.status))
+
+    if existing:
+        payroll_run = existing.name
+    else:
+        run = frappe.new_doc("Payroll Run")
+        run.company = company
+        run.start_date = getdate(start_date)
+        run.end_date = getdate(end_date)
+        run.posting_date = getdate(posting_date) if posting_date else getdate(frappe.utils.today())
+        run.status = "Queued"
+        run.insert()
+        payroll_run = run.name
+
+    frappe.db.commit()
+    enqueue_payroll_run(payroll_run)
+
+    return payroll_run
+
+@frappe.whitelist()
+def resume_payroll_run(payroll_run):
+    """Queue an interrupted or failed payroll run again; finished slips are kept"""
+    if not frappe.has_permission("Payroll Run", "write"):
+        frappe.throw(_("Not permitted to run payroll"), frappe.PermissionError)
+
+    if frappe.db.get_value("Payroll Run", payroll_run, "status") == "Completed":
+        frappe.throw(_("Payroll Run {0} is already completed").format(payroll_run))
+
+    enqueue_payroll_run(payroll_run)
+
+@frappe.whitelist()
+def get_payroll_run_progress(payroll_run):
+    """Get the status and counters of a payroll run"""
+    return frappe.db.get_value("Payroll Run", payroll_run,
+        ["status", "total_employees", "processed_employees", "failed_employees"], as_dict=True)
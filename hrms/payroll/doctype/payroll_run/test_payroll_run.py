@@ -0,0 +1,79 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, get_first_day, get_last_day, getdate, today
+
+from hrms.payroll.doctype.payroll_run.payroll_run import compute_salary_slips, process_payroll_run
+
+class TestPayrollRun(FrappeTestCase):
+    def setUp(self):
+        self.company = "_Test Payroll Company"
+        if not frappe.db.exists("Company", self.company):
+            frappe.get_doc({"doctype": "Company", "company_name": self.company,
+                            "default_currency": "INR"}).insert()
+
+        self.employees = [frappe.get_doc({
+            "doctype": "Employee",
+            "first_name": f"_Test Payroll {index}",
+            "company": self.company,
+            "status": "Active",
+            "gender": "Female",
+            "date_of_birth": "1990-01-01",
+            "date_of_joining": "2020-01-01"
+        }).insert().name for index in range(3)]
+
+        frappe.get_doc({
+            "doctype": "Salary Structure",
+            "name": "_Test Payroll Structure",
+            "company": self.company,
+            "applicable_for": "All Employees",
+            "from_date": "2020-01-01",
+            "base_amount": 30000,
+            "is_active": 1
+        }).insert()
+
+        last_month = add_days(get_first_day(today()), -1)
+        self.start_date, self.end_date = get_first_day(last_month), get_last_day(last_month)
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def make_run(self):
+        return frappe.get_doc({
+            "doctype": "Payroll Run",
+            "company": self.company,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "posting_date": self.end_date,
+            "status": "Queued"
+        }).insert()
+
+    def get_slips(self):
+        return frappe.get_all("Salary Slip",
+            filters={"company": self.company, "start_date": self.start_date, "docstatus": 0},
+            pluck="employee")
+
+    def test_payment_days_exclude_unpaid_leave_and_absence(self):
+        slips = compute_salary_slips([{
+            "employee": "EMP-1", "base_amount": 30000, "leave_without_pay": 2, "absent_days": 1
+        }], total_working_days=30)
+
+        self.assertEqual(slips[0]["payment_days"], 27)
+        self.assertEqual(slips[0]["net_pay"], 30000)
+
+    def test_run_creates_one_slip_per_employee(self):
+        run = self.make_run()
+
+        process_payroll_run(run.name, max_workers=1, chunk_size=2)
+
+        self.assertEqual(sorted(self.get_slips()), sorted(self.employees))
+        run.reload()
+        self.assertEqual((run.status, run.processed_employees), ("Completed", 3))
+
+    def test_resumed_run_skips_employees_with_slips(self):
+        run = self.make_run()
+        process_payroll_run(run.name, max_workers=1)
+        frappe.db.set_value("Payroll Run", run.name, "status", "Failed")
+
+        process_payroll_run(run.name, max_workers=1)
+
+        self.assertEqual(len(self.get_slips()), 3)
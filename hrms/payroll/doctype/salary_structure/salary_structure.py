@@ -5,6 +5,9 @@ This module contains the controller for the Salary Structure DocType
 which handles business logic and validations.
 """
 
+from bisect import bisect_right
+from datetime import date as datetime_date
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
@@ -56,6 +59,14 @@ class SalaryStructure(Document):
         # If is_active is checked, ensure all other structures for the same criteria are inactive
         if self.is_active:
             self.check_other_active_structures()
+        
+        # Dropped only once the change is visible, so no process rebuilds
+        # the index from the old rows under the new version
+        frappe.db.after_commit.add(clear_structure_index)
+    
+    def on_trash(self):
+        """On delete actions"""
+        frappe.db.after_commit.add(clear_structure_index)
     
     def check_other_active_structures(self):
         """Deactivate other salary structures with the same criteria"""
@@ -85,60 +96,122 @@ class SalaryStructure(Document):
             frappe.db.set_value("Salary Structure", structure.name, "is_active", 0)
             frappe.msgprint(_("Salary Structure {0} has been set as inactive").format(structure.name))
 
-def get_salary_structure(employee, date=None):
+# Applicability levels, most specific first, with the Employee field each one matches
+STRUCTURE_LEVELS = (
+    ("Employee", "employee", "name"),
+    ("Employee Grade", "employee_grade", "grade"),
+    ("Designation", "designation", "designation"),
+    ("Department", "department", "department"),
+)
+
+# Salary Structure field holding the value for each applicability level
+STRUCTURE_FIELDS = dict((level, fieldname) for level, fieldname, employee_field in STRUCTURE_LEVELS)
+
+# Structures without a from_date apply from the beginning of time
+EARLIEST_DATE = datetime_date.min
+
+# Shared cache key whose value changes whenever any Salary Structure changes
+INDEX_VERSION_KEY = "salary_structure_index_version"
+
+# Per-site (version, index) pairs held by this process
+_structure_indexes = {}
+
+class SalaryStructureIndex(object):
+    """
+    In-memory index of active Salary Structures
+    
+    Structures are grouped by (applicable_for, value) and sorted by from_date,
+    so the structure in force on a date is found by bisection without queries.
+    """
+    def __init__(self, structures):
+        groups = {}
+        for structure in structures:
+            applicable_for = structure.applicable_for or "All Employees"
+            field = STRUCTURE_FIELDS.get(applicable_for)
+            key = (applicable_for, structure.get(field) if field else None)
+            from_date = getdate(structure.from_date) if structure.from_date else EARLIEST_DATE
+            groups.setdefault(key, []).append((from_date, structure.name, structure))
+        
+        self._from_dates = {}
+        self._structures = {}
+        for key, entries in groups.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1]))
+            self._from_dates[key] = [entry[0] for entry in entries]
+            self._structures[key] = [entry[2] for entry in entries]
+    
+    @classmethod
+    def build(cls):
+        """Build the index from all active Salary Structures with one query"""
+        return cls(frappe.get_all("Salary Structure",
+            filters={"is_active": 1},
+            fields=["name", "applicable_for", "employee", "employee_grade", "designation",
+                    "department", "from_date", "company", "base_amount"]))
+    
+    def find(self, key, date, company=None):
+        """Get the latest structure for a key starting on or before date"""
+        from_dates = self._from_dates.get(key)
+        if not from_dates:
+            return None
+        
+        position = bisect_right(from_dates, date)
+        structures = self._structures[key]
+        for structure in reversed(structures[:position]):
+            if not company or structure.company == company:
+                return structure
+        
+        return None
+    
+    def resolve(self, employee_details, date, company=None):
+        """Get the most specific structure applicable to an employee on a date"""
+        date = getdate(date)
+        for level, fieldname, employee_field in STRUCTURE_LEVELS:
+            value = employee_details.get(employee_field)
+            if value:
+                structure = self.find((level, value), date, company)
+                if structure:
+                    return structure
+        
+        return self.find(("All Employees", None), date, company)
+
+def get_structure_index():
+    """Get this site's structure index, rebuilding it when any structure has changed"""
+    version = frappe.cache().get_value(INDEX_VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=10)
+        frappe.cache().set_value(INDEX_VERSION_KEY, version)
+    
+    cached = _structure_indexes.get(frappe.local.site)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    index = SalaryStructureIndex.build()
+    _structure_indexes[frappe.local.site] = (version, index)
+    return index
+
+def clear_structure_index():
+    """Invalidate the structure index in every process serving this site"""
+    _structure_indexes.pop(frappe.local.site, None)
+    frappe.cache().delete_value(INDEX_VERSION_KEY)
+
+def get_employee_details(employee):
+    """Get the Employee fields used to match structures"""
+    fields = ["name", "department", "designation"]
+    if frappe.get_meta("Employee").has_field("grade"):
+        fields.append("grade")
+    
+    return frappe.db.get_value("Employee", employee, fields, as_dict=True) or frappe._dict()
+
+def get_salary_structure(employee, date=None, employee_details=None):
     """Get applicable salary structure for an employee on a given date"""
     if not date:
         date = frappe.utils.today()
     
-    # Get employee details
-    employee_details = frappe.db.get_value("Employee", employee, 
-        ["department", "designation", "grade"], as_dict=True)
-    
-    # Find active salary structure for the employee
-    # First try for the specific employee
-    salary_structure = frappe.db.get_value("Salary Structure", {
-        "employee": employee,
-        "is_active": 1,
-        "applicable_for": "Employee",
-        "from_date": ("<=", date)
-    }, "name")
-    
-    if not salary_structure and employee_details.grade:
-        # Try for employee grade
-        salary_structure = frappe.db.get_value("Salary Structure", {
-            "employee_grade": employee_details.grade,
-            "is_active": 1,
-            "applicable_for": "Employee Grade",
-            "from_date": ("<=", date)
-        }, "name")
-    
-    if not salary_structure and employee_details.designation:
-        # Try for designation
-        salary_structure = frappe.db.get_value("Salary Structure", {
-            "designation": employee_details.designation,
-            "is_active": 1,
-            "applicable_for": "Designation",
-            "from_date": ("<=", date)
-        }, "name")
-    
-    if not salary_structure and employee_details.department:
-        # Try for department
-        salary_structure = frappe.db.get_value("Salary Structure", {
-            "department": employee_details.department,
-            "is_active": 1,
-            "applicable_for": "Department",
-            "from_date": ("<=", date)
-        }, "name")
-    
-    if not salary_structure:
-        # Finally try for all employees
-        salary_structure = frappe.db.get_value("Salary Structure", {
-            "applicable_for": "All Employees",
-            "is_active": 1,
-            "from_date": ("<=", date)
-        }, "name")
-    
-    return salary_structure
+    # Callers resolving many employees pass the details they already loaded
+    if employee_details is None:
+        employee_details = get_employee_details(employee)
+    
+    structure = get_structure_index().resolve(frappe._dict(employee_details, name=employee), date)
+    return structure.name if structure else None
 
 @frappe.whitelist()
 def make_salary_slip(salary_structure, employee):
@@ -0,0 +1,68 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from hrms.payroll.doctype.salary_structure.salary_structure import (
+    SalaryStructureIndex, get_salary_structure, get_structure_index
+)
+
+def make_structure(name, from_date, applicable_for="All Employees", **values):
+    return frappe._dict(name=name, from_date=from_date, applicable_for=applicable_for,
+                        company="_Test Company", **values)
+
+class TestSalaryStructureIndex(FrappeTestCase):
+    def setUp(self):
+        self.index = SalaryStructureIndex([
+            make_structure("All 2020", "2020-01-01"),
+            make_structure("All 2023", "2023-01-01"),
+            make_structure("Sales", "2021-01-01", "Department", department="Sales"),
+            make_structure("Manager", "2022-01-01", "Designation", designation="Manager"),
+            make_structure("Own", "2022-06-01", "Employee", employee="EMP-1"),
+        ])
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_latest_structure_on_the_date_applies(self):
+        employee = frappe._dict(name="EMP-9")
+        self.assertIsNone(self.index.resolve(employee, "2019-12-31"))
+        self.assertEqual(self.index.resolve(employee, "2022-12-31").name, "All 2020")
+        self.assertEqual(self.index.resolve(employee, "2023-01-01").name, "All 2023")
+
+    def test_most_specific_structure_applies(self):
+        employee = frappe._dict(name="EMP-1", department="Sales", designation="Manager")
+        self.assertEqual(self.index.resolve(employee, "2021-06-01").name, "Sales")
+        self.assertEqual(self.index.resolve(employee, "2022-03-01").name, "Manager")
+        self.assertEqual(self.index.resolve(employee, "2022-06-01").name, "Own")
+
+    def test_company_filter(self):
+        employee = frappe._dict(name="EMP-9")
+        self.assertIsNone(self.index.resolve(employee, "2023-01-01", company="_Test Other Company"))
+
+    def test_index_is_rebuilt_after_a_structure_changes(self):
+        employee = frappe.get_doc({
+            "doctype": "Employee",
+            "first_name": "_Test Structure",
+            "status": "Active",
+            "gender": "Male",
+            "date_of_birth": "1990-01-01",
+            "date_of_joining": "2020-01-01"
+        }).insert()
+        get_structure_index()
+
+        structure = frappe.get_doc({
+            "doctype": "Salary Structure",
+            "name": "_Test Own Structure",
+            "company": employee.company,
+            "applicable_for": "Employee",
+            "employee": employee.name,
+            "from_date": "2020-01-01",
+            "base_amount": 1000,
+            "is_active": 1
+        }).insert()
+        # The index is cleared once the change is committed
+        frappe.db.commit()
+        self.addCleanup(frappe.db.commit)
+        self.addCleanup(frappe.delete_doc, "Employee", employee.name, force=True)
+        self.addCleanup(frappe.delete_doc, "Salary Structure", structure.name, force=True)
+
+        self.assertEqual(get_salary_structure(employee.name), structure.name)
@@ -0,0 +1,63 @@
+# Copyright (c) 2023, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Role permission rule compiler
+
+Shared by the Frappe app (hrms.permissions) and the Flask app's hooks, so
+it must not import frappe. Rules have the `role_permissions` hooks format:
+{role: [[doctype, ptype, ..., optional {"user": "owner"}], ...]}.
+"""
+
+from __future__ import unicode_literals
+
+PTYPES = ("read", "write", "create", "delete", "submit", "cancel", "amend")
+PTYPE_BITS = {ptype: 1 << index for index, ptype in enumerate(PTYPES)}
+ALL_PTYPES = (1 << len(PTYPES)) - 1
+
+def compile_role_permissions(rules):
+    """
+    Compile role permission rules into bitsets
+
+    Returns:
+        dict: {(role, doctype): (all_records_mask, own_records_mask)}
+    """
+    matrix = {}
+    for role, role_rules in rules.items():
+        for rule in role_rules:
+            doctype, items = rule[0], rule[1:]
+            owner_only = any(isinstance(item, dict) and item.get("user") == "owner" for item in items)
+
+            mask = 0
+            for item in items:
+                if not isinstance(item, dict):
+                    mask |= PTYPE_BITS[item]
+
+            all_mask, own_mask = matrix.get((role, doctype), (0, 0))
+            if owner_only:
+                own_mask |= mask
+            else:
+                all_mask |= mask
+            matrix[(role, doctype)] = (all_mask, own_mask)
+
+    return matrix
+
+def get_role_masks(matrix, roles):
+    """
+    Combine the compiled masks of a set of roles
+
+    Returns:
+        dict: {doctype: (all_records_mask, own_records_mask)}
+    """
+    masks = {}
+    for (role, doctype), (all_mask, own_mask) in matrix.items():
+        if role in roles:
+            current_all, current_own = masks.get(doctype, (0, 0))
+            masks[doctype] = (current_all | all_mask, current_own | own_mask)
+    return masks
+
+def is_permitted(masks, doctype, ptype, own_record=False):
+    """Whether combined masks allow ptype on a record, given whether it is the user's own"""
+    all_mask, own_mask = masks.get(doctype, (0, 0))
+    bit = PTYPE_BITS.get(ptype, 0)
+    return bool(all_mask & bit or (own_record and own_mask & bit))
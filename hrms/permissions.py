@@ -0,0 +1,155 @@
+# Copyright (c) 2023, Your Company and contributors
+# For license information, please see license.txt
+
+"""
+Compiled role permissions for HRMS doctypes
+
+The `role_permissions` rules in hooks.py are compiled once into bitsets per
+(role, doctype): one mask of ptypes allowed on every record and one of
+ptypes allowed only on the user's own records (rules carrying
+{"user": "owner"}). A user's roles, employee and combined masks are worked
+out once per request, so checking permissions on a list of documents runs
+no queries per document.
+"""
+
+from __future__ import unicode_literals
+from collections import namedtuple
+
+import frappe
+from hrms.hooks import role_permissions
+from hrms.permission_rules import PTYPE_BITS, compile_role_permissions, get_role_masks, is_permitted
+
+# Roles allowed everything on every doctype
+SUPERUSER_ROLES = ("Administrator",)
+
+# Field that links a record to the employee it belongs to
+OWNER_FIELDS = {
+    "Employee": "name",
+    "Attendance": "employee",
+    "Leave Application": "employee",
+    "Salary Slip": "employee",
+    "Appraisal": "employee"
+}
+
+EMPLOYEE_BY_USER_KEY = "hrms:employee_by_user"
+
+UserPermissions = namedtuple("UserPermissions", ["user", "roles", "employee", "is_superuser", "masks"])
+
+PERMISSION_MATRIX = compile_role_permissions(role_permissions)
+
+def get_employee_for_user(user):
+    """Employee linked to a user, cached until an Employee is saved or deleted"""
+    return frappe.cache().hget(EMPLOYEE_BY_USER_KEY, user,
+        generator=lambda: frappe.db.get_value("Employee", {"user_id": user}, "name"))
+
+def clear_employee_user_cache(doc=None, method=None):
+    """Forget cached user to employee links"""
+    frappe.cache().delete_key(EMPLOYEE_BY_USER_KEY)
+
+def get_user_permissions(user=None):
+    """Roles, employee and per-doctype masks of a user, computed once per request"""
+    user = user or frappe.session.user
+
+    cache = getattr(frappe.local, "hrms_user_permissions", None)
+    if cache is None:
+        cache = frappe.local.hrms_user_permissions = {}
+
+    if user not in cache:
+        roles = frozenset(frappe.get_roles(user))
+
+        cache[user] = UserPermissions(
+            user=user,
+            roles=roles,
+            employee=get_employee_for_user(user),
+            is_superuser=any(role in roles for role in SUPERUSER_ROLES),
+            masks=get_role_masks(PERMISSION_MATRIX, roles)
+        )
+
+    return cache[user]
+
+def can_access_all(doctype, ptype="read", user=None):
+    """Whether a user has ptype on every record of a doctype"""
+    permissions = get_user_permissions(user)
+    return permissions.is_superuser or is_permitted(permissions.masks, doctype, ptype)
+
+def can_access_own(doctype, ptype="read", user=None):
+    """Whether a user has ptype on records of their own employee"""
+    permissions = get_user_permissions(user)
+    return bool(permissions.employee and permissions.masks.get(doctype, (0, 0))[1] & PTYPE_BITS.get(ptype, 0))
+
+def has_doc_permission(doctype, doc, ptype="read", user=None):
+    """Check ptype on a document against the compiled masks, without queries"""
+    permissions = get_user_permissions(user)
+    if permissions.is_superuser:
+        return True
+
+    owner_field = OWNER_FIELDS.get(doctype)
+    own_record = bool(permissions.employee and owner_field and doc.get(owner_field) == permissions.employee)
+    return is_permitted(permissions.masks, doctype, ptype, own_record)
+
+def get_permission_filters(doctype, user=None):
+    """
+    Bound-parameter filters that limit a doctype to the records a user may read
+
+    Returns:
+        list: [] when every record is readable, [[doctype, field, "=", employee]]
+        when only the user's own records are, or None when none are
+    """
+    if can_access_all(doctype, "read", user):
+        return []
+
+    owner_field = OWNER_FIELDS.get(doctype)
+    if owner_field and can_access_own(doctype, "read", user):
+        return [[doctype, owner_field, "=", get_user_permissions(user).employee]]
+
+    return None
+
+def get_permission_criteria(doctype, table, user=None):
+    """
+    Permission filters as frappe.qb conditions on a table (which may be aliased)
+
+    Returns:
+        list: Conditions to AND together, or None when no record is readable
+    """
+    permission_filters = get_permission_filters(doctype, user)
+    if permission_filters is None:
+        return None
+
+    # get_permission_filters only emits equality filters
+    return [table[field] == value for _, field, operator, value in permission_filters]
+
+def apply_permission_filters(doctype, filters=None, user=None):
+    """Combine Frappe-style filters with the user's permission filters; None when nothing is readable"""
+    permission_filters = get_permission_filters(doctype, user)
+    if permission_filters is None:
+        return None
+    if not permission_filters:
+        return filters or []
+
+    combined = []
+    if isinstance(filters, dict):
+        for field, value in filters.items():
+            if isinstance(value, (list, tuple)):
+                combined.append([doctype, field, value[0], value[1]])
+            else:
+                combined.append([doctype, field, "=", value])
+    elif filters:
+        combined.extend(filters)
+
+    return combined + permission_filters
+
+def get_permission_query_conditions(doctype, user=None):
+    """
+    Permission filters rendered for Frappe's permission_query_conditions hook
+
+    Desk list views only accept an SQL fragment here, so values are escaped
+    with frappe.db.escape; API code should use get_permission_filters.
+    """
+    permission_filters = get_permission_filters(doctype, user)
+    if permission_filters is None:
+        return "1=0"
+
+    return " AND ".join(
+        "(`tab{0}`.`{1}` {2} {3})".format(doctype, field, operator, frappe.db.escape(value))
+        for doctype, field, operator, value in permission_filters
+    )
@@ -0,0 +1,69 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from hrms.org_chart import OrgChart, get_org_chart, get_org_subtrees
+
+def make_chart(reports_to):
+    """Chart from {employee: manager}"""
+    nodes, children = {}, {}
+    for employee, manager in sorted(reports_to.items()):
+        nodes[employee] = {"id": employee, "name": employee}
+        children.setdefault(manager, []).append(employee)
+    roots = sorted(employee for manager, reports in children.items()
+                   if manager is None or manager not in nodes for employee in reports)
+    return OrgChart(nodes, children, roots)
+
+def ids(node):
+    return [node["id"], [ids(child) for child in node["children"]]]
+
+class TestOrgChart(FrappeTestCase):
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_subtree_stops_at_depth(self):
+        chart = make_chart({"A": None, "B": "A", "C": "B", "D": "A"})
+
+        self.assertEqual(ids(chart.subtree("A")), ["A", [["B", [["C", []]]], ["D", []]]])
+
+        node = chart.subtree("A", depth=1)
+        self.assertEqual(ids(node), ["A", [["B", []], ["D", []]]])
+        self.assertEqual([(child["expandable"], child["child_count"]) for child in node["children"]],
+                         [(True, 1), (False, 0)])
+
+    def test_cycles_are_cut(self):
+        chart = make_chart({"A": "B", "B": "A"})
+
+        self.assertEqual(chart.roots, [])
+        self.assertEqual(ids(chart.subtree("A")), ["A", [["B", []]]])
+
+    def test_chart_is_rebuilt_after_an_employee_changes(self):
+        manager = frappe.get_doc({
+            "doctype": "Employee",
+            "first_name": "_Test Org Chart Manager",
+            "status": "Active",
+            "gender": "Male",
+            "date_of_birth": "1990-01-01",
+            "date_of_joining": "2020-01-01"
+        }).insert()
+        company = manager.company
+        chart = get_org_chart(company)
+
+        report = frappe.get_doc({
+            "doctype": "Employee",
+            "first_name": "_Test Org Chart Report",
+            "company": company,
+            "reports_to": manager.name,
+            "status": "Active",
+            "gender": "Female",
+            "date_of_birth": "1990-01-01",
+            "date_of_joining": "2020-01-01"
+        }).insert()
+        # The cache is cleared once the change is committed
+        frappe.db.commit()
+        self.addCleanup(frappe.db.commit)
+        self.addCleanup(frappe.delete_doc, "Employee", manager.name, force=True)
+        self.addCleanup(frappe.delete_doc, "Employee", report.name, force=True)
+
+        self.assertIsNot(get_org_chart(company), chart)
+        subtree = get_org_subtrees(company, root=manager.name, depth=1)
+        self.assertEqual([child["id"] for child in subtree[0]["children"]], [report.name])
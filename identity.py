@@ -0,0 +1,92 @@
+"""
+Identity Resolution for Authenticated Requests
+
+Every authenticated request needs the logged-in `User` and, for employee
+pages, the `Employee` linked to it. This module resolves both with a single
+query and keeps the pair for the rest of the request.
+
+Identities are not kept across requests: the User row carries the role and
+password hash, and a copy cached in one process could not be invalidated
+from the others, so a revoked role or changed password would keep working
+there until the copy expired.
+
+Changes to User or Employee rows made through the ORM drop the request's
+copy of the affected identity once they are committed; bulk
+`query.update()` calls bypass the ORM events and should call
+`invalidate_identity()` themselves.
+"""
+
+from collections import namedtuple
+
+from flask import g, has_request_context
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import object_session
+
+Identity = namedtuple('Identity', ['user', 'employee'])
+
+def _load_identity(user_id):
+    """Load a user and their employee record in one query"""
+    from app import db, User, Employee
+
+    row = (db.session.query(User, Employee)
+           .outerjoin(Employee, Employee.user_id == User.id)
+           .filter(User.id == user_id)
+           .first())
+
+    if row is None:
+        return Identity(None, None)
+    return Identity(row[0], row[1])
+
+def get_identity(user_id):
+    """Return the (User, Employee) identity for a user id, loaded once per request"""
+    identities = g.setdefault('_identities', {}) if has_request_context() else {}
+    if user_id not in identities:
+        identities[user_id] = _load_identity(user_id)
+    return identities[user_id]
+
+def current_employee():
+    """Return the Employee linked to the logged-in user, or None"""
+    from flask_login import current_user
+
+    if not current_user.is_authenticated:
+        return None
+    return get_identity(current_user.id).employee
+
+def invalidate_identity(user_id=None):
+    """Drop the request's identity of one user, or of every user when user_id is None"""
+    if has_request_context() and '_identities' in g:
+        if user_id is None:
+            g._identities.clear()
+        else:
+            g._identities.pop(user_id, None)
+
+def _invalidate_after_commit(target, user_ids):
+    """Queue identities on the writing session, to be invalidated once it commits"""
+    session = object_session(target)
+    pending = session.info.setdefault('_identity_changes', set())
+    pending.update(user_id for user_id in user_ids if user_id is not None)
+
+def _after_commit(session):
+    for user_id in session.info.pop('_identity_changes', ()):
+        invalidate_identity(user_id)
+
+def _after_rollback(session):
+    session.info.pop('_identity_changes', None)
+
+def _invalidate_user(mapper, connection, target):
+    _invalidate_after_commit(target, [target.id])
+
+def _invalidate_employee(mapper, connection, target):
+    # The employee may have been linked to a different user before this change
+    user_ids = {target.user_id}
+    user_ids.update(sa_inspect(target).attrs.user_id.history.deleted)
+    _invalidate_after_commit(target, user_ids)
+
+def register_identity_invalidation(session, user_model, employee_model):
+    """Invalidate identities whenever committed changes wrote their User or Employee rows"""
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(user_model, event_name, _invalidate_user)
+        event.listen(employee_model, event_name, _invalidate_employee)
+
+    event.listen(session, 'after_commit', _after_commit)
+    event.listen(session, 'after_rollback', _after_rollback)
@@ -0,0 +1,191 @@
+"""
+Leave Balance Ledger
+
+Approved leave is accumulated in the `leave_balance` table, one row per
+(employee, leave type, year), so balances are read with a single indexed
+lookup instead of summing leave applications per leave type.
+
+The ledger is kept current inside the same flush that changes a leave
+application: approving adds its days, moving it out of Approved (rejecting,
+cancelling, deleting) subtracts them. Leave is booked against the year of
+its from_date. `rebuild_leave_balances()` reconciles the ledger from
+LeaveApplication if it ever drifts (e.g. after bulk SQL updates).
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect as sa_inspect
+
+APPROVED = 'Approved'
+
+def _leave_days(total_leave_days):
+    return float(total_leave_days or 0)
+
+def _committed_value(state, key):
+    """Value of an attribute as last loaded from or written to the database"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), key)
+
+def _ledger_entry(application, committed=False):
+    """Return ((employee_id, leave_type_id, year), days) if the application counts as taken"""
+    if committed:
+        state = sa_inspect(application)
+        value = lambda key: _committed_value(state, key)
+    else:
+        value = lambda key: getattr(application, key)
+
+    if value('status') != APPROVED or value('from_date') is None:
+        return None
+
+    key = (value('employee_id'), value('leave_type_id'), value('from_date').year)
+    return key, _leave_days(value('total_leave_days'))
+
+def collect_ledger_deltas(session):
+    """Sum the ledger changes implied by pending leave application changes in a session"""
+    from app import LeaveApplication
+
+    deltas = defaultdict(float)
+
+    for application in session.new:
+        if isinstance(application, LeaveApplication):
+            entry = _ledger_entry(application)
+            if entry:
+                deltas[entry[0]] += entry[1]
+
+    for application in session.dirty:
+        if isinstance(application, LeaveApplication) and session.is_modified(application):
+            old, new = _ledger_entry(application, committed=True), _ledger_entry(application)
+            if old:
+                deltas[old[0]] -= old[1]
+            if new:
+                deltas[new[0]] += new[1]
+
+    for application in session.deleted:
+        if isinstance(application, LeaveApplication):
+            entry = _ledger_entry(application, committed=True)
+            if entry:
+                deltas[entry[0]] -= entry[1]
+
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def _increment_statement(dialect, rows):
+    """Build a dialect-native INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE adding to leaves_taken"""
+    from app import LeaveBalance
+
+    table = LeaveBalance.__table__
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=['employee_id', 'leave_type_id', 'year'],
+            set_={'leaves_taken': table.c.leaves_taken + stmt.excluded.leaves_taken,
+                  'modified': stmt.excluded.modified}
+        )
+
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            leaves_taken=table.c.leaves_taken + stmt.inserted.leaves_taken,
+            modified=stmt.inserted.modified
+        )
+
+    raise NotImplementedError(f"Leave ledger upsert is not supported on {dialect}")
+
+def apply_ledger_deltas(session, deltas):
+    """
+    Add deltas to ledger rows with one upsert
+
+    Missing rows are created and existing ones incremented in the same
+    statement, so concurrent first approvals for a key cannot collide on the
+    unique constraint.
+    """
+    now = datetime.now()
+    rows = [dict(employee_id=employee_id, leave_type_id=leave_type_id, year=year,
+                 leaves_taken=delta, modified=now)
+            for (employee_id, leave_type_id, year), delta in deltas.items()]
+    session.execute(_increment_statement(session.get_bind().dialect.name, rows))
+
+def _before_flush(session, flush_context, instances):
+    with session.no_autoflush:
+        deltas = collect_ledger_deltas(session)
+        if deltas:
+            apply_ledger_deltas(session, deltas)
+
+# Attributes that decide where, and how much, an application is booked
+LEDGER_ATTRIBUTES = ('status', 'employee_id', 'leave_type_id', 'from_date', 'total_leave_days')
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+def register_leave_ledger(session, leave_application_model):
+    """Keep the ledger in step with leave applications flushed through the given session"""
+    # Load previous values on change, even on expired instances, so the old
+    # booking can be reversed
+    for name in LEDGER_ATTRIBUTES:
+        event.listen(getattr(leave_application_model, name), 'set', _keep_history,
+                     active_history=True, retval=True)
+
+    event.listen(session, 'before_flush', _before_flush)
+
+def rebuild_leave_balances(year=None):
+    """
+    Recompute ledger rows from approved leave applications
+
+    Args:
+        year (int, optional): Only rebuild this year; all years when omitted
+
+    Returns:
+        int: Number of ledger rows written
+    """
+    from app import db, LeaveApplication, LeaveBalance
+
+    leave_year = func.extract('year', LeaveApplication.from_date)
+    query = (db.session.query(LeaveApplication.employee_id,
+                              LeaveApplication.leave_type_id,
+                              leave_year,
+                              func.sum(func.coalesce(LeaveApplication.total_leave_days, 0)))
+             .filter(LeaveApplication.status == APPROVED)
+             .group_by(LeaveApplication.employee_id, LeaveApplication.leave_type_id, leave_year))
+
+    stale = db.session.query(LeaveBalance)
+    if year is not None:
+        query = query.filter(leave_year == year)
+        stale = stale.filter(LeaveBalance.year == year)
+
+    now = datetime.now()
+    rows = [
+        {'employee_id': employee_id, 'leave_type_id': leave_type_id, 'year': int(row_year),
+         'leaves_taken': float(taken or 0), 'modified': now}
+        for employee_id, leave_type_id, row_year, taken in query
+    ]
+
+    # Replace the affected rows in one transaction
+    stale.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(LeaveBalance.__table__.insert(), rows)
+    db.session.commit()
+
+    return len(rows)
+
+def get_leaves_taken(year, employee_ids=None):
+    """Return {(employee_id, leave_type_id): days taken} for a year in one query"""
+    from app import db, LeaveBalance
+
+    query = (db.session.query(LeaveBalance.employee_id, LeaveBalance.leave_type_id, LeaveBalance.leaves_taken)
+             .filter(LeaveBalance.year == year))
+    if employee_ids is not None:
+        query = query.filter(LeaveBalance.employee_id.in_(employee_ids))
+
+    return {(employee_id, leave_type_id): taken for employee_id, leave_type_id, taken in query}
@@ -0,0 +1,77 @@
+"""
+List Query Layer for HR List Views
+
+Each list view declares the model it lists and the related records it
+renders. Queries built here load those relations up front - many-to-one
+relations through a JOIN and collections through one batched `IN` query -
+so rendering a page costs a constant number of queries regardless of the
+number of rows.
+"""
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+
+# List view name -> (model name, related records rendered per row)
+LIST_VIEWS = {
+    'my_leaves': ('LeaveApplication', ('leave_type',)),
+    'pending_leaves': ('LeaveApplication', ('employee', 'leave_type')),
+    'job_openings': ('JobOpening', ('department',)),
+    'job_applicants': ('JobApplicant', ('job_opening',)),
+    'appraisals': ('Appraisal', ('employee',)),
+    'salary_slips': ('SalarySlip', ('employee',)),
+}
+
+def _get_model(model_name):
+    """Resolve a model class defined in app.py by name"""
+    import app
+    return getattr(app, model_name)
+
+def _loader_option(model, path):
+    """Build the eager-loading option for a dotted relationship path"""
+    option = None
+    current = model
+
+    for name in path.split('.'):
+        attr = getattr(current, name)
+        relationship = attr.property
+
+        # Collections are loaded with one batched IN query, scalars with a JOIN
+        if relationship.uselist:
+            option = option.selectinload(attr) if option is not None else selectinload(attr)
+        else:
+            option = option.joinedload(attr) if option is not None else joinedload(attr)
+
+        current = relationship.mapper.class_
+
+    return option
+
+def eager_query(model, related=()):
+    """Return `model.query` with the given relationship paths eagerly loaded"""
+    return model.query.options(*[_loader_option(model, path) for path in related])
+
+def list_query(view):
+    """Return the eager-loading base query for a declared list view"""
+    if view not in LIST_VIEWS:
+        raise ValueError(f"Unknown list view {view}")
+
+    model_name, related = LIST_VIEWS[view]
+    return eager_query(_get_model(model_name), related)
+
+def applicant_count_subquery():
+    """Grouped subquery of (job_opening_id, applicant_count) for all job openings"""
+    from app import db, JobApplicant
+
+    return (db.session.query(JobApplicant.job_opening_id.label('job_opening_id'),
+                             func.count(JobApplicant.id).label('applicant_count'))
+            .group_by(JobApplicant.job_opening_id)
+            .subquery())
+
+def job_openings_with_applicant_counts():
+    """Query yielding (JobOpening, applicant_count) pairs in a single statement"""
+    from app import JobOpening
+
+    counts = applicant_count_subquery()
+
+    return (list_query('job_openings')
+            .add_columns(func.coalesce(counts.c.applicant_count, 0))
+            .outerjoin(counts, counts.c.job_opening_id == JobOpening.id))
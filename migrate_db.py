@@ -7,7 +7,20 @@ for the HR Management System's transition to the Frappe/ERPNext framework.
 
 Usage:
     python migrate_db.py --source postgresql --target mariadb [--upgrade]
+                         [--batch-size 1000] [--commit-every 10] [--workers 4] [--restart]
+                         [--loader executemany|values|infile]
+    python migrate_db.py --source postgresql --target mariadb --sync [--interval 60] [--sync-window 60]
     python migrate_db.py --upgrade (only run schema upgrades)
+
+Tables are streamed: rows are read through a server-side cursor, transformed
+and inserted one batch at a time, so memory use does not grow with table size.
+Independent tables are copied concurrently in foreign key order, and progress
+is checkpointed in the target's `migration_checkpoint` table so an interrupted
+migration resumes where it stopped.
+
+With --sync, only rows the Flask app logged as changed since the previous
+sync are upserted (or deleted), which keeps the Frappe tables current
+while both systems run side by side.
 """
 
 import argparse
@@ -16,8 +29,11 @@ import sys
 import json
 import logging
 import datetime
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 
 # Configure logging
 logging.basicConfig(
@@ -81,6 +97,19 @@ except ImportError:
     logger.warning("Unable to import models from app.py. Will use metadata inspection instead.")
     MODELS = []
 
+# Rows read, transformed and inserted per batch when streaming tables
+DEFAULT_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", 1000))
+
+# Batches inserted per target transaction when streaming tables
+DEFAULT_COMMIT_EVERY = int(os.environ.get("MIGRATION_COMMIT_EVERY", 10))
+
+# Tables copied concurrently
+DEFAULT_WORKERS = int(os.environ.get("MIGRATION_WORKERS", 4))
+
+# How batches are written: "executemany", "values" (multi-row INSERTs sized
+# by max_allowed_packet) or "infile" (LOAD DATA LOCAL INFILE, MariaDB only)
+DEFAULT_LOADER = os.environ.get("MIGRATION_LOADER", "executemany")
+
 # Frappe schema mappings
 FRAPPE_SCHEMA_MAPPINGS = {
     "User": {
@@ -145,11 +174,13 @@ def get_connection_uri(db_type: str) -> str:
     else:
         raise ValueError(f"Unsupported database type: {db_type}")
 
-def create_engine_with_retry(uri: str, max_retries: int = 5) -> sqlalchemy.engine.Engine:
+def create_engine_with_retry(uri: str, max_retries: int = 5, local_infile: bool = False) -> sqlalchemy.engine.Engine:
     """Create a SQLAlchemy engine with retry logic."""
+    # LOAD DATA LOCAL INFILE has to be allowed by the client as well
+    connect_args = {"local_infile": True} if local_infile else {}
     for attempt in range(max_retries):
         try:
-            engine = create_engine(uri)
+            engine = create_engine(uri, connect_args=connect_args)
             # Test connection
             with engine.connect() as conn:
                 conn.execute(sqlalchemy.text("SELECT 1"))
@@ -222,10 +253,61 @@ def transform_schema_for_mariadb(schema: dict) -> dict:
     
     return mariadb_schema
 
-def generate_mariadb_schema_sql(schema: dict, frappe_mappings: dict = None) -> str:
+def get_model_indexes(models: list = None) -> Dict[str, List[Dict]]:
+    """Collect the indexes and unique constraints declared on the application models."""
+    model_indexes = {}
+    
+    for model in (MODELS if models is None else models):
+        table = model.__table__
+        indices = []
+        
+        for index in table.indexes:
+            indices.append({
+                "name": index.name,
+                "column_names": [column.name for column in index.columns],
+                "unique": bool(index.unique)
+            })
+        
+        # Named multi-column unique constraints are emitted as unique indexes
+        for constraint in table.constraints:
+            if isinstance(constraint, sqlalchemy.UniqueConstraint) and constraint.name:
+                indices.append({
+                    "name": constraint.name,
+                    "column_names": [column.name for column in constraint.columns],
+                    "unique": True
+                })
+        
+        if indices:
+            model_indexes[table.name] = indices
+    
+    return model_indexes
+
+def merge_indices(reflected: List[Dict], declared: List[Dict]) -> List[Dict]:
+    """Combine reflected and declared indexes, skipping duplicates by name or columns."""
+    merged = []
+    seen_names = set()
+    seen_columns = set()
+    
+    # Declared indexes win so their names and uniqueness are kept
+    for index in list(declared) + list(reflected):
+        columns = tuple(index["column_names"])
+        if index.get("name") in seen_names or columns in seen_columns:
+            continue
+        
+        seen_names.add(index.get("name"))
+        seen_columns.add(columns)
+        merged.append(index)
+    
+    return merged
+
+def generate_mariadb_schema_sql(schema: dict, frappe_mappings: dict = None,
+                                model_indexes: Dict[str, List[Dict]] = None) -> str:
     """Generate SQL statements to create the MariaDB schema."""
     sql_statements = []
     
+    if model_indexes is None:
+        model_indexes = get_model_indexes()
+    
     for table_name, table_info in schema.items():
         # Check if we have a Frappe mapping for this table
         frappe_table_name = table_name
@@ -301,13 +383,18 @@ def generate_mariadb_schema_sql(schema: dict, frappe_mappings: dict = None) -> s
         
         sql_statements.append(create_table_sql)
         
-        # Add indices
-        for index in table_info.get("indices", []):
-            index_name = index.get("name", f"idx_{table_name}_{index['column_names'][0]}")
-            index_columns = ", ".join(f"`{col}`" for col in index["column_names"])
-            index_type = "UNIQUE" if index.get("unique", False) else ""
+        # Add indices, including those declared on the models but missing from the source
+        field_mappings = {}
+        if frappe_mappings and table_name in frappe_mappings:
+            field_mappings = frappe_mappings[table_name].get("field_mappings", {})
+        
+        indices = merge_indices(table_info.get("indices", []), model_indexes.get(table_name, []))
+        for index in indices:
+            index_name = index.get("name") or f"idx_{table_name}_{index['column_names'][0]}"
+            index_columns = ", ".join(f"`{field_mappings.get(col, col)}`" for col in index["column_names"])
+            index_type = "UNIQUE " if index.get("unique", False) else ""
             
-            index_sql = f"CREATE {index_type} INDEX `{index_name}` ON `{frappe_table_name}` ({index_columns});"
+            index_sql = f"CREATE {index_type}INDEX IF NOT EXISTS `{index_name}` ON `{frappe_table_name}` ({index_columns});"
             sql_statements.append(index_sql)
     
     return "\n\n".join(sql_statements)
@@ -335,6 +422,26 @@ def extract_data_from_source(source_engine, tables: List[str] = None) -> Dict[st
     
     return data
 
+def transform_row(row: Dict, mapping: dict, now: datetime.datetime = None) -> Dict:
+    """Map one source row to its Frappe fields and add the default fields."""
+    field_mappings = mapping.get("field_mappings", {})
+    additional_fields = mapping.get("additional_fields", {})
+    now = now or datetime.datetime.now()
+    
+    transformed_row = {}
+    
+    # Map existing fields
+    for old_field, new_field in field_mappings.items():
+        if old_field in row:
+            transformed_row[new_field] = row[old_field]
+    
+    # Add additional fields with defaults
+    for field, default in additional_fields.items():
+        if field not in transformed_row:
+            transformed_row[field] = now if default == "NOW()" else default
+    
+    return transformed_row
+
 def transform_data_for_frappe(data: Dict[str, List[Dict]], frappe_mappings: dict) -> Dict[str, List[Dict]]:
     """Transform data to match Frappe schema."""
     transformed_data = {}
@@ -347,27 +454,9 @@ def transform_data_for_frappe(data: Dict[str, List[Dict]], frappe_mappings: dict
         
         mapping = frappe_mappings[table_name]
         frappe_table_name = mapping["table_name"]
-        field_mappings = mapping.get("field_mappings", {})
-        additional_fields = mapping.get("additional_fields", {})
         
-        transformed_rows = []
-        for row in rows:
-            transformed_row = {}
-            
-            # Map existing fields
-            for old_field, new_field in field_mappings.items():
-                if old_field in row:
-                    transformed_row[new_field] = row[old_field]
-            
-            # Add additional fields with defaults
-            for field, default in additional_fields.items():
-                if field not in transformed_row:
-                    if default == "NOW()":
-                        transformed_row[field] = datetime.datetime.now()
-                    else:
-                        transformed_row[field] = default
-            
-            transformed_rows.append(transformed_row)
+        now = datetime.datetime.now()
+        transformed_rows = [transform_row(row, mapping, now) for row in rows]
         
         transformed_data[frappe_table_name] = transformed_rows
         logger.info(f"Transformed {len(transformed_rows)} rows for {frappe_table_name}")
@@ -397,6 +486,551 @@ def load_data_to_target(target_engine, data: Dict[str, List[Dict]]) -> None:
             else:
                 logger.warning(f"Table {table_name} not found in target database, skipping data load")
 
+def iter_source_batches(source_engine, table: Table, batch_size: int = DEFAULT_BATCH_SIZE,
+                        after: Any = None) -> Iterator[List[Dict]]:
+    """
+    Yield the rows of a source table in batches read through a server-side cursor.
+    
+    Rows come in primary key order; with `after`, only rows whose (single
+    column) primary key is greater are read.
+    """
+    query = table.select()
+    pk_columns = list(table.primary_key.columns)
+    if after is not None and len(pk_columns) == 1:
+        query = query.where(pk_columns[0] > after)
+    if pk_columns:
+        query = query.order_by(*pk_columns)
+    
+    with source_engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(query)
+        for partition in result.mappings().partitions(batch_size):
+            yield [dict(row) for row in partition]
+
+# Checkpoints
+# Per-table progress is kept in the target database and written in the same
+# transaction as the rows it describes, so it never runs ahead of the data.
+
+CHECKPOINT_TABLE = "migration_checkpoint"
+
+def get_checkpoint_table(metadata: MetaData) -> Table:
+    """Table holding the last primary key copied for each source table."""
+    if CHECKPOINT_TABLE in metadata.tables:
+        return metadata.tables[CHECKPOINT_TABLE]
+    
+    return Table(
+        CHECKPOINT_TABLE, metadata,
+        Column("table_name", sqlalchemy.String(140), primary_key=True),
+        Column("last_pk", sqlalchemy.String(140)),
+        Column("rows_copied", sqlalchemy.BigInteger, nullable=False, default=0),
+        Column("completed", sqlalchemy.Boolean, nullable=False, default=False),
+        Column("updated_at", sqlalchemy.DateTime)
+    )
+
+def load_checkpoints(target_engine, checkpoint_table: Table) -> Dict[str, Dict]:
+    """Create the checkpoint table if needed and return {table_name: checkpoint}."""
+    checkpoint_table.create(bind=target_engine, checkfirst=True)
+    with target_engine.connect() as conn:
+        return {row["table_name"]: dict(row) for row in conn.execute(checkpoint_table.select()).mappings()}
+
+def save_checkpoint(conn, checkpoint_table: Table, table_name: str, last_pk: Any,
+                    rows_copied: int, completed: bool = False) -> None:
+    """Record progress of a table in the current transaction."""
+    values = {
+        "last_pk": None if last_pk is None else str(last_pk),
+        "rows_copied": rows_copied,
+        "completed": completed,
+        "updated_at": datetime.datetime.now()
+    }
+    result = conn.execute(checkpoint_table.update()
+                          .where(checkpoint_table.c.table_name == table_name)
+                          .values(**values))
+    if result.rowcount == 0:
+        conn.execute(checkpoint_table.insert().values(table_name=table_name, **values))
+
+def _resume_value(table: Table, last_pk: Optional[str]) -> Any:
+    """Convert a stored primary key back to the column's Python type."""
+    pk_columns = list(table.primary_key.columns)
+    if last_pk is None or len(pk_columns) != 1:
+        return None
+    try:
+        python_type = pk_columns[0].type.python_type
+    except NotImplementedError:
+        return last_pk
+    return python_type(last_pk) if python_type in (int, float) else last_pk
+
+# Loaders
+# Each loader writes one batch of rows into a target table on an open connection.
+
+LOADERS = ("executemany", "values", "infile")
+
+# Used when the server's max_allowed_packet cannot be read (e.g. SQLite)
+DEFAULT_PACKET_SIZE = 4 * 1024 * 1024
+
+# Bound parameters per multi-row statement, below SQLite's limit
+MAX_BIND_PARAMS = 30000
+
+def load_batch_executemany(conn, table: Table, rows: List[Dict]) -> None:
+    """Insert rows with one executemany call."""
+    conn.execute(table.insert(), rows)
+
+def get_max_packet_size(conn) -> int:
+    """Largest statement the server accepts, leaving room for protocol overhead."""
+    if conn.dialect.name in ("mysql", "mariadb"):
+        max_allowed_packet = conn.execute(sqlalchemy.text("SELECT @@max_allowed_packet")).scalar()
+        return int(max_allowed_packet * 0.9)
+    return DEFAULT_PACKET_SIZE
+
+def _estimate_row_size(row: Dict) -> int:
+    return sum(len(str(value)) + 4 for value in row.values()) + 4
+
+def _multirow_insert_sql(conn, table: Table, columns: List[str], row_count: int) -> str:
+    """INSERT statement with `row_count` placeholder tuples in the driver's paramstyle."""
+    placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    quote = conn.dialect.identifier_preparer.quote
+    row = "(" + ", ".join([placeholder] * len(columns)) + ")"
+    return (f"INSERT INTO {quote(table.name)} ({', '.join(quote(column) for column in columns)}) "
+            f"VALUES {', '.join([row] * row_count)}")
+
+def load_batch_values(conn, table: Table, rows: List[Dict], max_packet_size: int = None) -> None:
+    """Insert rows with multi-row INSERT ... VALUES statements sized to fit max_allowed_packet."""
+    max_packet_size = max_packet_size or get_max_packet_size(conn)
+    columns = list(rows[0].keys())
+    max_rows = max(1, MAX_BIND_PARAMS // len(columns))
+    
+    def flush(chunk):
+        params = tuple(row.get(column) for row in chunk for column in columns)
+        conn.exec_driver_sql(_multirow_insert_sql(conn, table, columns, len(chunk)), params)
+    
+    chunk, chunk_size = [], 0
+    for row in rows:
+        row_size = _estimate_row_size(row)
+        if chunk and (chunk_size + row_size > max_packet_size or len(chunk) >= max_rows):
+            flush(chunk)
+            chunk, chunk_size = [], 0
+        chunk.append(row)
+        chunk_size += row_size
+    
+    if chunk:
+        flush(chunk)
+
+def _tsv_value(value: Any) -> str:
+    """Format a value for LOAD DATA with its default escaping."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def load_batch_infile(conn, table: Table, rows: List[Dict]) -> None:
+    """
+    Write rows to a temporary TSV file and load it with LOAD DATA LOCAL INFILE.
+    
+    Needs a MariaDB/MySQL target with local_infile enabled on the server;
+    the client side is enabled by create_engine_with_retry(local_infile=True).
+    """
+    if conn.dialect.name not in ("mysql", "mariadb"):
+        raise NotImplementedError(f"LOAD DATA is not supported on {conn.dialect.name}")
+    
+    columns = list(rows[0].keys())
+    with tempfile.NamedTemporaryFile("w", suffix=".tsv", encoding="utf-8", newline="\n", delete=False) as tsv:
+        for row in rows:
+            tsv.write("\t".join(_tsv_value(row.get(column)) for column in columns))
+            tsv.write("\n")
+    
+    try:
+        column_list = ", ".join(f"`{column}`" for column in columns)
+        conn.execute(sqlalchemy.text(
+            f"LOAD DATA LOCAL INFILE :path INTO TABLE `{table.name}` CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({column_list})"
+        ), {"path": tsv.name})
+    finally:
+        os.unlink(tsv.name)
+
+def get_loader(loader: str):
+    """Resolve a loader name to its batch loading function."""
+    if loader == "values":
+        return load_batch_values
+    if loader == "infile":
+        return load_batch_infile
+    return load_batch_executemany
+
+def disable_load_checks(conn) -> None:
+    """
+    Skip unique and foreign key checks for this MariaDB/MySQL session while loading.
+    
+    Secondary indexes of InnoDB tables are still maintained row by row;
+    `ALTER TABLE ... DISABLE KEYS` only applies to MyISAM and is not used.
+    """
+    if conn.dialect.name not in ("mysql", "mariadb"):
+        return
+    conn.execute(sqlalchemy.text("SET SESSION unique_checks = 0"))
+    conn.execute(sqlalchemy.text("SET SESSION foreign_key_checks = 0"))
+
+def enable_load_checks(conn) -> None:
+    """Restore the checks skipped by disable_load_checks."""
+    if conn.dialect.name not in ("mysql", "mariadb"):
+        return
+    conn.execute(sqlalchemy.text("SET SESSION foreign_key_checks = 1"))
+    conn.execute(sqlalchemy.text("SET SESSION unique_checks = 1"))
+
+def stream_table(source_engine, target_engine, table_name: str, source_metadata: MetaData,
+                 target_metadata: MetaData, frappe_mappings: dict = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 checkpoint_table: Table = None, checkpoint: Dict = None,
+                 loader: str = DEFAULT_LOADER) -> int:
+    """
+    Copy one table from source to target batch by batch.
+    
+    Only one batch is held in memory at a time. The target transaction is
+    committed every `commit_every` batches together with the table's
+    checkpoint, so a failed run resumes after the last committed primary key.
+    Tables without a single-column primary key cannot be resumed: their
+    target rows are deleted and the whole copy is committed as one
+    transaction, so a rerun never duplicates rows.
+    
+    Batches are written by the named loader (see LOADERS) with unique and
+    foreign key checks skipped on MariaDB until the table is done.
+    
+    Returns:
+        Number of rows copied in this run
+    """
+    if table_name not in source_metadata.tables:
+        logger.warning(f"Table {table_name} not found in source database")
+        return 0
+    
+    mapping = (frappe_mappings or {}).get(table_name)
+    target_name = mapping["table_name"] if mapping else table_name
+    if target_name not in target_metadata.tables:
+        logger.warning(f"Table {target_name} not found in target database, skipping data load")
+        return 0
+    
+    source_table = source_metadata.tables[table_name]
+    target_table = target_metadata.tables[target_name]
+    pk_columns = [column.name for column in source_table.primary_key.columns]
+    resumable = len(pk_columns) == 1
+    
+    checkpoint = checkpoint or {}
+    after = _resume_value(source_table, checkpoint.get("last_pk"))
+    total = (checkpoint.get("rows_copied") or 0) if after is not None else 0
+    if after is not None:
+        logger.info(f"Resuming {table_name} after primary key {after} ({total} rows already copied)")
+    
+    load_batch = get_loader(loader)
+    copied = 0
+    uncommitted = 0
+    last_pk = after
+    started = time.monotonic()
+    
+    def commit(completed=False):
+        if checkpoint_table is not None:
+            save_checkpoint(conn, checkpoint_table, table_name, last_pk, total + copied, completed)
+        conn.commit()
+    
+    with target_engine.connect() as conn:
+        disable_load_checks(conn)
+        try:
+            if not resumable:
+                conn.execute(target_table.delete())
+            
+            for batch in iter_source_batches(source_engine, source_table, batch_size, after):
+                if resumable:
+                    last_pk = batch[-1][pk_columns[0]]
+                if mapping:
+                    now = datetime.datetime.now()
+                    batch = [transform_row(row, mapping, now) for row in batch]
+                
+                load_batch(conn, target_table, batch)
+                copied += len(batch)
+                uncommitted += 1
+                
+                if resumable and uncommitted >= commit_every:
+                    commit()
+                    uncommitted = 0
+                    logger.info(f"Committed {total + copied} rows into {target_name}")
+            commit(completed=True)
+        except Exception:
+            conn.rollback()
+            logger.error(f"Copy of {table_name} failed after {copied} rows; rows up to the last commit are kept")
+            raise
+        finally:
+            enable_load_checks(conn)
+            conn.commit()
+    
+    elapsed = time.monotonic() - started
+    rate = f"{copied / elapsed:.0f}" if elapsed > 0 else "n/a"
+    logger.info(f"Copied {copied} rows from {table_name} into {target_name} in {elapsed:.1f}s ({rate} rows/sec)")
+    return copied
+
+def get_table_dependencies(metadata: MetaData, tables: List[str]) -> Dict[str, set]:
+    """Map each table to the tables among `tables` it references through foreign keys."""
+    selected = set(tables)
+    dependencies = {}
+    for table_name in tables:
+        table = metadata.tables[table_name]
+        dependencies[table_name] = {
+            foreign_key.column.table.name
+            for foreign_key in table.foreign_keys
+            if foreign_key.column.table.name in selected and foreign_key.column.table.name != table_name
+        }
+    return dependencies
+
+def migrate_data_streaming(source_engine, target_engine, tables: List[str] = None, frappe_mappings: dict = None,
+                           batch_size: int = DEFAULT_BATCH_SIZE, commit_every: int = DEFAULT_COMMIT_EVERY,
+                           workers: int = DEFAULT_WORKERS, restart: bool = False,
+                           loader: str = DEFAULT_LOADER) -> Dict[str, int]:
+    """
+    Stream every table (or the given ones) from source to target.
+    
+    Tables are copied by a pool of workers in foreign key order: a table
+    starts once every table it references has finished, so independent
+    tables run concurrently. Finished tables are recorded in the checkpoint
+    table and skipped when the migration is run again, unless `restart`.
+    
+    Returns:
+        Rows copied per table in this run
+    """
+    source_metadata = MetaData()
+    source_metadata.reflect(bind=source_engine)
+    target_metadata = MetaData()
+    target_metadata.reflect(bind=target_engine)
+    
+    if not tables:
+        tables = list(source_metadata.tables.keys())
+    tables = [table_name for table_name in tables if table_name in source_metadata.tables]
+    
+    checkpoint_table = get_checkpoint_table(target_metadata)
+    checkpoints = load_checkpoints(target_engine, checkpoint_table)
+    if restart and checkpoints:
+        with target_engine.begin() as conn:
+            conn.execute(checkpoint_table.delete())
+        checkpoints = {}
+    
+    dependencies = get_table_dependencies(source_metadata, tables)
+    done = {table_name for table_name in tables if checkpoints.get(table_name, {}).get("completed")}
+    for table_name in sorted(done):
+        logger.info(f"Skipping {table_name}, already migrated")
+    
+    pending = [table_name for table_name in tables if table_name not in done]
+    copied = {}
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running = {}
+        while pending or running:
+            ready = [table_name for table_name in pending if dependencies[table_name] <= done]
+            if not ready and not running:
+                # Circular references: copy the rest without ordering guarantees
+                logger.warning(f"Circular foreign keys between {', '.join(pending)}; copying them in turn")
+                ready = pending[:1]
+            
+            for table_name in ready:
+                pending.remove(table_name)
+                running[pool.submit(stream_table, source_engine, target_engine, table_name,
+                                    source_metadata, target_metadata, frappe_mappings, batch_size,
+                                    commit_every, checkpoint_table, checkpoints.get(table_name),
+                                    loader)] = table_name
+            
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table_name = running.pop(future)
+                copied[table_name] = future.result()
+                done.add(table_name)
+    
+    return copied
+
+# Incremental Sync
+# The Flask app logs changed rows in its `sync_change` table (see change_log.py).
+# A sync applies the entries logged since the last one it applied, copying the
+# current version of each changed row and removing deleted ones.
+
+CHANGE_LOG_TABLE = "sync_change"
+
+# Checkpoint row holding the id of the last change log entry applied
+SYNC_CHECKPOINT = "sync:" + CHANGE_LOG_TABLE
+
+# Target fields kept as first written when a row is updated by a sync
+SYNC_PRESERVED_FIELDS = ("owner", "creation")
+
+# Change log ids are taken when a row is flushed but become visible only when
+# the writing transaction commits, so a lower id can appear after a higher
+# one has been applied. Entries younger than this many seconds are left for
+# the next sync; it must exceed the longest transaction writing tracked rows.
+DEFAULT_SYNC_WINDOW = int(os.environ.get("MIGRATION_SYNC_WINDOW", 60))
+
+def get_upsert_statement(conn, table: Table, rows: List[Dict], key_columns: List[str]):
+    """Build a dialect-native INSERT ... ON DUPLICATE KEY / ON CONFLICT UPDATE for rows."""
+    update_columns = [column for column in rows[0]
+                      if column not in key_columns and column not in SYNC_PRESERVED_FIELDS]
+    dialect = conn.dialect.name
+    
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        statement = insert(table).values(rows)
+        if not update_columns:
+            return statement.prefix_with("IGNORE")
+        return statement.on_duplicate_key_update(**{column: statement.inserted[column] for column in update_columns})
+    
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).values(rows)
+        if not update_columns:
+            return statement.on_conflict_do_nothing(index_elements=key_columns)
+        return statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: statement.excluded[column] for column in update_columns}
+        )
+    
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+def apply_table_changes(source_engine, target_conn, table_name: str, upsert_ids: List[Any], delete_ids: List[Any],
+                        source_metadata: MetaData, target_metadata: MetaData, frappe_mappings: dict = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Copy the current version of changed rows of one table and remove deleted ones.
+    
+    Returns:
+        (rows upserted, rows deleted)
+    """
+    if table_name not in source_metadata.tables:
+        logger.warning(f"Table {table_name} not found in source database, skipping its changes")
+        return 0, 0
+    
+    source_table = source_metadata.tables[table_name]
+    pk_columns = list(source_table.primary_key.columns)
+    if len(pk_columns) != 1:
+        logger.warning(f"Table {table_name} has no single-column primary key, skipping its changes")
+        return 0, 0
+    source_pk = pk_columns[0]
+    
+    mapping = (frappe_mappings or {}).get(table_name)
+    target_name = mapping["table_name"] if mapping else table_name
+    if target_name not in target_metadata.tables:
+        logger.warning(f"Table {target_name} not found in target database, skipping its changes")
+        return 0, 0
+    target_table = target_metadata.tables[target_name]
+    target_pk = mapping.get("field_mappings", {}).get(source_pk.name, source_pk.name) if mapping else source_pk.name
+    
+    # Rows logged as changed but gone from the source were deleted afterwards
+    with source_engine.connect() as source_conn:
+        rows = [dict(row) for row in source_conn.execute(
+            source_table.select().where(source_pk.in_(upsert_ids))).mappings()] if upsert_ids else []
+    found = {row[source_pk.name] for row in rows}
+    delete_ids = list(delete_ids) + [row_id for row_id in upsert_ids if row_id not in found]
+    
+    if mapping:
+        now = datetime.datetime.now()
+        rows = [transform_row(row, mapping, now) for row in rows]
+    
+    for i in range(0, len(rows), batch_size):
+        target_conn.execute(get_upsert_statement(target_conn, target_table, rows[i:i + batch_size], [target_pk]))
+    
+    for i in range(0, len(delete_ids), batch_size):
+        target_conn.execute(target_table.delete().where(target_table.c[target_pk].in_(delete_ids[i:i + batch_size])))
+    
+    return len(rows), len(delete_ids)
+
+def prune_change_log(source_engine, change_table: Table, version: int) -> int:
+    """Delete change log entries up to an applied checkpoint; returns the number removed."""
+    with source_engine.begin() as conn:
+        removed = conn.execute(change_table.delete().where(change_table.c.id <= version)).rowcount
+    logger.info(f"Pruned {removed} applied change log entries")
+    return removed
+
+def sync_incremental(source_engine, target_engine, frappe_mappings: dict = None,
+                     batch_size: int = DEFAULT_BATCH_SIZE, safety_window: int = DEFAULT_SYNC_WINDOW,
+                     prune: bool = True) -> Dict[str, Dict[str, int]]:
+    """
+    Apply the rows changed in the source since the last sync to the target.
+    
+    Change log entries are read `batch_size` at a time in id order. Each
+    batch is applied in one target transaction together with its checkpoint,
+    so an interrupted sync continues from the last applied batch and
+    reapplying a batch is harmless. Only entries older than `safety_window`
+    seconds are applied, and a batch stops at the first younger one, so the
+    checkpoint never moves past an id whose transaction may still commit.
+    With `prune`, applied entries are deleted from the source change log.
+    
+    Returns:
+        {table_name: {"upserted": n, "deleted": n}}
+    """
+    source_metadata = MetaData()
+    source_metadata.reflect(bind=source_engine)
+    target_metadata = MetaData()
+    target_metadata.reflect(bind=target_engine)
+    
+    if CHANGE_LOG_TABLE not in source_metadata.tables:
+        raise RuntimeError(f"Source database has no {CHANGE_LOG_TABLE} table; start the Flask app once to create it")
+    change_table = source_metadata.tables[CHANGE_LOG_TABLE]
+    
+    checkpoint_table = get_checkpoint_table(target_metadata)
+    checkpoint = load_checkpoints(target_engine, checkpoint_table).get(SYNC_CHECKPOINT, {})
+    version = int(checkpoint.get("last_pk") or 0)
+    applied = checkpoint.get("rows_copied") or 0
+    cutoff = datetime.datetime.now() - datetime.timedelta(seconds=safety_window)
+    
+    stats = {}
+    while True:
+        with source_engine.connect() as source_conn:
+            changes = source_conn.execute(
+                change_table.select()
+                .where(change_table.c.id > version)
+                .order_by(change_table.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+        
+        # Stop at the first entry inside the safety window
+        for index, change in enumerate(changes):
+            if change["changed_at"] is None or change["changed_at"] >= cutoff:
+                changes = changes[:index]
+                break
+        if not changes:
+            break
+        
+        # Only the latest entry per row matters
+        latest = {}
+        for change in changes:
+            latest[(change["table_name"], change["row_id"])] = change["operation"]
+        
+        per_table = {}
+        for (table_name, row_id), operation in latest.items():
+            upsert_ids, delete_ids = per_table.setdefault(table_name, ([], []))
+            (delete_ids if operation == "delete" else upsert_ids).append(row_id)
+        
+        with target_engine.connect() as target_conn:
+            try:
+                for table_name, (upsert_ids, delete_ids) in per_table.items():
+                    upserted, deleted = apply_table_changes(source_engine, target_conn, table_name, upsert_ids,
+                                                            delete_ids, source_metadata, target_metadata,
+                                                            frappe_mappings, batch_size)
+                    table_stats = stats.setdefault(table_name, {"upserted": 0, "deleted": 0})
+                    table_stats["upserted"] += upserted
+                    table_stats["deleted"] += deleted
+                
+                version = changes[-1]["id"]
+                applied += len(changes)
+                save_checkpoint(target_conn, checkpoint_table, SYNC_CHECKPOINT, version, applied)
+                target_conn.commit()
+            except Exception:
+                target_conn.rollback()
+                raise
+        
+        logger.info(f"Applied change log entries up to {version}")
+    
+    if prune and version:
+        prune_change_log(source_engine, change_table, version)
+    
+    for table_name, table_stats in stats.items():
+        logger.info(f"Synced {table_name}: {table_stats['upserted']} upserted, {table_stats['deleted']} deleted")
+    
+    return stats
+
 def apply_frappe_migrations(engine) -> None:
     """Apply Frappe-specific migrations if needed."""
     try:
@@ -412,6 +1046,15 @@ def main() -> None:
     parser.add_argument("--source", choices=["postgresql"], help="Source database type")
     parser.add_argument("--target", choices=["mariadb"], help="Target database type")
     parser.add_argument("--upgrade", action="store_true", help="Run schema upgrades only (no data migration)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows read and inserted per batch")
+    parser.add_argument("--commit-every", type=int, default=DEFAULT_COMMIT_EVERY, help="Batches per target transaction")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Tables copied concurrently")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and copy every table again")
+    parser.add_argument("--loader", choices=LOADERS, default=DEFAULT_LOADER, help="How batches are written to the target")
+    parser.add_argument("--sync", action="store_true", help="Copy only rows changed since the last sync")
+    parser.add_argument("--interval", type=int, default=0, help="With --sync, repeat every this many seconds")
+    parser.add_argument("--sync-window", type=int, default=DEFAULT_SYNC_WINDOW,
+                        help="With --sync, leave change log entries younger than this many seconds for the next run")
     
     args = parser.parse_args()
     
@@ -439,7 +1082,19 @@ def main() -> None:
     source_engine = create_engine_with_retry(source_uri)
     
     logger.info(f"Connecting to target database: {target_uri.split('@')[-1]}")
-    target_engine = create_engine_with_retry(target_uri)
+    target_engine = create_engine_with_retry(target_uri, local_infile=args.loader == "infile")
+    
+    # Incremental sync only copies changed rows into the existing schema
+    if args.sync:
+        frappe_mappings = FRAPPE_SCHEMA_MAPPINGS if args.target == "mariadb" else None
+        while True:
+            sync_incremental(source_engine, target_engine, frappe_mappings, batch_size=args.batch_size,
+                             safety_window=args.sync_window)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+        logger.info("Incremental sync completed successfully")
+        return
     
     # Extract schema from source
     logger.info("Extracting schema from source database")
@@ -470,17 +1125,11 @@ def main() -> None:
     
     # Extract, transform, and load data
     if not args.upgrade:
-        logger.info("Extracting data from source database")
-        source_data = extract_data_from_source(source_engine)
-        
-        if args.target == "mariadb" and FRAPPE_SCHEMA_MAPPINGS:
-            logger.info("Transforming data for Frappe schema")
-            target_data = transform_data_for_frappe(source_data, FRAPPE_SCHEMA_MAPPINGS)
-        else:
-            target_data = source_data
-        
-        logger.info("Loading data into target database")
-        load_data_to_target(target_engine, target_data)
+        logger.info("Streaming data from source to target database")
+        frappe_mappings = FRAPPE_SCHEMA_MAPPINGS if args.target == "mariadb" else None
+        migrate_data_streaming(source_engine, target_engine, frappe_mappings=frappe_mappings,
+                               batch_size=args.batch_size, commit_every=args.commit_every,
+                               workers=args.workers, restart=args.restart, loader=args.loader)
     
     # Apply Frappe-specific migrations if needed
     if args.target == "mariadb":
@@ -0,0 +1,238 @@
+"""
+Keyset Pagination for HR List Pages
+
+List pages fetch one page of rows at a time using keyset (seek) pagination:
+rows are ordered by a stable sort key that always ends with the primary key,
+and the next page starts strictly after the last row of the previous one.
+Unlike OFFSET paging, the cost of a page does not grow with its position.
+
+Cursors are opaque, URL-safe strings encoding the sort key of the last row.
+"""
+
+import base64
+import datetime
+import json
+
+from sqlalchemy import func, tuple_, inspect as sa_inspect
+from sqlalchemy.engine import Row
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Totals above this are reported as estimates ("10000+") instead of counted
+COUNT_ESTIMATE_CAP = 10000
+
+class Page:
+    """One page of a keyset-paginated query"""
+
+    def __init__(self, items, limit, next_cursor=None, total=None, total_is_estimate=False):
+        self.items = items
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def to_dict(self, serialize=None):
+        """Return the paging contract shared by the HTML views and JSON APIs"""
+        items = [serialize(item) for item in self.items] if serialize else self.items
+        return {
+            "data": items,
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_next,
+            "page_length": self.limit,
+            "total_count": self.total,
+            "total_is_estimate": self.total_is_estimate
+        }
+
+def encode_cursor(values):
+    """Encode a row's sort key values into an opaque cursor string"""
+    payload = []
+    for value in values:
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        payload.append(value)
+
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_keys):
+    """Decode a cursor back into typed sort key values for the given columns"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise ValueError("Invalid pagination cursor")
+
+    decoded = []
+    for column, value in zip(sort_keys, values):
+        python_type = column.type.python_type
+        if value is not None and python_type is datetime.datetime:
+            value = datetime.datetime.fromisoformat(value)
+        elif value is not None and python_type is datetime.date:
+            value = datetime.date.fromisoformat(value)
+        decoded.append(value)
+
+    return decoded
+
+def get_page_args(args, sort_fields, default_sort, default_order='asc'):
+    """
+    Read paging parameters from request args
+
+    `sort_fields` maps the public sort names accepted in `?sort=` to the
+    list of columns they order by (ending with a unique column); anything
+    else falls back to `default_sort`.
+
+    Returns:
+        tuple: (sort_keys, descending, cursor, limit)
+    """
+    sort = args.get('sort')
+    if sort not in sort_fields:
+        sort = default_sort
+
+    order = (args.get('order') or default_order).lower()
+    descending = order == 'desc'
+
+    try:
+        limit = int(args.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # A stale or tampered cursor restarts from the first page
+    sort_keys = sort_fields[sort]
+    cursor = args.get('cursor') or None
+    if cursor:
+        try:
+            decode_cursor(cursor, sort_keys)
+        except ValueError:
+            cursor = None
+
+    return sort_keys, descending, cursor, limit
+
+def apply_filters(query, filter_fields, args):
+    """
+    Push equality filters from request args into the SQL query
+
+    `filter_fields` maps accepted argument names to the columns they filter;
+    empty and unknown arguments are ignored.
+    """
+    for name, column in filter_fields.items():
+        value = args.get(name)
+        if value not in (None, ''):
+            query = query.filter(column == value)
+    return query
+
+def apply_date_filters(query, filter_fields, args):
+    """
+    Push date bounds (YYYY-MM-DD) from request args into the SQL query
+
+    `filter_fields` maps accepted argument names to functions building the
+    condition from the parsed date. Empty arguments are ignored, and so are
+    invalid dates, whose argument names are returned for the caller to report.
+
+    Returns:
+        tuple: (query, names of the arguments that were not valid dates)
+    """
+    invalid = []
+    for name, condition in filter_fields.items():
+        value = args.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            query = query.filter(condition(datetime.datetime.strptime(value, '%Y-%m-%d').date()))
+        except ValueError:
+            invalid.append(name)
+    return query, invalid
+
+def estimate_count(query, cap=COUNT_ESTIMATE_CAP):
+    """
+    Count the rows of a query, stopping after `cap` rows
+
+    Returns:
+        tuple: (count, is_estimate) where is_estimate means "at least count"
+    """
+    from app import db
+
+    # Only the primary key of the listed entity is selected for counting
+    entity = query.column_descriptions[0]['entity']
+    primary_key = sa_inspect(entity).primary_key[0]
+
+    capped = (query.enable_eagerloads(False)
+              .with_entities(primary_key)
+              .order_by(None)
+              .limit(cap + 1)
+              .subquery())
+    count = db.session.query(func.count()).select_from(capped).scalar()
+
+    if count > cap:
+        return cap, True
+    return count, False
+
+def next_page_url(page):
+    """URL of the page after `page`, keeping the current sort and filter args"""
+    from flask import request, url_for
+
+    if page is None or not page.has_next:
+        return None
+
+    args = request.args.to_dict()
+    args['cursor'] = page.next_cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+def first_page_url():
+    """URL of the first page, keeping the current sort and filter args"""
+    from flask import request, url_for
+
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+def _row_entity(row):
+    """Return the mapped object of a result row (first element of tuple rows)"""
+    if isinstance(row, (Row, tuple)):
+        return row[0]
+    return row
+
+def paginate(query, sort_keys, descending=False, cursor=None, limit=DEFAULT_PAGE_SIZE, with_total=True):
+    """
+    Fetch one page of `query` ordered by `sort_keys`
+
+    Args:
+        query: SQLAlchemy ORM query with all filters already applied
+        sort_keys (list): Non-nullable mapped columns; the last one must be unique
+        descending (bool): Sort direction for every key
+        cursor (str, optional): Cursor returned as `next_cursor` by the previous page
+        limit (int): Page size
+        with_total (bool): Also compute a (capped) total row count
+
+    Returns:
+        Page: The page of rows and the cursor for the next one
+    """
+    total, total_is_estimate = (None, False)
+    if with_total:
+        total, total_is_estimate = estimate_count(query)
+
+    # Seek past the last row of the previous page using a row-value comparison,
+    # which databases resolve with a range scan on a matching composite index
+    if cursor:
+        values = decode_cursor(cursor, sort_keys)
+        key = tuple_(*sort_keys)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    order_by = [column.desc() if descending else column.asc() for column in sort_keys]
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = _row_entity(rows[-1])
+        next_cursor = encode_cursor([getattr(last, column.key) for column in sort_keys])
+
+    return Page(rows, limit, next_cursor=next_cursor, total=total, total_is_estimate=total_is_estimate)
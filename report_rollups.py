@@ -0,0 +1,407 @@
+"""
+Monthly Report Rollups
+
+The attendance, leave and payroll reports read pre-aggregated monthly
+rollup tables instead of scanning Attendance, LeaveApplication and
+SalarySlip rows, so a multi-year trend reads a few hundred rollup rows:
+
+- `attendance_rollup`: days per (month, department, status)
+- `leave_rollup`: approved applications and days per (month, leave type),
+  booked against the month of their from_date
+- `payroll_rollup`: slips and pay totals per (month, department), booked
+  against the month of their end_date; cancelled slips are left out
+
+Rollups are refreshed incrementally. Whenever a fact row is flushed, the
+months it was and is booked in are appended to `rollup_stale_month`
+(bulk Core writers call `mark_stale_months()` themselves). Before a report
+is read, `refresh_rollups()` recomputes just those months with one grouped
+query each. Moving an employee to another department marks every month
+they have facts in, since rollups group by the employee's department.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, or_, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+ATTENDANCE = 'attendance'
+LEAVE = 'leave'
+PAYROLL = 'payroll'
+
+APPROVED = 'Approved'
+CANCELLED = 'Cancelled'
+
+# Department stored for employees without one, and how it is shown
+UNASSIGNED = ''
+UNASSIGNED_LABEL = 'Unassigned'
+
+# Months shown by the report pages when no range is given
+DEFAULT_REPORT_MONTHS = 12
+
+# Stale month marks deleted per statement after a refresh
+MARK_DELETE_CHUNK_SIZE = 1000
+
+def month_start(value):
+    """First day of the month of a date"""
+    return value.replace(day=1)
+
+def next_month(month):
+    """First day of the month after a month's first day"""
+    return (month + timedelta(days=32)).replace(day=1)
+
+def iter_months(start, end):
+    """First days of every month from start to end, inclusive"""
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+def month_label(month):
+    return month.strftime('%b %Y')
+
+def _percentage(part, whole):
+    return round(part * 100 / whole, 1) if whole else 0
+
+# ------------------------------------------------------
+# Stale month tracking
+# ------------------------------------------------------
+
+def _booking_attributes():
+    """{model: (rollup, date attribute)} for the fact models"""
+    from app import Attendance, LeaveApplication, SalarySlip
+
+    return {
+        Attendance: (ATTENDANCE, 'attendance_date'),
+        LeaveApplication: (LEAVE, 'from_date'),
+        SalarySlip: (PAYROLL, 'end_date'),
+    }
+
+def _history_values(instance, key, committed=True, current=True):
+    """Previous and/or current values of an attribute, ignoring None"""
+    history = sa_inspect(instance).attrs[key].history
+    if not history:
+        # Expired since it was loaded; the stored value is still current
+        values = [getattr(instance, key)]
+    else:
+        values = []
+        if committed:
+            values.extend(history.deleted or history.unchanged or ())
+        if current:
+            values.extend(history.added or history.unchanged or ())
+    return [value for value in values if value is not None]
+
+def _employee_fact_months(session, employee_id):
+    """{rollup: months} an employee has attendance or salary slips in"""
+    from app import Attendance, SalarySlip
+
+    months = {}
+    for rollup, column, employee_column in ((ATTENDANCE, Attendance.attendance_date, Attendance.employee_id),
+                                            (PAYROLL, SalarySlip.end_date, SalarySlip.employee_id)):
+        first, last = session.query(func.min(column), func.max(column)).filter(employee_column == employee_id).one()
+        if first is not None:
+            months[rollup] = set(iter_months(first, last))
+    return months
+
+def collect_stale_months(session):
+    """Return {rollup: months} touched by pending changes in a session"""
+    from app import Employee
+
+    attributes = _booking_attributes()
+    stale = defaultdict(set)
+
+    for instance in session.new:
+        booking = attributes.get(type(instance))
+        if booking:
+            stale[booking[0]].update(month_start(value) for value in _history_values(instance, booking[1], committed=False))
+
+    for instance in session.dirty:
+        if not session.is_modified(instance, include_collections=False):
+            continue
+
+        booking = attributes.get(type(instance))
+        if booking:
+            stale[booking[0]].update(month_start(value) for value in _history_values(instance, booking[1]))
+        elif isinstance(instance, Employee) and sa_inspect(instance).attrs.department.history.has_changes():
+            for rollup, months in _employee_fact_months(session, instance.id).items():
+                stale[rollup].update(months)
+
+    for instance in session.deleted:
+        booking = attributes.get(type(instance))
+        if booking:
+            stale[booking[0]].update(month_start(value) for value in _history_values(instance, booking[1], current=False))
+
+    return stale
+
+def mark_stale_months(session, rollup, dates):
+    """Queue the months of the given dates for recomputation of a rollup"""
+    from app import RollupStaleMonth
+
+    months = {month_start(value) for value in dates if value is not None}
+    if months:
+        session.execute(RollupStaleMonth.__table__.insert(), [
+            {'rollup': rollup, 'month': month} for month in sorted(months)
+        ])
+
+def _before_flush(session, flush_context, instances):
+    with session.no_autoflush:
+        for rollup, months in collect_stale_months(session).items():
+            mark_stale_months(session, rollup, months)
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+def register_report_rollups(session):
+    """Mark rollup months stale as facts are flushed through the given session"""
+    from app import Employee
+
+    # Load previous values on change, even on expired instances, so the month
+    # a row moves out of is refreshed too
+    for model, (rollup, key) in _booking_attributes().items():
+        event.listen(getattr(model, key), 'set', _keep_history, active_history=True, retval=True)
+    event.listen(Employee.department, 'set', _keep_history, active_history=True, retval=True)
+
+    event.listen(session, 'before_flush', _before_flush)
+
+# ------------------------------------------------------
+# Refreshing
+# ------------------------------------------------------
+
+def _replace_month(model, month, rows):
+    """Replace the rollup rows of one month"""
+    from app import db
+
+    db.session.execute(model.__table__.delete().where(model.month == month))
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+def refresh_attendance_month(month):
+    from app import db, Employee, Attendance, AttendanceRollup
+
+    department = func.coalesce(Employee.department, UNASSIGNED)
+    query = (db.session.query(department, Attendance.status, func.count(Attendance.id))
+             .join(Employee, Employee.id == Attendance.employee_id)
+             .filter(Attendance.attendance_date >= month, Attendance.attendance_date < next_month(month))
+             .group_by(department, Attendance.status))
+
+    _replace_month(AttendanceRollup, month, [
+        {'month': month, 'department': dept, 'status': status, 'days': days}
+        for dept, status, days in query
+    ])
+
+def refresh_leave_month(month):
+    from app import db, LeaveApplication, LeaveRollup
+
+    query = (db.session.query(LeaveApplication.leave_type_id,
+                              func.count(LeaveApplication.id),
+                              func.sum(func.coalesce(LeaveApplication.total_leave_days, 0)))
+             .filter(LeaveApplication.status == APPROVED,
+                     LeaveApplication.from_date >= month, LeaveApplication.from_date < next_month(month))
+             .group_by(LeaveApplication.leave_type_id))
+
+    _replace_month(LeaveRollup, month, [
+        {'month': month, 'leave_type_id': leave_type_id, 'applications': applications, 'days': float(days or 0)}
+        for leave_type_id, applications, days in query
+    ])
+
+def refresh_payroll_month(month):
+    from app import db, Employee, SalarySlip, PayrollRollup
+
+    department = func.coalesce(Employee.department, UNASSIGNED)
+    query = (db.session.query(department,
+                              func.count(SalarySlip.id),
+                              func.sum(func.coalesce(SalarySlip.gross_pay, 0)),
+                              func.sum(func.coalesce(SalarySlip.total_deduction, 0)),
+                              func.sum(func.coalesce(SalarySlip.net_pay, 0)))
+             .join(Employee, Employee.id == SalarySlip.employee_id)
+             .filter(SalarySlip.end_date >= month, SalarySlip.end_date < next_month(month),
+                     or_(SalarySlip.status.is_(None), SalarySlip.status != CANCELLED))
+             .group_by(department))
+
+    _replace_month(PayrollRollup, month, [
+        {'month': month, 'department': dept, 'slips': slips, 'gross_pay': float(gross or 0),
+         'total_deduction': float(deduction or 0), 'net_pay': float(net or 0)}
+        for dept, slips, gross, deduction, net in query
+    ])
+
+REFRESHERS = {
+    ATTENDANCE: refresh_attendance_month,
+    LEAVE: refresh_leave_month,
+    PAYROLL: refresh_payroll_month,
+}
+
+def refresh_rollups():
+    """
+    Recompute the rollup months marked stale
+
+    Returns:
+        dict: {rollup: number of months recomputed}
+    """
+    from app import db, RollupStaleMonth
+
+    marks = db.session.query(RollupStaleMonth.id, RollupStaleMonth.rollup, RollupStaleMonth.month).all()
+    if not marks:
+        return {}
+
+    stale = defaultdict(set)
+    for _, rollup, month in marks:
+        stale[rollup].add(month)
+
+    # Recompute the months and clear the marks that were read in one
+    # transaction; marks committed meanwhile, whatever their id, are kept
+    # for the next refresh
+    mark_ids = [mark_id for mark_id, _, _ in marks]
+    try:
+        for rollup, months in stale.items():
+            for month in sorted(months):
+                REFRESHERS[rollup](month)
+        for start in range(0, len(mark_ids), MARK_DELETE_CHUNK_SIZE):
+            db.session.query(RollupStaleMonth).filter(
+                RollupStaleMonth.id.in_(mark_ids[start:start + MARK_DELETE_CHUNK_SIZE])
+            ).delete(synchronize_session=False)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent refresh wrote the same months first
+        db.session.rollback()
+        logger.warning("Report rollups were refreshed concurrently; keeping the other refresh")
+        return {}
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {rollup: len(months) for rollup, months in stale.items()}
+
+def rebuild_rollups():
+    """
+    Recompute every month that has facts, e.g. after bulk SQL updates
+
+    Returns:
+        dict: {rollup: number of months recomputed}
+    """
+    from app import db, Attendance, LeaveApplication, SalarySlip
+
+    for rollup, column in ((ATTENDANCE, Attendance.attendance_date),
+                           (LEAVE, LeaveApplication.from_date),
+                           (PAYROLL, SalarySlip.end_date)):
+        first, last = db.session.query(func.min(column), func.max(column)).one()
+        if first is not None:
+            mark_stale_months(db.session, rollup, iter_months(first, last))
+
+    return refresh_rollups()
+
+# ------------------------------------------------------
+# Reports
+# ------------------------------------------------------
+
+def get_report_range(args, months=DEFAULT_REPORT_MONTHS):
+    """
+    Read from_date/to_date (YYYY-MM-DD) request arguments
+
+    Defaults to the last `months` months up to today; rollups are monthly, so
+    the range is widened to whole months.
+    """
+    today = date.today()
+    default_from = month_start(today)
+    for _ in range(months - 1):
+        default_from = month_start(default_from - timedelta(days=1))
+
+    def parse(name, default):
+        try:
+            return datetime.strptime(args.get(name), '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return default
+
+    from_date, to_date = parse('from_date', default_from), parse('to_date', today)
+    if from_date > to_date:
+        from_date, to_date = to_date, from_date
+
+    return month_start(from_date), month_start(to_date)
+
+def _rollup_rows(model, columns, from_date, to_date, group_by):
+    """Sum rollup columns over the months of a range, grouped by the given columns"""
+    from app import db
+
+    refresh_rollups()
+    return (db.session.query(*group_by, *[func.sum(column) for column in columns])
+            .filter(model.month >= month_start(from_date), model.month <= month_start(to_date))
+            .group_by(*group_by)
+            .all())
+
+def get_attendance_trend(from_date, to_date):
+    """Share of marked days that were Present, per month"""
+    from app import AttendanceRollup
+
+    present, marked = defaultdict(int), defaultdict(int)
+    for month, status, days in _rollup_rows(AttendanceRollup, [AttendanceRollup.days], from_date, to_date,
+                                            [AttendanceRollup.month, AttendanceRollup.status]):
+        marked[month] += days
+        if status == 'Present':
+            present[month] += days
+
+    return [{'month': month_label(month), 'present_percentage': _percentage(present[month], marked[month])}
+            for month in iter_months(from_date, to_date)]
+
+def get_department_attendance(from_date, to_date):
+    """Share of marked days that were Present or Absent, per department"""
+    from app import AttendanceRollup
+
+    days_by_status = defaultdict(lambda: defaultdict(int))
+    for department, status, days in _rollup_rows(AttendanceRollup, [AttendanceRollup.days], from_date, to_date,
+                                                 [AttendanceRollup.department, AttendanceRollup.status]):
+        days_by_status[department][status] += days
+
+    return [
+        {
+            'department': department or UNASSIGNED_LABEL,
+            'present_percentage': _percentage(statuses['Present'], sum(statuses.values())),
+            'absent_percentage': _percentage(statuses['Absent'], sum(statuses.values()))
+        }
+        for department, statuses in sorted(days_by_status.items())
+    ]
+
+def get_leave_utilization(from_date, to_date):
+    """Approved leave days, per month"""
+    from app import LeaveRollup
+
+    days = dict(_rollup_rows(LeaveRollup, [LeaveRollup.days], from_date, to_date, [LeaveRollup.month]))
+
+    return [{'month': month_label(month), 'days_taken': float(days.get(month) or 0)}
+            for month in iter_months(from_date, to_date)]
+
+def get_leave_by_type(from_date, to_date):
+    """Approved leave days and their share, per leave type"""
+    from app import LeaveRollup, LeaveType
+
+    days = dict(_rollup_rows(LeaveRollup, [LeaveRollup.days], from_date, to_date, [LeaveRollup.leave_type_id]))
+    total = sum(value or 0 for value in days.values())
+
+    return [
+        {'type': leave_type.name, 'days_taken': float(days.get(leave_type.id) or 0),
+         'percentage': _percentage(days.get(leave_type.id) or 0, total)}
+        for leave_type in LeaveType.query.order_by(LeaveType.name).all()
+    ]
+
+def get_payroll_trend(from_date, to_date):
+    """Net pay of non-cancelled salary slips, per month"""
+    from app import PayrollRollup
+
+    amounts = dict(_rollup_rows(PayrollRollup, [PayrollRollup.net_pay], from_date, to_date, [PayrollRollup.month]))
+
+    return [{'month': month_label(month), 'amount': round(amounts.get(month) or 0, 2)}
+            for month in iter_months(from_date, to_date)]
+
+def get_payroll_by_department(from_date, to_date):
+    """Net pay and its share, per department"""
+    from app import PayrollRollup
+
+    amounts = _rollup_rows(PayrollRollup, [PayrollRollup.net_pay], from_date, to_date, [PayrollRollup.department])
+    total = sum(amount or 0 for _, amount in amounts)
+
+    return [
+        {'department': department or UNASSIGNED_LABEL, 'amount': round(amount or 0, 2),
+         'percentage': _percentage(amount or 0, total)}
+        for department, amount in sorted(amounts)
+    ]
@@ -0,0 +1,52 @@
+"""
+Shared fixtures for the Flask app tests
+
+Each test runs against a fresh SQLite database filled by `add_test_data()`.
+The database URL must be set before `app` is imported, so it is set here at
+collection time.
+"""
+
+import os
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix='hr_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def hr():
+    """The app module with a freshly created and seeded database"""
+    import app as hr_app
+    from dashboard import invalidate_dashboard_snapshot
+
+    hr_app.app.config['TESTING'] = True
+    invalidate_dashboard_snapshot()
+
+    with hr_app.app.app_context():
+        hr_app.db.drop_all()
+        hr_app.db.create_all()
+        hr_app.add_test_data()
+        yield hr_app
+        hr_app.db.session.remove()
+
+@pytest.fixture
+def client(hr):
+    return hr.app.test_client()
+
+@pytest.fixture
+def login(client):
+    """Log the test client in as one of the seeded users"""
+    def _login(username='hr_manager', password='hr123'):
+        client.get('/logout')
+        return client.post('/login', data={'username': username, 'password': password})
+    return _login
+
+@pytest.fixture
+def migrate(hr, tmp_path, monkeypatch):
+    """migrate_db, imported from a scratch directory since it logs to a file in the working directory"""
+    monkeypatch.chdir(tmp_path)
+    import migrate_db
+    return migrate_db
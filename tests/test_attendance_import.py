@@ -0,0 +1,62 @@
+import io
+import json
+from datetime import date
+
+import attendance_import
+from attendance_import import import_attendance, iter_records
+
+def jsonl(*records):
+    return '\n'.join(json.dumps(record) for record in records).encode()
+
+def test_imports_valid_rows_and_reports_invalid_ones(hr):
+    body = jsonl(
+        {'employee_id': 'EMP001', 'attendance_date': '2024-03-04', 'status': 'Present'},
+        {'employee_id': 'EMP404', 'attendance_date': '2024-03-04', 'status': 'Present'},
+        {'employee_id': 'EMP002', 'attendance_date': '2024-03-04', 'status': 'Sleeping'}
+    ) + b'\nnot json\n'
+
+    report = import_attendance(iter_records(io.BytesIO(body), 'jsonl'))
+
+    assert (report['rows_received'], report['rows_written'], report['rows_failed']) == (4, 1, 3)
+    assert [error['row'] for error in report['errors']] == [2, 3, 4]
+    assert hr.Attendance.query.filter_by(attendance_date=date(2024, 3, 4)).count() == 1
+
+def test_reimporting_a_day_updates_it(hr):
+    for status in ('Absent', 'Present'):
+        body = jsonl({'employee_id': 'EMP001', 'attendance_date': '2024-03-04', 'status': status})
+        import_attendance(iter_records(io.BytesIO(body), 'jsonl'))
+
+    rows = hr.Attendance.query.filter_by(attendance_date=date(2024, 3, 4)).all()
+    assert [row.status for row in rows] == ['Present']
+
+def test_invalid_utf8_is_reported_not_raised(hr):
+    body = b'employee_id,attendance_date,status\nEMP001,2024-03-04,Present\nEMP002,2024-03-04,\xff\xfe\n'
+
+    report = import_attendance(iter_records(io.BytesIO(body), 'csv'))
+
+    assert report['rows_failed'] == 1
+    assert 'UTF-8' in report['errors'][0]['error']
+
+def test_malformed_csv_is_reported_not_raised(hr):
+    # A field beyond the csv module's size limit cannot be parsed
+    body = b'employee_id,attendance_date,status\nEMP001,2024-03-04,' + b'x' * 200000 + b'\n'
+
+    report = import_attendance(iter_records(io.BytesIO(body), 'csv'))
+
+    assert report['rows_failed'] == 1
+    assert report['errors'][0]['row'] == 2
+    assert 'Malformed CSV' in report['errors'][0]['error']
+
+def test_endpoint_caps_batch_size(hr, client, login, monkeypatch):
+    seen = []
+    real_import = hr.import_attendance
+    monkeypatch.setattr(hr, 'import_attendance',
+                        lambda records, batch_size: seen.append(batch_size) or real_import(records, batch_size))
+    login()
+
+    body = jsonl({'employee_id': 'EMP001', 'attendance_date': '2024-03-04', 'status': 'Present'})
+    response = client.post('/api/attendance/bulk?batch_size=1000000', data=body,
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 200
+    assert seen == [attendance_import.MAX_BATCH_SIZE]
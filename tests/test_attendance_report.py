@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from attendance_report import get_monthly_attendance_report, iter_report_csv
+
+def test_report_counts_each_status_per_employee(hr):
+    employee = hr.Employee.query.filter_by(employee_id='EMP001').one()
+    for day, status in ((4, 'Present'), (5, 'Half Day'), (6, 'Absent')):
+        hr.db.session.add(hr.Attendance(employee_id=employee.id, attendance_date=date(2024, 3, day), status=status))
+    hr.db.session.commit()
+
+    report = get_monthly_attendance_report(2024, 3)
+    row = next(row for row in report['employees'] if row['employee_id'] == 'EMP001')
+
+    assert (row['present_days'], row['half_days'], row['absent_days'], row['leave_days']) == (1, 1, 1, 0)
+    assert row['attendance_percentage'] == round(1.5 * 100 / report['total_working_days'], 1)
+    assert len(report['employees']) == hr.Employee.query.filter_by(status='Active').count()
+
+def test_csv_export_has_a_row_per_employee(hr):
+    report = get_monthly_attendance_report(2024, 3)
+
+    lines = ''.join(iter_report_csv(report)).splitlines()
+
+    assert lines[0].startswith('Employee ID,')
+    assert len(lines) == len(report['employees']) + 1
+
+@pytest.mark.parametrize('query', ['year=0&month=3', 'year=10000&month=3', 'year=2024&month=13'])
+def test_out_of_range_months_fall_back_to_the_current_one(client, login, query):
+    login()
+
+    response = client.get(f'/attendance/monthly-report?{query}&format=csv')
+
+    assert response.status_code == 200
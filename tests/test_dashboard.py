@@ -0,0 +1,22 @@
+from datetime import date
+
+def test_snapshot_counts_active_employees_and_open_items(hr):
+    from dashboard import build_dashboard_snapshot
+
+    snapshot = build_dashboard_snapshot(date.today())
+
+    assert snapshot['employee_count'] == hr.Employee.query.filter_by(status='Active').count()
+    assert snapshot['leave_pending'] == hr.LeaveApplication.query.filter_by(status='Open').count()
+    assert snapshot['job_openings'] == hr.JobOpening.query.filter_by(status='Open').count()
+
+def test_snapshot_is_cached_until_invalidated(hr):
+    from dashboard import get_dashboard_snapshot, invalidate_dashboard_snapshot
+
+    first = get_dashboard_snapshot()
+    hr.db.session.add(hr.Employee(employee_id='EMP900', first_name='New', status='Active'))
+    hr.db.session.commit()
+
+    assert get_dashboard_snapshot()['employee_count'] == first['employee_count']
+
+    invalidate_dashboard_snapshot()
+    assert get_dashboard_snapshot()['employee_count'] == first['employee_count'] + 1
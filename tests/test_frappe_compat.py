@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+@pytest.fixture
+def compat(hr):
+    import frappe_compat
+    frappe_compat.init_app(hr.db)
+    return frappe_compat
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def test_get_all_selects_only_requested_fields(hr, compat):
+    with count_queries(hr.db.engine) as statements:
+        rows = compat.get_all('Employee', fields='employee_id, first_name', order_by='employee_id',
+                              ignore_permissions=True)
+
+    assert rows[:2] == [{'employee_id': 'EMP001', 'first_name': 'John'},
+                        {'employee_id': 'EMP002', 'first_name': 'Jane'}]
+    assert len(statements) == 1 and 'last_name' not in statements[0]
+
+def test_get_all_as_list_and_pluck(hr, compat):
+    assert compat.get_all('Employee', fields=['employee_id'], order_by='employee_id', as_list=True,
+                          ignore_permissions=True)[:2] == [['EMP001'], ['EMP002']]
+    assert compat.get_all('Employee', pluck='employee_id', order_by='employee_id',
+                          ignore_permissions=True)[:2] == ['EMP001', 'EMP002']
+
+def test_db_get_value_shapes(hr, compat):
+    employee = hr.Employee.query.filter_by(employee_id='EMP001').one()
+
+    assert compat.db_get_value('Employee', employee.id, 'employee_id') == 'EMP001'
+    assert compat.db_get_value('Employee', {'employee_id': 'EMP001'}, ['id', 'employee_id']) == [employee.id, 'EMP001']
+    assert compat.db_get_value('Employee', {'employee_id': 'EMP001'}, 'id', as_dict=True) == {'id': employee.id}
+    assert compat.db_get_value('Employee', {'employee_id': 'EMP999'}, 'id') is None
+
+def test_wrapper_tracks_dirty_fields(hr, compat):
+    doc = compat.get_doc('Employee', filters={'employee_id': 'EMP001'})
+
+    assert doc.first_name == 'John' and doc.get('reports_to', 'none') == 'none'
+    with pytest.raises(AttributeError, match="'Employee' object has no attribute 'missing'"):
+        doc.missing
+
+    doc.designation = 'Lead'
+    doc.not_a_column = 1
+    assert doc.get_dirty_fields() == {'designation'}
+    assert doc.has_value_changed('designation')
+
+    doc.reload()
+    assert doc.designation == 'Software Developer' and doc.get_dirty_fields() == set()
+
+def test_save_writes_only_changed_columns(hr, compat):
+    doc = compat.get_doc('Department', filters={'name': hr.Department.query.first().name})
+
+    with count_queries(hr.db.engine) as statements:
+        doc.save(ignore_permissions=True)
+    assert not [statement for statement in statements if statement.startswith('UPDATE')]
+
+    doc.department_head = hr.Employee.query.first().id
+    with count_queries(hr.db.engine) as statements:
+        doc.save(ignore_permissions=True)
+    updates = [statement for statement in statements if statement.startswith('UPDATE')]
+    assert len(updates) == 1 and 'SET department_head=' in updates[0] and 'name=' not in updates[0].split('WHERE')[0]
+    assert doc.get_dirty_fields() == set()
+
+@pytest.fixture
+def hook_calls(monkeypatch):
+    import hooks
+    calls = []
+    monkeypatch.setattr(hooks, 'trigger_hook', lambda doctype, event, doc: calls.append((doctype, event)))
+    return calls
+
+def new_department(compat, name):
+    return compat.new_doc('Department').update({'name': name})
+
+def test_transaction_commits_once_and_defers_after_hooks(hr, compat, hook_calls):
+    commits = []
+    def record(session):
+        commits.append(session)
+    event.listen(hr.db.session, 'after_commit', record)
+    try:
+        with compat.transaction():
+            for name in ('Audit', 'Legal'):
+                new_department(compat, name).insert(ignore_permissions=True)
+            assert hook_calls == [] and commits == []
+    finally:
+        event.remove(hr.db.session, 'after_commit', record)
+
+    assert len(commits) == 1
+    assert hook_calls == [('Department', 'after_insert')] * 2
+    assert {'Audit', 'Legal'} <= {department.name for department in hr.Department.query}
+
+def test_transaction_rolls_back_on_error(hr, compat, hook_calls):
+    with pytest.raises(RuntimeError), compat.transaction():
+        new_department(compat, 'Audit').insert(ignore_permissions=True)
+        raise RuntimeError('import failed')
+
+    assert hook_calls == []
+    assert compat.current_transaction() is None
+    assert hr.Department.query.filter_by(name='Audit').count() == 0
+
+def test_writes_outside_a_transaction_commit_on_their_own(hr, compat, hook_calls):
+    new_department(compat, 'Audit').insert(ignore_permissions=True)
+    hr.db.session.rollback()
+
+    assert hr.Department.query.filter_by(name='Audit').count() == 1
+    assert hook_calls == [('Department', 'after_insert')]
+
+def test_fields_that_are_not_columns_are_read_from_the_objects(hr, compat):
+    rows = compat.get_all('Employee', fields=['employee_id', 'employee_name'], order_by='employee_id',
+                          ignore_permissions=True)
+
+    assert rows[:2] == [{'employee_id': 'EMP001', 'employee_name': 'John Smith'},
+                        {'employee_id': 'EMP002', 'employee_name': 'Jane Doe'}]
+    assert compat.get_all('Employee', fields=['employee_name'], filters={'employee_id': 'EMP002'},
+                          as_list=True, ignore_permissions=True) == [['Jane Doe']]
+    assert compat.get_all('Employee', pluck='employee_name', filters={'employee_id': 'EMP001'},
+                          ignore_permissions=True) == ['John Smith']
+    assert compat.db_get_value('Employee', {'employee_id': 'EMP001'}, ['employee_id', 'employee_name'],
+                               as_dict=True) == {'employee_id': 'EMP001', 'employee_name': 'John Smith'}
@@ -0,0 +1,36 @@
+import pytest
+
+from frappe_filters import FilterError, compile_query
+
+def employee_codes(hr, filters):
+    statement, params = compile_query(hr.Employee, filters, columns=['employee_id'], order_by='employee_id asc')
+    return hr.db.session.execute(statement, params).scalars().all()
+
+@pytest.fixture
+def employees(hr):
+    for code, status in (('EMP_1', 'Active'), ('EMPX1', 'Active'), ('EMP_2', 'Left')):
+        hr.db.session.add(hr.Employee(employee_id=code, first_name=code, status=status))
+    hr.db.session.commit()
+    return hr
+
+def test_like_without_wildcards_matches_literally(employees):
+    assert employee_codes(employees, {'employee_id': ['like', 'EMP_1']}) == ['EMP_1']
+    assert 'EMPX1' in employee_codes(employees, {'employee_id': ['not like', 'EMP_']})
+
+def test_like_with_percent_is_used_as_given(employees):
+    assert set(employee_codes(employees, {'employee_id': ['like', 'EMP_1%']})) == {'EMP_1', 'EMPX1'}
+
+def test_list_filters_and_in(employees):
+    filters = [['employee_id', 'in', ['EMP_1', 'EMP_2', 'EMPX1']], ['status', '!=', 'Left']]
+    assert set(employee_codes(employees, filters)) == {'EMP_1', 'EMPX1'}
+
+def test_same_shape_reuses_the_statement(employees):
+    first, _ = compile_query(employees.Employee, {'status': 'Active'})
+    second, params = compile_query(employees.Employee, {'status': 'Left'})
+
+    assert first is second
+    assert list(params.values()) == ['Left']
+
+def test_unknown_fields_are_rejected(hr):
+    with pytest.raises(FilterError):
+        compile_query(hr.Employee, {'password_hash; DROP TABLE user': 'x'})
@@ -0,0 +1,44 @@
+import pytest
+
+import hooks
+
+@pytest.fixture
+def dispatch(monkeypatch):
+    """Dispatch tables built from test registries"""
+    monkeypatch.setattr(hooks, 'doc_events', {'Employee': {'on_update': 'os.path.basename'}})
+    monkeypatch.setattr(hooks, 'permission_query_conditions', {'Employee': 'no_such_module.conditions'})
+    monkeypatch.setattr(hooks, 'has_permission', {})
+    monkeypatch.setattr(hooks, 'scheduler_events', {'daily': ['os.path.missing_function', 'os.getcwd']})
+    monkeypatch.setattr(hooks, '_dispatch_table', None)
+    hooks.reset_hook_stats()
+    yield hooks
+    hooks.reset_hook_stats()
+
+def test_unresolvable_paths_are_reported_once_at_startup(dispatch):
+    errors = dispatch.init_hooks()
+
+    assert sorted((registry, path) for registry, path, _ in errors) == [
+        ('permission_query_conditions', 'no_such_module.conditions'),
+        ('scheduler_events', 'os.path.missing_function')
+    ]
+    assert dispatch.trigger_permission_query('Employee') is None
+    assert [method.method_path for method in dispatch.get_scheduled_methods('daily')] == ['os.getcwd']
+
+def test_dispatched_calls_are_counted(dispatch):
+    assert dispatch.trigger_hook('Employee', 'on_update', '/tmp/report.csv') == 'report.csv'
+    dispatch.trigger_hook('Employee', 'on_update', '/tmp/other.csv')
+    assert dispatch.trigger_hook('Employee', 'on_trash', '/tmp/x') is None
+
+    stats = dispatch.get_hook_stats()
+    assert [(entry['method'], entry['calls'], entry['errors']) for entry in stats] == [('os.path.basename', 2, 0)]
+
+def test_stats_are_served_to_hr_managers_only(dispatch, client, login):
+    dispatch.trigger_hook('Employee', 'on_update', '/tmp/report.csv')
+
+    login('employee', 'employee123')
+    assert client.get('/api/hook-stats').status_code == 403
+
+    login()
+    response = client.get('/api/hook-stats')
+    assert response.status_code == 200
+    assert [(entry['method'], entry['calls']) for entry in response.get_json()['hooks']] == [('os.path.basename', 1)]
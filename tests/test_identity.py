@@ -0,0 +1,42 @@
+from sqlalchemy import text
+
+def import_as(hr, client):
+    # Test requests reuse the fixture's app context, and with it flask.g and
+    # the session; a context of its own makes this one start afresh
+    with hr.app.app_context():
+        return client.post('/api/attendance/bulk', data=b'', content_type='application/x-ndjson')
+
+def test_identity_is_loaded_once_per_request(hr):
+    from identity import get_identity
+
+    user = hr.User.query.filter_by(username='employee').one()
+    with hr.app.test_request_context():
+        first = get_identity(user.id)
+        assert get_identity(user.id) is first
+        assert first.employee.user_id == user.id
+
+def test_role_changes_apply_to_the_next_request(hr, client, login):
+    login()
+    assert import_as(hr, client).status_code == 200
+
+    # Written outside the ORM, as another process would
+    with hr.db.engine.begin() as conn:
+        conn.execute(text("UPDATE user SET role = 'Employee' WHERE username = 'hr_manager'"))
+
+    assert import_as(hr, client).status_code == 403
+
+def test_committed_employee_link_is_seen_in_the_same_request(hr):
+    from identity import get_identity
+
+    user = hr.User.query.filter_by(username='hr_manager').one()
+    with hr.app.test_request_context():
+        assert get_identity(user.id).employee is None
+
+        employee = hr.Employee(employee_id='EMP900', first_name='New', status='Active', user_id=user.id)
+        hr.db.session.add(employee)
+        hr.db.session.flush()
+        # Not committed yet
+        assert get_identity(user.id).employee is None
+
+        hr.db.session.commit()
+        assert get_identity(user.id).employee.employee_id == 'EMP900'
@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+from leave_ledger import get_leaves_taken, rebuild_leave_balances
+
+@pytest.fixture
+def application(hr):
+    employee = hr.Employee.query.filter_by(employee_id='EMP001').one()
+    leave_type = hr.LeaveType.query.first()
+    application = hr.LeaveApplication(employee_id=employee.id, leave_type_id=leave_type.id,
+                                      from_date=date(2023, 5, 2), to_date=date(2023, 5, 4),
+                                      total_leave_days=3, status='Open')
+    hr.db.session.add(application)
+    hr.db.session.commit()
+    return application
+
+def taken(application):
+    key = (application.employee_id, application.leave_type_id)
+    return get_leaves_taken(2023, [application.employee_id]).get(key, 0)
+
+def test_approving_books_the_days(hr, application):
+    assert taken(application) == 0
+
+    application.status = 'Approved'
+    hr.db.session.commit()
+    assert taken(application) == 3
+
+def test_leaving_approved_returns_the_days(hr, application):
+    application.status = 'Approved'
+    hr.db.session.commit()
+
+    application.status = 'Rejected'
+    hr.db.session.commit()
+    assert taken(application) == 0
+
+def test_changing_approved_leave_moves_the_days(hr, application):
+    application.status = 'Approved'
+    hr.db.session.commit()
+
+    application.total_leave_days = 2
+    application.from_date = date(2024, 1, 2)
+    hr.db.session.commit()
+
+    assert taken(application) == 0
+    key = (application.employee_id, application.leave_type_id)
+    assert get_leaves_taken(2024)[key] == 2
+
+def test_deleting_approved_leave_returns_the_days(hr, application):
+    application.status = 'Approved'
+    hr.db.session.commit()
+
+    hr.db.session.delete(application)
+    hr.db.session.commit()
+    assert taken(application) == 0
+
+def test_rebuild_matches_the_ledger(hr, application):
+    application.status = 'Approved'
+    hr.db.session.commit()
+    ledger = get_leaves_taken(2023)
+
+    hr.LeaveBalance.query.delete()
+    hr.db.session.commit()
+    rebuild_leave_balances()
+
+    assert get_leaves_taken(2023) == ledger
+
+def test_ledger_rows_are_created_and_incremented_by_upsert(hr, application):
+    from leave_ledger import apply_ledger_deltas
+
+    key = (application.employee_id, application.leave_type_id, 2023)
+    # Two writers both finding no row for the key
+    apply_ledger_deltas(hr.db.session, {key: 2})
+    apply_ledger_deltas(hr.db.session, {key: 1.5})
+    hr.db.session.commit()
+
+    assert taken(application) == 3.5
+    assert hr.LeaveBalance.query.filter_by(employee_id=key[0], leave_type_id=key[1], year=2023).count() == 1
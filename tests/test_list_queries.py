@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def add_rows(hr, count):
+    employees = hr.Employee.query.all()
+    leave_type = hr.LeaveType.query.first()
+    for index in range(count):
+        employee = employees[index % len(employees)]
+        hr.db.session.add(hr.SalarySlip(employee_id=employee.id, start_date=date(2023, 1, 1),
+                                        end_date=date(2023, 1, 31), posting_date=date(2023, 1, 31),
+                                        status='Submitted'))
+        hr.db.session.add(hr.LeaveApplication(employee_id=employee.id, leave_type_id=leave_type.id,
+                                              from_date=date(2023, 2, index % 28 + 1),
+                                              to_date=date(2023, 2, index % 28 + 1), status='Open'))
+    hr.db.session.commit()
+
+def queries_for(hr, client, url):
+    # A fresh app context gives the request its own session, as in production
+    with hr.app.app_context(), count_queries(hr.db.engine) as statements:
+        assert client.get(url).status_code == 200
+    return len(statements)
+
+@pytest.mark.parametrize('url', ['/payroll/salary-slips', '/leave/pending-approvals'])
+def test_list_pages_run_a_constant_number_of_queries(hr, client, login, url):
+    login()
+    add_rows(hr, 3)
+    few = queries_for(hr, client, url)
+
+    add_rows(hr, 30)
+    assert queries_for(hr, client, url) == few
@@ -0,0 +1,148 @@
+import datetime
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, func, select
+
+@pytest.fixture
+def engines(tmp_path):
+    source = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    for engine in (source, target):
+        metadata = MetaData()
+        Table('keyed', metadata, Column('id', Integer, primary_key=True), Column('value', String(20)))
+        Table('unkeyed', metadata, Column('code', String(20)), Column('value', String(20)))
+        metadata.create_all(engine)
+
+    with source.begin() as conn:
+        metadata = MetaData()
+        metadata.reflect(bind=conn)
+        conn.execute(metadata.tables['keyed'].insert(), [{'id': i, 'value': f'v{i}'} for i in range(1, 11)])
+        conn.execute(metadata.tables['unkeyed'].insert(), [{'code': f'c{i}', 'value': f'v{i}'} for i in range(10)])
+
+    yield source, target
+    source.dispose()
+    target.dispose()
+
+def count(engine, table_name):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Table(table_name, MetaData(), autoload_with=conn))).scalar()
+
+def fail_on_batch(migrate, monkeypatch, failing_batch):
+    """Make the loader raise when writing the given (1-based) batch"""
+    real_get_loader = migrate.get_loader
+    calls = []
+
+    def get_loader(name):
+        load_batch = real_get_loader(name)
+        def load(conn, table, batch):
+            calls.append(table.name)
+            if len(calls) == failing_batch:
+                raise RuntimeError('connection lost')
+            return load_batch(conn, table, batch)
+        return load
+
+    monkeypatch.setattr(migrate, 'get_loader', get_loader)
+
+def test_keyed_table_resumes_after_last_commit(migrate, engines, monkeypatch):
+    source, target = engines
+    fail_on_batch(migrate, monkeypatch, 3)
+
+    with pytest.raises(RuntimeError):
+        migrate.migrate_data_streaming(source, target, tables=['keyed'], batch_size=2, commit_every=1, workers=1)
+    assert count(target, 'keyed') == 4
+
+    monkeypatch.undo()
+    copied = migrate.migrate_data_streaming(source, target, tables=['keyed'], batch_size=2, commit_every=1, workers=1)
+
+    assert copied == {'keyed': 6}
+    assert count(target, 'keyed') == 10
+
+def test_unkeyed_table_is_copied_in_one_transaction(migrate, engines, monkeypatch):
+    source, target = engines
+    fail_on_batch(migrate, monkeypatch, 3)
+
+    with pytest.raises(RuntimeError):
+        migrate.migrate_data_streaming(source, target, tables=['unkeyed'], batch_size=2, commit_every=1, workers=1)
+    assert count(target, 'unkeyed') == 0
+
+    monkeypatch.undo()
+    migrate.migrate_data_streaming(source, target, tables=['unkeyed'], batch_size=2, commit_every=1, workers=1)
+    assert count(target, 'unkeyed') == 10
+
+def test_restarting_an_unkeyed_table_replaces_its_rows(migrate, engines):
+    source, target = engines
+
+    for _ in range(2):
+        migrate.migrate_data_streaming(source, target, tables=['unkeyed'], workers=1, restart=True)
+
+    assert count(target, 'unkeyed') == 10
+
+def test_source_is_read_in_primary_key_batches(migrate, engines):
+    source, _ = engines
+    table = Table('keyed', MetaData(), autoload_with=source)
+
+    batches = list(migrate.iter_source_batches(source, table, batch_size=4))
+    assert [[row['id'] for row in batch] for batch in batches] == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+
+    resumed = list(migrate.iter_source_batches(source, table, batch_size=4, after=8))
+    assert [[row['id'] for row in batch] for batch in resumed] == [[9, 10]]
+
+def test_transform_row_maps_fields_and_adds_defaults(migrate):
+    now = datetime.datetime(2024, 1, 1)
+    mapping = {'field_mappings': {'id': 'name', 'value': 'title'},
+               'additional_fields': {'docstatus': 0, 'creation': 'NOW()', 'title': 'unused'}}
+
+    assert migrate.transform_row({'id': 7, 'value': 'v7', 'extra': 1}, mapping, now) == {
+        'name': 7, 'title': 'v7', 'docstatus': 0, 'creation': now}
+
+def test_mapped_table_is_streamed_into_its_frappe_table(migrate, engines):
+    source, target = engines
+    Table('tabKeyed', MetaData(), Column('name', String(20), primary_key=True), Column('title', String(20)),
+          Column('docstatus', Integer)).create(target)
+    mappings = {'keyed': {'table_name': 'tabKeyed', 'field_mappings': {'id': 'name', 'value': 'title'},
+                          'additional_fields': {'docstatus': 0}}}
+
+    copied = migrate.migrate_data_streaming(source, target, tables=['keyed'], frappe_mappings=mappings,
+                                            batch_size=3, workers=1)
+
+    assert copied == {'keyed': 10}
+    with target.connect() as conn:
+        rows = conn.execute(select(Table('tabKeyed', MetaData(), autoload_with=conn)).order_by('title')).all()
+    assert rows[0] == ('1', 'v1', 0) and len(rows) == 10
+
+def test_values_loader_splits_statements_to_fit_the_packet(migrate, engines):
+    _, target = engines
+    table = Table('keyed', MetaData(), autoload_with=target)
+    rows = [{'id': i, 'value': 'x' * 10} for i in range(1, 8)]
+    statements = []
+
+    with target.connect() as conn:
+        event.listen(conn, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        migrate.load_batch_values(conn, table, rows, max_packet_size=60)
+        conn.commit()
+
+    # Each row is estimated at 23 bytes, so two fit in 60
+    assert [statement.count('(?, ?)') for statement in statements] == [2, 2, 2, 1]
+    assert count(target, 'keyed') == 7
+
+def test_infile_values_are_escaped(migrate):
+    assert migrate._tsv_value(None) == '\\N'
+    assert migrate._tsv_value(True) == '1'
+    assert migrate._tsv_value('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+    assert migrate._tsv_value(datetime.datetime(2024, 1, 2, 3, 4, 5)) == '2024-01-02 03:04:05.000000'
+
+def test_infile_loader_needs_mariadb(migrate, engines):
+    _, target = engines
+    table = Table('keyed', MetaData(), autoload_with=target)
+
+    with target.connect() as conn, pytest.raises(NotImplementedError):
+        migrate.load_batch_infile(conn, table, [{'id': 1, 'value': 'v1'}])
+
+def test_streaming_with_the_values_loader(migrate, engines):
+    source, target = engines
+
+    copied = migrate.migrate_data_streaming(source, target, tables=['keyed', 'unkeyed'], batch_size=4,
+                                            workers=2, loader='values')
+
+    assert copied == {'keyed': 10, 'unkeyed': 10}
+    assert count(target, 'keyed') == count(target, 'unkeyed') == 10
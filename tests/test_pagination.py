@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from pagination import apply_date_filters, decode_cursor, encode_cursor, paginate
+
+def add_salary_slips(hr, count):
+    employee = hr.Employee.query.filter_by(employee_id='EMP001').one()
+    start = date(2020, 1, 1)
+    for index in range(count):
+        # Pairs of slips share an end date, so the id breaks ties
+        end = start + timedelta(days=30 * (index // 2))
+        hr.db.session.add(hr.SalarySlip(employee_id=employee.id, start_date=end.replace(day=1), end_date=end,
+                                        posting_date=end, status='Submitted'))
+    hr.db.session.commit()
+
+def test_pages_cover_every_row_once_in_order(hr):
+    add_salary_slips(hr, 25)
+    query = hr.SalarySlip.query
+    sort_keys = [hr.SalarySlip.end_date, hr.SalarySlip.id]
+
+    seen, cursor = [], None
+    while True:
+        page = paginate(query, sort_keys, descending=True, cursor=cursor, limit=10)
+        seen.extend((slip.end_date, slip.id) for slip in page.items)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+
+    expected = [(slip.end_date, slip.id) for slip in
+                query.order_by(hr.SalarySlip.end_date.desc(), hr.SalarySlip.id.desc())]
+    assert seen == expected
+
+def test_cursor_round_trips_dates(hr):
+    sort_keys = [hr.SalarySlip.end_date, hr.SalarySlip.id]
+
+    assert decode_cursor(encode_cursor([date(2024, 3, 31), 7]), sort_keys) == [date(2024, 3, 31), 7]
+
+def test_invalid_date_filters_are_ignored_and_reported(hr):
+    add_salary_slips(hr, 4)
+
+    query, invalid = apply_date_filters(hr.SalarySlip.query, {
+        'from_date': lambda value: hr.SalarySlip.start_date >= value,
+        'to_date': lambda value: hr.SalarySlip.end_date <= value
+    }, {'from_date': '01/01/2020', 'to_date': '2020-01-01'})
+
+    assert invalid == ['from_date']
+    assert query.count() == 2
+
+def test_salary_slip_list_survives_bad_dates(client, login):
+    login()
+
+    response = client.get('/payroll/salary-slips?from_date=yesterday&to_date=2024-13-01')
+
+    assert response.status_code == 200
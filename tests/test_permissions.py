@@ -0,0 +1,77 @@
+import pytest
+
+@pytest.fixture
+def compat(hr):
+    import frappe_compat
+    frappe_compat.init_app(hr.db)
+    return frappe_compat
+
+def user(hr, username):
+    return hr.User.query.filter_by(username=username).one()
+
+def test_hr_manager_reads_every_employee(hr, compat):
+    manager = user(hr, 'hr_manager')
+
+    assert compat.get_permission_filters('Employee', manager) == []
+
+def test_employee_reads_only_own_records(hr, compat):
+    employee_user = user(hr, 'employee')
+    employee = hr.Employee.query.filter_by(user_id=employee_user.id).one()
+
+    assert compat.get_permission_filters('Employee', employee_user) == [['user_id', '=', employee_user.id]]
+    assert compat.get_permission_filters('Attendance', employee_user) == [['employee_id', '=', employee.id]]
+
+def test_doctypes_without_rules_are_not_scoped(hr, compat):
+    employee_user = user(hr, 'employee')
+
+    for doctype in ('Department', 'Leave Type', 'Salary Structure'):
+        assert compat.get_permission_filters(doctype, employee_user) == []
+    assert compat.get_permission_filters('User', employee_user) == [['id', '=', employee_user.id]]
+
+def test_get_all_returns_masters_to_employees(hr, compat):
+    from flask_login import login_user
+
+    with hr.app.test_request_context():
+        login_user(user(hr, 'employee'))
+        assert len(compat.get_all('Department', fields=['name'])) == hr.Department.query.count()
+        assert [row['username'] for row in compat.get_all('User', fields=['username'])] == ['employee']
+
+def test_rules_compile_to_all_and_own_record_masks():
+    from hrms.permission_rules import PTYPE_BITS, compile_role_permissions
+
+    matrix = compile_role_permissions({
+        'Employee': [['Attendance', 'read', 'create', {'user': 'owner'}]],
+        'HR User': [['Attendance', 'read'], ['Attendance', 'write']]
+    })
+
+    assert matrix[('Employee', 'Attendance')] == (0, PTYPE_BITS['read'] | PTYPE_BITS['create'])
+    assert matrix[('HR User', 'Attendance')] == (PTYPE_BITS['read'] | PTYPE_BITS['write'], 0)
+
+def test_role_checks_use_the_compiled_rules(hr):
+    import hooks
+
+    employee_user = user(hr, 'employee')
+
+    assert hooks.check_role_permissions(employee_user, 'Attendance', 'create')
+    assert not hooks.check_role_permissions(employee_user, 'Attendance', 'delete')
+    assert hooks.is_owner_only('Employee', 'Attendance')
+    assert not hooks.is_owner_only('HR User', 'Attendance')
+
+def previous_has_permission(doctype, role, ptype, own_record):
+    """The has_permission hooks of Employee, Attendance and Leave Application before the rules were compiled"""
+    if doctype == 'Employee':
+        return role == 'HR Manager' or (ptype == 'read' and own_record)
+    return role in ('HR Manager', 'HR User') or own_record
+
+def test_hrms_rules_grant_the_previous_document_access():
+    from hrms.hooks import role_permissions
+    from hrms.permission_rules import PTYPES, compile_role_permissions, get_role_masks, is_permitted
+
+    matrix = compile_role_permissions(role_permissions)
+    for role in ('HR Manager', 'HR User', 'Employee'):
+        masks = get_role_masks(matrix, {role})
+        for doctype in ('Employee', 'Attendance', 'Leave Application'):
+            for ptype in PTYPES:
+                for own_record in (False, True):
+                    assert is_permitted(masks, doctype, ptype, own_record) == previous_has_permission(
+                        doctype, role, ptype, own_record), (role, doctype, ptype, own_record)
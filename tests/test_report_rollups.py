@@ -0,0 +1,53 @@
+from datetime import date
+
+import report_rollups
+from report_rollups import ATTENDANCE, mark_stale_months, refresh_rollups, rebuild_rollups
+
+def add_attendance(hr, employee_code, attendance_date, status):
+    employee = hr.Employee.query.filter_by(employee_id=employee_code).one()
+    hr.db.session.add(hr.Attendance(employee_id=employee.id, attendance_date=attendance_date, status=status))
+    hr.db.session.commit()
+    return employee
+
+def rollup_days(hr, month):
+    return {(row.department, row.status): row.days
+            for row in hr.AttendanceRollup.query.filter_by(month=month)}
+
+def test_refresh_recomputes_marked_months(hr):
+    refresh_rollups()
+    employee = add_attendance(hr, 'EMP001', date(2024, 3, 4), 'Present')
+    add_attendance(hr, 'EMP001', date(2024, 3, 5), 'Absent')
+
+    assert hr.RollupStaleMonth.query.count() > 0
+    assert refresh_rollups() == {ATTENDANCE: 1}
+
+    assert rollup_days(hr, date(2024, 3, 1)) == {(employee.department, 'Present'): 1,
+                                                 (employee.department, 'Absent'): 1}
+    assert hr.RollupStaleMonth.query.count() == 0
+
+def test_refresh_keeps_marks_it_did_not_read(hr, monkeypatch):
+    refresh_rollups()
+    add_attendance(hr, 'EMP001', date(2024, 3, 4), 'Present')
+
+    # A writer queues another month while the refresh is running
+    real_refresh = report_rollups.REFRESHERS[ATTENDANCE]
+    def refresh_and_mark(month):
+        real_refresh(month)
+        mark_stale_months(hr.db.session, ATTENDANCE, [date(2024, 4, 2)])
+    monkeypatch.setitem(report_rollups.REFRESHERS, ATTENDANCE, refresh_and_mark)
+
+    refresh_rollups()
+
+    assert [(mark.rollup, mark.month) for mark in hr.RollupStaleMonth.query] == [(ATTENDANCE, date(2024, 4, 1))]
+
+def test_rebuild_matches_incremental_refresh(hr):
+    add_attendance(hr, 'EMP001', date(2024, 3, 4), 'Present')
+    add_attendance(hr, 'EMP002', date(2024, 3, 4), 'On Leave')
+    refresh_rollups()
+    incremental = rollup_days(hr, date(2024, 3, 1))
+
+    hr.AttendanceRollup.query.delete()
+    hr.db.session.commit()
+    rebuild_rollups()
+
+    assert rollup_days(hr, date(2024, 3, 1)) == incremental
@@ -0,0 +1,29 @@
+from sqlalchemy import inspect, text
+
+def index_names(hr, table_name):
+    return {index['name'] for index in inspect(hr.db.engine).get_indexes(table_name)}
+
+def test_missing_indexes_are_created(hr):
+    with hr.db.engine.begin() as conn:
+        conn.execute(text('DROP INDEX idx_appraisal_employee_status'))
+
+    hr.create_missing_indexes()
+
+    assert 'idx_appraisal_employee_status' in index_names(hr, 'appraisal')
+
+def test_unique_constraints_of_existing_tables_become_unique_indexes(hr):
+    table = hr.LeaveBalance.__table__
+    with hr.db.engine.begin() as conn:
+        conn.execute(text('ALTER TABLE leave_balance RENAME TO leave_balance_old'))
+        conn.execute(text('CREATE TABLE leave_balance AS SELECT * FROM leave_balance_old'))
+        conn.execute(text('DROP TABLE leave_balance_old'))
+    indexes_before = set(table.indexes)
+
+    hr.create_missing_indexes()
+
+    unique = {index['name'] for index in inspect(hr.db.engine).get_indexes('leave_balance') if index['unique']}
+    assert 'uq_leave_balance_employee_type_year' in unique
+    assert set(table.indexes) == indexes_before
+
+    # Running again finds everything in place
+    hr.create_missing_indexes()
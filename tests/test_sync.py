@@ -0,0 +1,93 @@
+import io
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+
+@pytest.fixture
+def target(hr, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    hr.db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+def change_log(hr):
+    return hr.db.session.execute(
+        select(hr.SyncChange.table_name, hr.SyncChange.row_id, hr.SyncChange.operation)
+        .order_by(hr.SyncChange.id)
+    ).all()
+
+def age_change_log(hr, seconds):
+    hr.db.session.execute(hr.SyncChange.__table__.update().values(
+        changed_at=datetime.now() - timedelta(seconds=seconds)))
+    hr.db.session.commit()
+
+def target_employees(hr, target):
+    employee = hr.Employee.__table__
+    with target.connect() as conn:
+        return dict(conn.execute(select(employee.c.employee_id, employee.c.first_name)).all())
+
+def test_orm_writes_are_logged(hr):
+    hr.db.session.query(hr.SyncChange).delete()
+    employee = hr.Employee(employee_id='EMP900', first_name='New', status='Active')
+    hr.db.session.add(employee)
+    hr.db.session.commit()
+
+    employee.first_name = 'Renamed'
+    hr.db.session.commit()
+    hr.db.session.delete(employee)
+    hr.db.session.commit()
+
+    assert change_log(hr) == [('employee', employee.id, 'upsert')] * 2 + [('employee', employee.id, 'delete')]
+
+def test_import_logs_only_written_rows(hr):
+    from attendance_import import import_attendance, iter_records
+
+    day_one, day_two = date(2024, 3, 4), date(2024, 3, 5)
+    for employee_id, attendance_date in (('EMP001', day_two), ('EMP002', day_one)):
+        employee = hr.Employee.query.filter_by(employee_id=employee_id).one()
+        hr.db.session.add(hr.Attendance(employee_id=employee.id, attendance_date=attendance_date, status='Absent'))
+    hr.db.session.commit()
+    hr.db.session.query(hr.SyncChange).delete()
+    hr.db.session.commit()
+
+    # EMP001 on day one and EMP002 on day two; the other two pairs exist but are untouched
+    lines = (f'{{"employee_id": "EMP001", "attendance_date": "{day_one}", "status": "Present"}}\n'
+             f'{{"employee_id": "EMP002", "attendance_date": "{day_two}", "status": "Present"}}\n')
+    report = import_attendance(iter_records(io.BytesIO(lines.encode()), 'jsonl'))
+    assert report['rows_written'] == 2
+
+    logged = {row_id for table_name, row_id, _ in change_log(hr) if table_name == 'attendance'}
+    written = {row.id for row in hr.Attendance.query.filter_by(status='Present')}
+    assert logged == written
+
+def test_sync_applies_changes_and_prunes_the_log(hr, migrate, target):
+    hr.db.session.add(hr.Employee(employee_id='EMP900', first_name='New', status='Active'))
+    hr.db.session.commit()
+    age_change_log(hr, 600)
+
+    stats = migrate.sync_incremental(hr.db.engine, target, safety_window=60)
+
+    assert stats['employee']['upserted'] >= 1
+    assert target_employees(hr, target)['EMP900'] == 'New'
+    assert change_log(hr) == []
+
+def test_sync_leaves_recent_changes_for_the_next_run(hr, migrate, target):
+    hr.db.session.add(hr.Employee(employee_id='EMP900', first_name='Old', status='Active'))
+    hr.db.session.commit()
+    age_change_log(hr, 600)
+
+    hr.db.session.add(hr.Employee(employee_id='EMP901', first_name='Recent', status='Active'))
+    hr.db.session.commit()
+
+    migrate.sync_incremental(hr.db.engine, target, safety_window=60)
+
+    synced = target_employees(hr, target)
+    assert 'EMP900' in synced and 'EMP901' not in synced
+    # The recent entry stays in the log, ahead of the checkpoint
+    assert [row_id for _, row_id, _ in change_log(hr)] == [
+        hr.Employee.query.filter_by(employee_id='EMP901').one().id]
+
+    age_change_log(hr, 600)
+    migrate.sync_incremental(hr.db.engine, target, safety_window=60)
+    assert 'EMP901' in target_employees(hr, target)